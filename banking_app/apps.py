@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class BankingAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'banking_app'
+
+    def ready(self):
+        from .metrics import install_query_recorder, instrument_serializers
+        from .query_budget import install_query_counter
+        from .sqlite import configure_connection
+
+        connection_created.connect(configure_connection)
+        connection_created.connect(install_query_recorder)
+        connection_created.connect(install_query_counter)
+        instrument_serializers()
@@ -0,0 +1,164 @@
+"""
+Async variants of login and the hot read endpoints, for deployments served
+over ASGI.
+
+DRF views are synchronous, so under ASGI each request holds a worker thread
+for its whole duration. These are plain Django async views: authentication
+is served from the principal cache on the event loop, and only the
+database work hops to a thread through `sync_to_async` (Django 3.2 has no
+async ORM).
+"""
+# 3rd party imports
+from asgiref.sync import sync_to_async
+from rest_framework import exceptions
+from rest_framework.parsers import FormParser, JSONParser
+from rest_framework.request import Request
+
+# system imports
+import functools
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from banking_app import hashers, tokens
+from banking_app.authentications import aauthenticate
+from banking_app.exceptions import AccountNotFoundError
+from .models import Account, Transaction, User
+from .serializers import LoginSerializer, TransactionSerializer, UserSerializer
+from .services import TransactionService
+from .views import TransactionCursorPagination
+
+
+def async_login_required(view):
+    """
+    Authenticate with the JWT cookie and pass the user to `view`.
+    """
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return JsonResponse(
+                {"detail": f'Method "{request.method}" not allowed.'},
+                status=405,
+            )
+        try:
+            user = await aauthenticate(request)
+        except exceptions.AuthenticationFailed as e:
+            return JsonResponse({"detail": e.detail}, status=403)
+        if user is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=403,
+            )
+        request.user = user
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+async def login_user(request):
+    """
+    Log in with email and password. The password is checked in the hash
+    worker pool, or on a thread of its own, never on the event loop.
+    """
+    if request.method != "POST":
+        return JsonResponse(
+            {"detail": f'Method "{request.method}" not allowed.'}, status=405
+        )
+    try:
+        data = Request(request, parsers=[JSONParser(), FormParser()]).data
+    except exceptions.APIException as e:
+        return JsonResponse({"detail": e.detail}, status=e.status_code)
+    serializer = LoginSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    user = await sync_to_async(
+        User.objects.filter(email=serializer.validated_data["email"]).first
+    )()
+    if user is None or not await hashers.averify_password(
+        user, serializer.validated_data["password"]
+    ):
+        return JsonResponse({"detail": "Invalid credentials"}, status=401)
+
+    pair = tokens.issue_tokens(user)
+    response = JsonResponse({"message": "Logged in successfully"})
+    tokens.set_token_cookies(response, pair.access, pair.refresh)
+    return response
+
+
+# Like DRF's login view, which is exempt as an APIView. (Django 3.2's
+# `csrf_exempt` would wrap the coroutine in a sync function.)
+login_user.csrf_exempt = True
+
+
+@async_login_required
+async def get_current_user(request):
+    return JsonResponse(UserSerializer(request.user).data)
+
+
+def _transaction_page(request, account_id):
+    drf_request = Request(request)
+    paginator = TransactionCursorPagination()
+    page = paginator.paginate_queryset(
+        Transaction.objects.filter(
+            account__id=account_id, account__user=request.user
+        ),
+        drf_request,
+    )
+    return {
+        "next": paginator.get_next_link(),
+        "previous": None,
+        "results": TransactionSerializer(page, many=True).data,
+    }
+
+
+@async_login_required
+async def list_transactions(request, id):
+    """
+    Keyset-paginated transaction history of an account.
+    """
+    try:
+        page = await sync_to_async(_transaction_page)(request, id)
+    except exceptions.NotFound as e:
+        return JsonResponse({"detail": e.detail}, status=404)
+    return JsonResponse(page)
+
+
+def _balance(account_id, at, user):
+    service = TransactionService()
+    account = Account.objects.filter(id=account_id, user=user).first()
+    if account is None:
+        raise AccountNotFoundError
+    if at is None:
+        return service.get_balance(account.id)
+    return service.get_balance_at(account, at)
+
+
+@async_login_required
+async def get_account_balance(request, id):
+    at = request.GET.get("at")
+    if at is not None:
+        try:
+            at = parse_datetime(at)
+        except ValueError:
+            at = None
+        if at is None:
+            return JsonResponse(
+                {"message": "Invalid datetime for 'at'"}, status=400
+            )
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+
+    try:
+        balance = await sync_to_async(_balance)(id, at, request.user)
+    except AccountNotFoundError:
+        return JsonResponse({"message": "Account not found"}, status=404)
+
+    return JsonResponse(
+        {
+            "account": id,
+            "at": (at or timezone.now()).isoformat(),
+            "balance": str(balance),
+        }
+    )
@@ -1,20 +1,30 @@
 # 3rd party imports
 import jwt
+from asgiref.sync import sync_to_async
 from rest_framework import authentication, exceptions
 
 # system imports
+import copy
+import hashlib
+import time
 from django.conf import settings
 
-from . import models
+from . import models, tokens
+from .caches import get_cache
 
+USER_CACHE = "users"
+TOKEN_CACHE = "tokens"
 
-class CustomUserAuthentication(authentication.BaseAuthentication):
-    def authenticate(self, request):
-        token = request.COOKIES.get("jwt")
 
-        if not token:
-            return None
+def decode_token(token: str) -> dict:
+    """
+    Verify and decode a JWT, reusing the payload of a token seen before.
+    """
+    token_cache = get_cache(TOKEN_CACHE)
+    key = hashlib.sha256(token.encode()).hexdigest()
 
+    payload = token_cache.get(key)
+    if payload is None:
         try:
             payload = jwt.decode(
                 token, settings.JWT_SECRET, algorithms=["HS256"]
@@ -23,15 +33,122 @@ class CustomUserAuthentication(authentication.BaseAuthentication):
             raise exceptions.AuthenticationFailed("Token has expired")
         except jwt.exceptions.DecodeError:
             raise exceptions.AuthenticationFailed("Token is invalid")
+        ttl = None
+        if "exp" in payload:
+            ttl = min(token_cache.ttl, payload["exp"] - time.time())
+        token_cache.set(key, payload, ttl=ttl)
+    elif "exp" in payload and payload["exp"] <= time.time():
+        token_cache.delete(key)
+        raise exceptions.AuthenticationFailed("Token has expired")
 
-        user_id = payload.get("id")
-        if not user_id:
-            raise exceptions.AuthenticationFailed(
-                "Token does not contain user ID"
-            )
+    return payload
+
+
+def get_user_id(token: str) -> int:
+    return _user_id(decode_token(token))
+
+
+def _user_id(payload: dict) -> int:
+    user_id = payload.get("id")
+    if not user_id:
+        raise exceptions.AuthenticationFailed(
+            "Token does not contain user ID"
+        )
+    return user_id
+
+
+def _load_user(user_id: int):
+    user = models.User.objects.filter(id=user_id).first()
+    if user is not None:
+        get_cache(USER_CACHE).set(user_id, user)
+    return user
+
+
+def get_user(user_id: int):
+    """
+    Look up a user by id through the principal cache.
+    """
+    user = get_cache(USER_CACHE).get(user_id)
+    if user is None:
+        user = _load_user(user_id)
+    # Hand out a copy so request-level changes never leak into the cache.
+    return copy.copy(user) if user is not None else None
+
+
+async def aget_user(user_id: int):
+    """
+    Async `get_user`: a cache hit is served on the event loop and only a
+    miss hops to a worker thread for the query.
+    """
+    user = get_cache(USER_CACHE).get(user_id)
+    if user is None:
+        user = await sync_to_async(_load_user)(user_id)
+    return copy.copy(user) if user is not None else None
+
+
+def invalidate_user(user_id: int) -> None:
+    get_cache(USER_CACHE).delete(user_id)
+
+
+def clear_caches() -> None:
+    get_cache(USER_CACHE).clear()
+    get_cache(TOKEN_CACHE).clear()
+    tokens.reset_revocation_list()
 
-        user = models.User.objects.filter(id=user_id).first()
+
+def _check_token_type(payload: dict) -> None:
+    if payload.get("type") == tokens.REFRESH:
+        raise exceptions.AuthenticationFailed("Token is invalid")
+
+
+class CustomUserAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticate with the `jwt` cookie. An access token's claims stand in
+    for the user row; legacy id-only tokens go through the user cache.
+    `request.auth` is the token payload.
+    """
+
+    def authenticate(self, request):
+        token = request.COOKIES.get(tokens.ACCESS_COOKIE)
+
+        if not token:
+            return None
+
+        payload = decode_token(token)
+        _check_token_type(payload)
+        if payload.get("jti") and tokens.is_revoked(payload["jti"]):
+            raise exceptions.AuthenticationFailed("Token has been revoked")
+
+        if payload.get("type") == tokens.ACCESS:
+            return (tokens.user_from_claims(payload), payload)
+
+        user = get_user(_user_id(payload))
         if not user:
             raise exceptions.AuthenticationFailed("User not found")
 
-        return (user, None)
+        return (user, payload)
+
+
+async def aauthenticate(request):
+    """
+    Async counterpart of `CustomUserAuthentication` for plain Django async
+    views. Returns the user, or None when no token was sent.
+    """
+    token = request.COOKIES.get(tokens.ACCESS_COOKIE)
+
+    if not token:
+        return None
+
+    payload = decode_token(token)
+    _check_token_type(payload)
+    if payload.get("jti") and await tokens.ais_revoked(payload["jti"]):
+        raise exceptions.AuthenticationFailed("Token has been revoked")
+
+    if payload.get("type") == tokens.ACCESS:
+        return tokens.user_from_claims(payload)
+
+    user = await aget_user(_user_id(payload))
+    if not user:
+        raise exceptions.AuthenticationFailed("User not found")
+
+    return user
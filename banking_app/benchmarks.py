@@ -0,0 +1,272 @@
+"""
+Helpers shared by the benchmark management commands.
+"""
+# system imports
+import argparse
+import asyncio
+import math
+import random
+import statistics
+import threading
+import time
+import uuid
+from decimal import Decimal
+from typing import Awaitable, Callable, Dict, List, Sequence
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+
+def create_bench_user(**extra):
+    """
+    Create a throwaway user for a benchmark run; delete it (and everything
+    it owns) when done.
+    """
+    from banking_app.models import User
+
+    return User.objects.create_user(
+        first_name="Bench",
+        last_name="User",
+        phone_number="0000000000",
+        email=f"bench-{uuid.uuid4().hex}@example.com",
+        **extra,
+    )
+
+
+def bulk_create_bench_users(
+    count: int, password: str, batch_size: int = 1000
+) -> list:
+    """
+    Create `count` users sharing one password, hashed once, and return them
+    in creation order. Their emails start with `bench-<run>-`, so
+    `delete_bench_users(users)` removes them and everything they own.
+    """
+    from banking_app.models import User
+
+    run = uuid.uuid4().hex
+    encoded = make_password(password)
+    User.objects.bulk_create(
+        (
+            User(
+                first_name="Bench",
+                last_name=f"User {i}",
+                phone_number="0000000000",
+                email=f"bench-{run}-{i}@example.com",
+                password=encoded,
+            )
+            for i in range(count)
+        ),
+        batch_size=batch_size,
+    )
+    # sqlite does not return the ids of bulk-inserted rows.
+    return list(
+        User.objects.filter(email__startswith=f"bench-{run}-").order_by("id")
+    )
+
+
+def bulk_create_bench_accounts(
+    users: Sequence, per_user: int, batch_size: int = 1000
+) -> list:
+    """
+    Create `per_user` empty accounts for each of `users` and return them
+    ordered by user, then creation.
+    """
+    from banking_app.models import Account
+
+    Account.objects.bulk_create(
+        (
+            Account(user=user, account_name=f"bench {i}", amount=0)
+            for user in users
+            for i in range(per_user)
+        ),
+        batch_size=batch_size,
+    )
+    return list(
+        Account.objects.filter(user__in=users).order_by("user_id", "id")
+    )
+
+
+def bulk_create_bench_transactions(
+    accounts: Sequence,
+    per_account: int,
+    rng: random.Random,
+    batch_size: int = 1000,
+) -> int:
+    """
+    Record `per_account` random credits and debits on each of `accounts`,
+    keeping balances, running balances, snapshots and rollups consistent
+    with them, and return how many were created. Debits never overdraw.
+    """
+    from banking_app.constants import CREDIT, DEBIT
+    from banking_app.models import (
+        Account,
+        AccountBalanceSnapshot,
+        Transaction,
+    )
+    from banking_app.services import TransactionService
+
+    balances = {}
+
+    def transactions():
+        for account in accounts:
+            balance = Decimal("0.00")
+            for i in range(per_account):
+                amount = Decimal(rng.randint(100, 50_000)) / 100
+                if balance >= amount and rng.random() < 0.3:
+                    kind, balance = DEBIT, balance - amount
+                else:
+                    kind, balance = CREDIT, balance + amount
+                yield Transaction(
+                    account=account,
+                    amount=amount,
+                    description=f"bench {kind} {i}",
+                    type=kind,
+                    ip_address="127.0.0.1",
+                    running_balance=balance,
+                )
+            balances[account.id] = balance
+
+    Transaction.objects.bulk_create(transactions(), batch_size=batch_size)
+
+    today = timezone.now().date()
+    for account in accounts:
+        account.amount = balances[account.id]
+    Account.objects.bulk_update(accounts, ["amount"], batch_size=batch_size)
+    AccountBalanceSnapshot.objects.bulk_create(
+        (
+            AccountBalanceSnapshot(
+                account=account, date=today, balance=account.amount
+            )
+            for account in accounts
+        ),
+        batch_size=batch_size,
+    )
+    TransactionService().rebuild_rollups([a.id for a in accounts])
+    return len(accounts) * per_account
+
+
+def delete_bench_users(users: Sequence, batch_size: int = 100) -> None:
+    from banking_app.models import User
+
+    ids = [user.id for user in users]
+    for start in range(0, len(ids), batch_size):
+        User.objects.filter(id__in=ids[start : start + batch_size]).delete()
+
+
+def in_process_http():
+    """
+    Settings for driving views through Django's test clients: accept the
+    test client's host and keep DEBUG query logging out of the numbers.
+    """
+    return override_settings(
+        DEBUG=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+    )
+
+
+def non_negative_int(value: str) -> int:
+    """
+    argparse type for counts that may be zero, such as retries.
+    """
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, got {number}")
+    return number
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of `samples`; 0.0 for an empty sequence.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_latencies(samples: Sequence[float]) -> Dict[str, float]:
+    """
+    Summarize latencies given in seconds as milliseconds.
+    """
+    ms = [sample * 1000 for sample in samples]
+    return {
+        "count": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+
+
+def run_concurrently(
+    worker: Callable[[int], object], total: int, concurrency: int
+) -> Dict[str, object]:
+    """
+    Call `worker(i)` for i in range(total) from `concurrency` threads.
+
+    Every thread uses its own database connection, which is closed when the
+    thread finishes. Returns the wall-clock time, per-call latencies and the
+    results (or raised exceptions) indexed by `i`.
+    """
+    results: List[object] = [None] * total
+    latencies: List[float] = [0.0] * total
+    counter = iter(range(total))
+    counter_lock = threading.Lock()
+
+    def loop():
+        try:
+            while True:
+                with counter_lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    results[i] = worker(i)
+                except Exception as exc:
+                    results[i] = exc
+                latencies[i] = time.perf_counter() - started
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=loop) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {"elapsed": elapsed, "latencies": latencies, "results": results}
+
+
+async def run_concurrently_async(
+    worker: Callable[[int], Awaitable[object]], total: int, concurrency: int
+) -> Dict[str, object]:
+    """
+    Await `worker(i)` for i in range(total) with at most `concurrency`
+    calls in flight on the running event loop. Returns the same shape as
+    `run_concurrently`.
+    """
+    results: List[object] = [None] * total
+    latencies: List[float] = [0.0] * total
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(i):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                results[i] = await worker(i)
+            except Exception as exc:
+                results[i] = exc
+            latencies[i] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    return {"elapsed": elapsed, "latencies": latencies, "results": results}
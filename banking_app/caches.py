@@ -0,0 +1,151 @@
+"""
+Small key/value caches with hit and miss accounting.
+
+`LRUCache` lives in process memory; `DjangoCache` delegates to one of the
+caches configured in `settings.CACHES`. Both expose the same interface so
+callers can pick one per use case through settings.
+"""
+# system imports
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict
+
+from django.conf import settings
+from django.core.cache import caches
+
+_MISSING = object()
+
+
+class CacheStatsMixin:
+    def _reset_stats(self):
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _record(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class LRUCache(CacheStatsMixin):
+    """
+    Thread-safe, size-bounded cache evicting the least recently used entry,
+    with a time-to-live on every entry.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] <= now:
+                del self._data[key]
+                entry = _MISSING
+            if entry is not _MISSING:
+                self._data.move_to_end(key)
+        self._record(entry is not _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def set(self, key, value, ttl: float = None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {**super().stats(), "size": len(self._data)}
+
+
+class DjangoCache(CacheStatsMixin):
+    """
+    The `LRUCache` interface on top of a Django cache alias, for sharing
+    entries between worker processes.
+    """
+
+    def __init__(self, alias: str = "default", ttl: float = 60, prefix: str = ""):
+        self.alias = alias
+        self.ttl = ttl
+        self.prefix = prefix
+        self._reset_stats()
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def _key(self, key) -> str:
+        return f"{self.prefix}:{key}"
+
+    def get(self, key, default=None):
+        value = self._cache.get(self._key(key), _MISSING)
+        self._record(value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl: float = None):
+        self._cache.set(
+            self._key(key), value, self.ttl if ttl is None else ttl
+        )
+
+    def delete(self, key):
+        self._cache.delete(self._key(key))
+
+    def clear(self):
+        # A shared backend cannot be cleared selectively by prefix without
+        # dropping other users' entries; ours age out through the TTL.
+        pass
+
+
+_registry: Dict[str, Any] = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache(name: str):
+    """
+    Return the cache configured under `settings.APP_CACHES[name]`.
+
+    Each entry takes `BACKEND` ("lru" or "django"), `TTL` in seconds, and
+    either `MAX_SIZE` (lru) or `ALIAS` (django).
+    """
+    with _registry_lock:
+        if name not in _registry:
+            config = settings.APP_CACHES.get(name, {})
+            ttl = config.get("TTL", 60)
+            if config.get("BACKEND", "lru") == "django":
+                _registry[name] = DjangoCache(
+                    alias=config.get("ALIAS", "default"), ttl=ttl, prefix=name
+                )
+            else:
+                _registry[name] = LRUCache(
+                    max_size=config.get("MAX_SIZE", 1024), ttl=ttl
+                )
+        return _registry[name]
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Hit and miss counters of every cache created so far.
+    """
+    with _registry_lock:
+        return {name: cache.stats() for name, cache in _registry.items()}
@@ -4,3 +4,24 @@ TYPE = [
 ]
 CREDIT = "credit"
 DEBIT = "debit"
+
+# Nine sequence digits followed by a Luhn check digit
+ACCOUNT_NUMBER_LENGTH = 10
+
+# States of a transaction accepted for background processing
+PENDING = "pending"
+COMPLETED = "completed"
+FAILED = "failed"
+QUEUE_STATUS = [
+    (PENDING, "Pending"),
+    (COMPLETED, "Completed"),
+    (FAILED, "Failed"),
+]
+
+# Bucket sizes of the transaction aggregates endpoint
+DAY = "day"
+MONTH = "month"
+ROLLUP_PERIODS = [
+    (DAY, "Day"),
+    (MONTH, "Month"),
+]
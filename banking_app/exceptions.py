@@ -26,3 +26,91 @@ class InvalidTransactionTypeError(Exception):
     def __init__(self, message="Invalid transaction type"):
         self.message = message
         super().__init__(self.message)
+
+
+class InvalidTransactionAmountError(Exception):
+    """
+    Exception raised when a transaction amount is missing, malformed or not positive.
+    """
+
+    def __init__(self, message="Invalid transaction amount"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class IdempotencyKeyInUseError(Exception):
+    """
+    Exception raised when a request with the same idempotency key is still being processed.
+    """
+
+    def __init__(
+        self,
+        message="A request with this Idempotency-Key is already being processed",
+    ):
+        self.message = message
+        super().__init__(self.message)
+
+
+class IdempotencyKeyMismatchError(Exception):
+    """
+    Exception raised when an idempotency key is reused with a different request.
+    """
+
+    def __init__(
+        self,
+        message="Idempotency-Key was already used with a different request",
+    ):
+        self.message = message
+        super().__init__(self.message)
+
+
+class InvalidTransferError(Exception):
+    """
+    Exception raised when a transfer names the same account on both sides.
+    """
+
+    def __init__(self, message="Cannot transfer to the same account"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class ImmutableLedgerEntryError(Exception):
+    """
+    Exception raised when code tries to change or delete a ledger entry.
+    """
+
+    def __init__(self, message="Ledger entries cannot be changed or deleted"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class LedgerAccountDeletionError(Exception):
+    """
+    Exception raised when deleting an account that has journal postings.
+    """
+
+    def __init__(
+        self, message="Accounts with transfers on record cannot be deleted"
+    ):
+        self.message = message
+        super().__init__(self.message)
+
+
+class TokenRevokedError(Exception):
+    """
+    Exception raised when a revoked token is used or revoked a second time.
+    """
+
+    def __init__(self, message="Token has been revoked"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Exception raised when code runs more database queries than its budget.
+    """
+
+    def __init__(self, message="Query budget exceeded"):
+        self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,63 @@
+"""
+Streaming CSV / NDJSON responses built from row iterators.
+
+Rows are encoded one at a time as the response is consumed, so memory use
+does not depend on how many rows are exported.
+"""
+# system imports
+import csv
+import json
+from typing import Iterable, Sequence
+
+from django.http import StreamingHttpResponse
+
+CSV = "csv"
+NDJSON = "ndjson"
+CONTENT_TYPES = {
+    CSV: "text/csv",
+    NDJSON: "application/x-ndjson",
+}
+
+
+class _Echo:
+    """
+    File-like object handing back whatever csv.writer writes to it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(columns: Sequence[str], rows: Iterable[Sequence]):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _ndjson_lines(columns: Sequence[str], rows: Iterable[Sequence]):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=str) + "\n"
+
+
+def stream_rows(
+    rows: Iterable[Sequence],
+    columns: Sequence[str],
+    export_format: str,
+    filename: str,
+) -> StreamingHttpResponse:
+    """
+    Stream `rows` (sequences ordered like `columns`) as `export_format`.
+    """
+    lines = (
+        _csv_lines(columns, rows)
+        if export_format == CSV
+        else _ndjson_lines(columns, rows)
+    )
+    response = StreamingHttpResponse(
+        lines, content_type=CONTENT_TYPES[export_format]
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{export_format}"'
+    )
+    return response
@@ -0,0 +1,22 @@
+# 3rd party imports
+import django_filters
+
+from banking_app.constants import TYPE
+from .models import Transaction
+
+
+class TransactionFilter(django_filters.FilterSet):
+    """
+    Filters for an account's transaction history.
+
+    `timestamp_after`/`timestamp_before` take ISO 8601 datetimes and
+    `amount_min`/`amount_max` bound the amount; all bounds are inclusive.
+    """
+
+    type = django_filters.ChoiceFilter(choices=TYPE)
+    timestamp = django_filters.IsoDateTimeFromToRangeFilter()
+    amount = django_filters.RangeFilter()
+
+    class Meta:
+        model = Transaction
+        fields = ["description", "type", "timestamp", "amount"]
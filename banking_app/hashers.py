@@ -0,0 +1,260 @@
+"""
+Password hashers with costs from settings, and password checks that can run
+in a pool of worker processes.
+
+Verifying a password is deliberately slow CPU work, and login does it on
+every call. `ScryptPasswordHasher` (Django 3.2 ships none) and
+`Argon2PasswordHasher` read their costs from `settings.PASSWORD_HASH_COST`.
+Both report hashes made with other costs as needing an update, so a
+successful login re-hashes the password with the preferred hasher at the
+current costs.
+
+With `settings.PASSWORD_HASH_WORKERS` > 0, `verify_password` and
+`averify_password` hash in worker processes. A burst of logins then neither
+competes with request handling for the GIL nor blocks an ASGI event loop.
+"""
+# 3rd party imports
+from asgiref.sync import sync_to_async
+
+# system imports
+import asyncio
+import base64
+import hashlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.crypto import constant_time_compare
+from django.utils.translation import gettext_noop as _
+
+
+def _cost(algorithm: str) -> dict:
+    return settings.PASSWORD_HASH_COST[algorithm]
+
+
+class ScryptPasswordHasher(hashers.BasePasswordHasher):
+    """
+    scrypt from the standard library, in the hash format of Django 4.0's
+    hasher so stored hashes survive an upgrade.
+    """
+
+    algorithm = "scrypt"
+
+    @property
+    def work_factor(self) -> int:
+        return _cost(self.algorithm)["WORK_FACTOR"]
+
+    @property
+    def block_size(self) -> int:
+        return _cost(self.algorithm)["BLOCK_SIZE"]
+
+    @property
+    def parallelism(self) -> int:
+        return _cost(self.algorithm)["PARALLELISM"]
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        assert password is not None
+        assert salt and "$" not in salt
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(),
+            salt=salt.encode(),
+            n=n,
+            r=r,
+            p=p,
+            maxmem=128 * n * r * 2,
+            dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode("ascii").strip()
+        return f"{self.algorithm}${n}${salt}${r}${p}${hash_}"
+
+    def decode(self, encoded):
+        algorithm, work_factor, salt, block_size, parallelism, hash_ = (
+            encoded.split("$", 6)
+        )
+        assert algorithm == self.algorithm
+        return {
+            "algorithm": algorithm,
+            "work_factor": int(work_factor),
+            "salt": salt,
+            "block_size": int(block_size),
+            "parallelism": int(parallelism),
+            "hash": hash_,
+        }
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        encoded_2 = self.encode(
+            password,
+            decoded["salt"],
+            decoded["work_factor"],
+            decoded["block_size"],
+            decoded["parallelism"],
+        )
+        return constant_time_compare(encoded, encoded_2)
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+        return {
+            _("algorithm"): decoded["algorithm"],
+            _("work factor"): decoded["work_factor"],
+            _("block size"): decoded["block_size"],
+            _("parallelism"): decoded["parallelism"],
+            _("salt"): hashers.mask_hash(decoded["salt"]),
+            _("hash"): hashers.mask_hash(decoded["hash"]),
+        }
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        return (
+            decoded["work_factor"] != self.work_factor
+            or decoded["block_size"] != self.block_size
+            or decoded["parallelism"] != self.parallelism
+            or hashers.must_update_salt(decoded["salt"], self.salt_entropy)
+        )
+
+    def harden_runtime(self, password, encoded):
+        # scrypt's cost is not linear in one parameter, so there is no
+        # sensible amount of extra work to pad a cheaper hash with.
+        pass
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Django's Argon2 hasher with its costs from settings. Needs argon2-cffi
+    (`pip install argon2-cffi`).
+    """
+
+    @property
+    def time_cost(self) -> int:
+        return _cost(self.algorithm)["TIME_COST"]
+
+    @property
+    def memory_cost(self) -> int:
+        return _cost(self.algorithm)["MEMORY_COST"]
+
+    @property
+    def parallelism(self) -> int:
+        return _cost(self.algorithm)["PARALLELISM"]
+
+
+def check_and_rehash(
+    password: str, encoded: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Check `password` against `encoded` and, when it matches a hash that
+    is out of date, hash it again with the preferred hasher.
+
+    Returns whether it matched and the new hash, if there is one. Touches
+    neither the database nor the user, so it can run in any process.
+    """
+    rehashed = []
+    valid = hashers.check_password(
+        password,
+        encoded,
+        setter=lambda raw: rehashed.append(hashers.make_password(raw)),
+    )
+    return valid, (rehashed[0] if rehashed else None)
+
+
+def _init_worker():
+    # Spawned workers start without Django; forked ones already have it.
+    import django
+
+    django.setup()
+
+
+class HashPool:
+    """
+    Process pool for `check_and_rehash`, sized by
+    `settings.PASSWORD_HASH_WORKERS`. Restarted when that changes and after
+    a fork, since a child cannot use its parent's pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._workers = 0
+        self._pid = None
+
+    def get(self) -> Optional[ProcessPoolExecutor]:
+        workers = settings.PASSWORD_HASH_WORKERS
+        with self._lock:
+            if self._pid != os.getpid() or self._workers != workers:
+                self._shutdown()
+                if workers > 0:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=workers, initializer=_init_worker
+                    )
+                self._workers = workers
+                self._pid = os.getpid()
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._shutdown()
+            self._workers = 0
+
+    def _shutdown(self) -> None:
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown()
+        self._executor = None
+
+
+_hash_pool = HashPool()
+
+
+def shutdown_hash_pool() -> None:
+    _hash_pool.shutdown()
+
+
+def _store_rehash(user, old: str, new: str) -> None:
+    # Only replace the hash that was checked, so a password changed in the
+    # meantime wins.
+    type(user)._default_manager.filter(pk=user.pk, password=old).update(
+        password=new
+    )
+    user.password = new
+
+
+def verify_password(user, password: str) -> bool:
+    """
+    `user.check_password(password)`, hashing in the worker pool when one is
+    configured. Out-of-date hashes are replaced on success.
+    """
+    encoded = user.password
+    pool = _hash_pool.get()
+    if pool is None:
+        valid, rehashed = check_and_rehash(password, encoded)
+    else:
+        valid, rehashed = pool.submit(
+            check_and_rehash, password, encoded
+        ).result()
+    if rehashed:
+        _store_rehash(user, encoded, rehashed)
+    return valid
+
+
+async def averify_password(user, password: str) -> bool:
+    """
+    `verify_password` for async views: the hashing runs in the worker pool,
+    or else on a thread of its own, never on the event loop.
+    """
+    encoded = user.password
+    pool = _hash_pool.get()
+    if pool is None:
+        valid, rehashed = await sync_to_async(
+            check_and_rehash, thread_sensitive=False
+        )(password, encoded)
+    else:
+        valid, rehashed = await asyncio.wrap_future(
+            pool.submit(check_and_rehash, password, encoded)
+        )
+    if rehashed:
+        await sync_to_async(_store_rehash)(user, encoded, rehashed)
+    return valid
@@ -0,0 +1,134 @@
+"""
+Idempotency-Key support for non-idempotent endpoints.
+
+The first request carrying a key claims it inside the same database
+transaction that does the work and stores the response on the way out, so
+a retry replays that response. A retry sent while the original is still in
+flight waits for it on the key's unique constraint, or is told to come
+back later if it cannot tell how the original ended. Keys expire after
+`settings.IDEMPOTENCY_KEY_TTL` seconds.
+"""
+# system imports
+import datetime
+import hashlib
+import json
+from typing import Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .exceptions import IdempotencyKeyInUseError, IdempotencyKeyMismatchError
+from .models import IdempotencyKey
+
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def get_key(request) -> Optional[str]:
+    return request.META.get(HEADER) or None
+
+
+def fingerprint(request) -> str:
+    data = request.data
+    if hasattr(data, "lists"):
+        data = dict(data.lists())
+    payload = json.dumps(
+        [request.method, request.path, data], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _expired_before() -> datetime.datetime:
+    return timezone.now() - datetime.timedelta(
+        seconds=settings.IDEMPOTENCY_KEY_TTL
+    )
+
+
+def claim(request, key: str):
+    """
+    Claim `key` for this request.
+
+    Returns `(record, None)` when the request should run, or
+    `(None, response)` with the stored response to replay. Must be called
+    inside the transaction that performs the request's work.
+
+    The INSERT comes first: a transaction that starts with a read cannot
+    take sqlite's write lock under concurrency, so a concurrent retry would
+    fail with "database is locked" instead of waiting for the original and
+    replaying it.
+    """
+    request_hash = fingerprint(request)
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=request.user, key=key, request_hash=request_hash
+            )
+        return record, None
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+    if record is None:
+        # Released meanwhile by a request that failed; let the client retry.
+        raise IdempotencyKeyInUseError
+
+    if record.created_at < _expired_before():
+        # Take the expired key over, unless another request just did.
+        now = timezone.now()
+        taken = IdempotencyKey.objects.filter(
+            id=record.id, created_at=record.created_at
+        ).update(
+            request_hash=request_hash,
+            response_status=None,
+            response_body=None,
+            created_at=now,
+        )
+        if not taken:
+            raise IdempotencyKeyInUseError
+        record.request_hash = request_hash
+        record.response_status = None
+        record.response_body = None
+        record.created_at = now
+        return record, None
+
+    if record.request_hash != request_hash:
+        raise IdempotencyKeyMismatchError
+    if record.response_status is None:
+        raise IdempotencyKeyInUseError
+    return None, Response(
+        record.response_body,
+        status=record.response_status,
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def save_response(record: IdempotencyKey, response) -> None:
+    """
+    Store `response` for replay. Server errors are not stored so the client
+    can retry them.
+    """
+    if response.status_code >= 500:
+        record.delete()
+        return
+    record.response_status = response.status_code
+    record.response_body = response.data
+    record.save(update_fields=["response_status", "response_body"])
+
+
+def purge_expired(batch_size: int = 1000) -> int:
+    """
+    Delete expired keys in batches and return how many were removed.
+    """
+    cutoff = _expired_before()
+    purged = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(created_at__lt=cutoff).values_list(
+                "id", flat=True
+            )[:batch_size]
+        )
+        if not ids:
+            return purged
+        purged += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,217 @@
+"""
+End-to-end benchmark of the main API flows, for comparing commits.
+
+    python manage.py bench_api --users 100 --accounts-per-user 2 \\
+        --transactions-per-account 200 --requests 1000 --concurrency 16 \\
+        --output bench.json
+
+Seeds users, accounts and transactions with bulk inserts, then drives each
+scenario through the WSGI handler from a thread pool and reports its
+throughput and latency percentiles as JSON:
+
+- login: POST users/login-user as a random seeded user
+- account_list: GET accounts/ for a random user
+- transaction_create: POST a credit to a random account
+- transaction_history: GET the first page of a random account's history
+
+Failed requests are counted by status code; on sqlite, concurrent writes
+can fail with "database is locked" (500s) at high --concurrency. Every
+random choice comes from --seed, so two runs with the same arguments
+send the same requests. Requests run in-process, so the numbers measure
+request handling, not the network. The seeded data is deleted afterwards
+unless --keep is given.
+"""
+# system imports
+import collections
+import json
+import random
+import subprocess
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from banking_app import benchmarks
+from banking_app.tokens import issue_access_token
+
+PASSWORD = "bench-password"
+SCENARIOS = (
+    "login",
+    "account_list",
+    "transaction_create",
+    "transaction_history",
+)
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Seed data, drive the main API flows concurrently and report JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--accounts-per-user", type=int, default=2)
+        parser.add_argument(
+            "--transactions-per-account", type=int, default=200
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=1000,
+            help="Requests per scenario.",
+        )
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=20,
+            help="Unmeasured requests sent before each scenario.",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=SCENARIOS,
+            dest="scenarios",
+            help="Scenario to run; repeat for several. Defaults to all.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Also write the report here.")
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the seeded data instead of deleting it.",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        started = time.perf_counter()
+        users = benchmarks.bulk_create_bench_users(options["users"], PASSWORD)
+        try:
+            accounts = benchmarks.bulk_create_bench_accounts(
+                users, options["accounts_per_user"]
+            )
+            transactions = benchmarks.bulk_create_bench_transactions(
+                accounts, options["transactions_per_account"], rng
+            )
+            seeding = time.perf_counter() - started
+
+            self.users = users
+            self.tokens = {user.id: issue_access_token(user) for user in users}
+            self.accounts = accounts
+            report = {
+                "commit": _commit(),
+                "database": connection.vendor,
+                "seed": options["seed"],
+                "data": {
+                    "users": len(users),
+                    "accounts": len(accounts),
+                    "transactions": transactions,
+                    "seed_s": round(seeding, 3),
+                },
+                "requests": options["requests"],
+                "concurrency": options["concurrency"],
+                "scenarios": {},
+            }
+            with benchmarks.in_process_http():
+                for name in options["scenarios"] or SCENARIOS:
+                    report["scenarios"][name] = self.run_scenario(
+                        name, options
+                    )
+        finally:
+            if not options["keep"]:
+                benchmarks.delete_bench_users(users)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        self.stdout.write(output)
+
+    def run_scenario(self, name, options):
+        request = getattr(self, name)
+        local = threading.local()
+
+        def call(i, seed):
+            if not hasattr(local, "client"):
+                local.client = Client(raise_request_exception=False)
+            # Seeded per request, so the sequence of requests does not
+            # depend on how the threads interleave.
+            rng = random.Random(f"{seed}-{name}-{i}")
+            return request(local.client, rng).status_code
+
+        if options["warmup"]:
+            benchmarks.run_concurrently(
+                lambda i: call(i, "warmup"),
+                options["warmup"],
+                options["concurrency"],
+            )
+        run = benchmarks.run_concurrently(
+            lambda i: call(i, options["seed"]),
+            options["requests"],
+            options["concurrency"],
+        )
+        statuses = collections.Counter(
+            type(r).__name__ if isinstance(r, Exception) else str(r)
+            for r in run["results"]
+        )
+        ok = sum(
+            count
+            for status, count in statuses.items()
+            if status.isdigit() and int(status) < 400
+        )
+        return {
+            "ok": ok,
+            "failed": options["requests"] - ok,
+            "statuses": dict(sorted(statuses.items())),
+            "elapsed_s": round(run["elapsed"], 3),
+            "requests_per_s": round(options["requests"] / run["elapsed"], 1),
+            "latency": benchmarks.summarize_latencies(run["latencies"]),
+        }
+
+    def authenticate(self, client, user):
+        client.cookies["jwt"] = self.tokens[user.id]
+
+    def login(self, client, rng):
+        user = rng.choice(self.users)
+        return client.post(
+            reverse("login"),
+            {"email": user.email, "password": PASSWORD},
+            content_type="application/json",
+        )
+
+    def account_list(self, client, rng):
+        self.authenticate(client, rng.choice(self.users))
+        return client.get(reverse("accounts-list"))
+
+    def transaction_create(self, client, rng):
+        account = rng.choice(self.accounts)
+        self.authenticate(client, account.user)
+        return client.post(
+            reverse("transaction-list", args=[account.id]),
+            {
+                "amount": f"{rng.randint(100, 10_000) / 100:.2f}",
+                "description": "bench deposit",
+                "type": "credit",
+            },
+            content_type="application/json",
+        )
+
+    def transaction_history(self, client, rng):
+        account = rng.choice(self.accounts)
+        self.authenticate(client, account.user)
+        return client.get(reverse("transaction-list", args=[account.id]))
@@ -0,0 +1,119 @@
+"""
+Load benchmark of the read endpoints: sync DRF views driven through the
+WSGI handler from a thread pool versus their async variants driven through
+the ASGI handler from one event loop.
+
+    python manage.py bench_asgi --requests 2000 --concurrency 64
+
+Both sides run in-process, so the numbers compare request handling, not
+network stacks.
+"""
+# system imports
+import asyncio
+import json
+import threading
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from banking_app import benchmarks
+from banking_app.models import Account, Transaction
+from banking_app.services import create_token
+
+
+class Command(BaseCommand):
+    help = "Compare WSGI and ASGI throughput and latency of the read endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--transactions", type=int, default=500)
+
+    def handle(self, *args, **options):
+        user = benchmarks.create_bench_user()
+        account = Account.objects.create(
+            user=user, account_name="bench", amount=0
+        )
+        Transaction.objects.bulk_create(
+            Transaction(
+                account=account,
+                amount=1,
+                description=f"bench {i}",
+                type="credit",
+                ip_address="127.0.0.1",
+            )
+            for i in range(options["transactions"])
+        )
+        token = create_token(user_id=user.id)
+
+        endpoints = {
+            "current_user": (
+                reverse("get_logged_user"),
+                reverse("async-get-logged-user"),
+            ),
+            "transactions": (
+                reverse("transaction-list", args=[account.id])
+                + "?pagination=cursor",
+                reverse("async-transaction-list", args=[account.id]),
+            ),
+            "balance": (
+                reverse("account-balance", args=[account.id]),
+                reverse("async-account-balance", args=[account.id]),
+            ),
+        }
+
+        report = {
+            "requests": options["requests"],
+            "concurrency": options["concurrency"],
+            "endpoints": {},
+        }
+        try:
+            with benchmarks.in_process_http():
+                for name, (sync_url, async_url) in endpoints.items():
+                    report["endpoints"][name] = {
+                        "wsgi": self.run_wsgi(sync_url, token, options),
+                        "asgi": asyncio.run(
+                            self.run_asgi(async_url, token, options)
+                        ),
+                    }
+        finally:
+            user.delete()
+
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def summarize(self, run, total):
+        failures = sum(
+            isinstance(r, Exception) or r >= 400 for r in run["results"]
+        )
+        return {
+            "failures": failures,
+            "requests_per_s": round(total / run["elapsed"], 1),
+            "latency": benchmarks.summarize_latencies(run["latencies"]),
+        }
+
+    def run_wsgi(self, url, token, options):
+        local = threading.local()
+
+        def get(i):
+            if not hasattr(local, "client"):
+                local.client = Client()
+                local.client.cookies["jwt"] = token
+            return local.client.get(url).status_code
+
+        run = benchmarks.run_concurrently(
+            get, options["requests"], options["concurrency"]
+        )
+        return self.summarize(run, options["requests"])
+
+    async def run_asgi(self, url, token, options):
+        client = AsyncClient()
+        client.cookies["jwt"] = token
+
+        async def get(i):
+            return (await client.get(url)).status_code
+
+        run = await benchmarks.run_concurrently_async(
+            get, options["requests"], options["concurrency"]
+        )
+        return self.summarize(run, options["requests"])
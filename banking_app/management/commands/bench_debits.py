@@ -0,0 +1,104 @@
+"""
+Stress benchmark for concurrent debits against a single account.
+
+    python manage.py bench_debits --debits 2000 --workers 16
+
+Opens a throwaway account funded for only half of the requested debits,
+fires every debit concurrently and checks that exactly the affordable ones
+succeeded and that the final balance matches.
+"""
+# system imports
+import json
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, transaction
+
+from banking_app import benchmarks
+from banking_app.constants import DEBIT
+from banking_app.exceptions import InsufficientFundsError
+from banking_app.models import Account
+from banking_app.services import TransactionService
+
+
+class Command(BaseCommand):
+    help = "Fire concurrent debits at one account and report consistency and throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--debits", type=int, default=2000)
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--amount", type=Decimal, default=Decimal("1.00"))
+        parser.add_argument(
+            "--retries",
+            type=benchmarks.non_negative_int,
+            default=20,
+            help="Retries per debit when the database reports a lock timeout.",
+        )
+
+    def handle(self, *args, **options):
+        debits = options["debits"]
+        amount = options["amount"]
+        retries = options["retries"]
+        affordable = debits // 2
+        opening_balance = amount * affordable
+
+        user = benchmarks.create_bench_user()
+        account = Account.objects.create(
+            user=user, account_name="bench", amount=opening_balance
+        )
+        service = TransactionService()
+
+        def debit(i):
+            last_error = None
+            for _ in range(retries + 1):
+                try:
+                    with transaction.atomic():
+                        service.create_transaction(
+                            account=Account(id=account.id),
+                            amount=amount,
+                            description=f"bench debit {i}",
+                            transaction_type=DEBIT,
+                            ip_address="127.0.0.1",
+                        )
+                    return "ok"
+                except InsufficientFundsError:
+                    return "insufficient"
+                except OperationalError as exc:
+                    last_error = exc
+            raise last_error
+
+        try:
+            run = benchmarks.run_concurrently(
+                debit, debits, options["workers"]
+            )
+            results = run["results"]
+            succeeded = results.count("ok")
+            rejected = results.count("insufficient")
+            errors = [r for r in results if isinstance(r, Exception)]
+
+            account.refresh_from_db()
+            expected_balance = opening_balance - amount * succeeded
+            report = {
+                "debits": debits,
+                "workers": options["workers"],
+                "opening_balance": str(opening_balance),
+                "succeeded": succeeded,
+                "rejected_insufficient_funds": rejected,
+                "errors": len(errors),
+                "final_balance": str(account.amount),
+                "expected_balance": str(expected_balance),
+                "recorded_transactions": account.transaction_set.count(),
+                "consistent": (
+                    account.amount == expected_balance
+                    and account.amount >= 0
+                    and succeeded == account.transaction_set.count()
+                    and succeeded <= affordable
+                ),
+                "elapsed_s": round(run["elapsed"], 3),
+                "debits_per_s": round(debits / run["elapsed"], 1),
+                "latency": benchmarks.summarize_latencies(run["latencies"]),
+            }
+        finally:
+            user.delete()
+
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,92 @@
+"""
+Throughput benchmark for concurrent credits to one hot account.
+
+    python manage.py bench_hot_credits --credits 2000 --workers 16 --shards 0,4,16
+
+Runs the same credit load once per shard count and checks the final
+balance each time. On PostgreSQL credits to an unsharded account queue on
+the account row, so throughput should grow with the shard count; sqlite
+serializes all writers on the database file, so expect little difference
+there.
+"""
+# system imports
+import json
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, transaction
+
+from banking_app import benchmarks
+from banking_app.constants import CREDIT
+from banking_app.models import Account
+from banking_app.services import TransactionService
+
+
+class Command(BaseCommand):
+    help = "Compare credit throughput on a hot account across balance shard counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--credits", type=int, default=2000)
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--shards", default="0,4,16")
+        parser.add_argument("--amount", type=Decimal, default=Decimal("1.00"))
+        parser.add_argument(
+            "--retries",
+            type=benchmarks.non_negative_int,
+            default=20,
+            help="Retries per credit when the database reports a lock timeout.",
+        )
+
+    def handle(self, *args, **options):
+        report = {
+            "credits": options["credits"],
+            "workers": options["workers"],
+            "runs": {},
+        }
+        for shards in (int(n) for n in options["shards"].split(",")):
+            report["runs"][str(shards)] = self.run(shards, options)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run(self, shards, options):
+        amount = options["amount"]
+        user = benchmarks.create_bench_user()
+        account = Account.objects.create(
+            user=user, account_name="bench", amount=0
+        )
+        service = TransactionService()
+        service.set_balance_shards(account.id, shards)
+
+        def credit(i):
+            last_error = None
+            for _ in range(options["retries"] + 1):
+                try:
+                    with transaction.atomic():
+                        service.create_transaction(
+                            account=Account(id=account.id),
+                            amount=amount,
+                            description=f"bench credit {i}",
+                            transaction_type=CREDIT,
+                            ip_address="127.0.0.1",
+                        )
+                    return "ok"
+                except OperationalError as exc:
+                    last_error = exc
+            raise last_error
+
+        try:
+            run = benchmarks.run_concurrently(
+                credit, options["credits"], options["workers"]
+            )
+            succeeded = run["results"].count("ok")
+            balance = service.get_balance(account.id)
+            return {
+                "succeeded": succeeded,
+                "errors": options["credits"] - succeeded,
+                "balance": str(balance),
+                "consistent": balance == amount * succeeded,
+                "elapsed_s": round(run["elapsed"], 3),
+                "credits_per_s": round(succeeded / run["elapsed"], 1),
+                "latency": benchmarks.summarize_latencies(run["latencies"]),
+            }
+        finally:
+            user.delete()
@@ -0,0 +1,118 @@
+"""
+Login throughput benchmark across password hashing setups.
+
+    python manage.py bench_login --logins 500 --concurrency 16 --workers 4
+
+Logs one user in concurrently through the sync login endpoint (from a
+thread pool) or, with --async, through the async one (from one event loop),
+once per mode:
+
+- pbkdf2: Django's default PBKDF2 hasher, checked inline
+- scrypt: the scrypt hasher at `settings.PASSWORD_HASH_COST`, inline
+- scrypt_pool: the same, checked in --workers hash worker processes
+"""
+# system imports
+import asyncio
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from banking_app import benchmarks
+from banking_app.hashers import shutdown_hash_pool
+
+PASSWORD = "bench-password"
+PBKDF2 = "django.contrib.auth.hashers.PBKDF2PasswordHasher"
+
+
+class Command(BaseCommand):
+    help = "Compare login throughput across password hashers and hash pools."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument(
+            "--async",
+            action="store_true",
+            dest="use_async",
+            help="Drive the async login endpoint instead of the sync one.",
+        )
+
+    def handle(self, *args, **options):
+        hashers = [
+            PBKDF2,
+            *[h for h in settings.PASSWORD_HASHERS if h != PBKDF2],
+        ]
+        modes = {
+            "pbkdf2": {"PASSWORD_HASHERS": hashers, "PASSWORD_HASH_WORKERS": 0},
+            "scrypt": {"PASSWORD_HASH_WORKERS": 0},
+            "scrypt_pool": {"PASSWORD_HASH_WORKERS": options["workers"]},
+        }
+        report = {
+            "logins": options["logins"],
+            "concurrency": options["concurrency"],
+            "workers": options["workers"],
+            "endpoint": "async" if options["use_async"] else "sync",
+            "modes": {},
+        }
+        for name, overrides in modes.items():
+            with override_settings(**overrides):
+                try:
+                    report["modes"][name] = self.run_mode(options)
+                finally:
+                    shutdown_hash_pool()
+
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run_mode(self, options):
+        user = benchmarks.create_bench_user(password=PASSWORD)
+        data = {"email": user.email, "password": PASSWORD}
+        try:
+            with benchmarks.in_process_http():
+                if options["use_async"]:
+                    run = asyncio.run(self.drive_async(data, options))
+                else:
+                    run = self.drive_sync(data, options)
+            ok = run["results"].count(200)
+            return {
+                "hasher": user.password.split("$", 1)[0],
+                "ok": ok,
+                "failed": options["logins"] - ok,
+                "elapsed_s": round(run["elapsed"], 3),
+                "logins_per_s": round(ok / run["elapsed"], 1),
+                "latency": benchmarks.summarize_latencies(run["latencies"]),
+            }
+        finally:
+            user.delete()
+
+    def drive_sync(self, data, options):
+        url = reverse("login")
+
+        def login(i):
+            client = Client(raise_request_exception=False)
+            return client.post(
+                url, data, content_type="application/json"
+            ).status_code
+
+        return benchmarks.run_concurrently(
+            login, options["logins"], options["concurrency"]
+        )
+
+    async def drive_async(self, data, options):
+        url = reverse("async-login")
+        client = AsyncClient(raise_request_exception=False)
+
+        async def login(i):
+            response = await client.post(
+                url, data, content_type="application/json"
+            )
+            return response.status_code
+
+        return await benchmarks.run_concurrently_async(
+            login, options["logins"], options["concurrency"]
+        )
@@ -0,0 +1,97 @@
+"""
+Write-throughput benchmark of the transaction endpoint on sqlite.
+
+    python manage.py bench_sqlite_writes --transactions 2000 --concurrency 16
+
+Posts credits concurrently through `TransactionList.create` three times:
+with sqlite's default rollback journal (synchronous=FULL), with
+`settings.SQLITE_PRAGMAS` applied, and with those PRAGMAs plus the group
+commit writer. Run it against a file database; an in-memory database never
+fsyncs and hides the difference.
+"""
+# system imports
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from banking_app import benchmarks
+from banking_app.models import Account
+from banking_app.services import create_token
+from banking_app.sqlite import stop_group_commit_writer
+
+DEFAULT_PRAGMAS = {"journal_mode": "delete", "synchronous": "full"}
+
+
+class Command(BaseCommand):
+    help = "Compare transaction write throughput with and without sqlite tuning."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--transactions", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=16)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("This benchmark needs a sqlite database.")
+
+        modes = {
+            "default": (DEFAULT_PRAGMAS, False),
+            "tuned": (settings.SQLITE_PRAGMAS, False),
+            "tuned_group_commit": (settings.SQLITE_PRAGMAS, True),
+        }
+        report = {
+            "transactions": options["transactions"],
+            "concurrency": options["concurrency"],
+            "modes": {},
+        }
+        for name, (pragmas, group_commit) in modes.items():
+            # Journal mode only changes while no other connection is open.
+            connections.close_all()
+            with override_settings(
+                SQLITE_PRAGMAS=pragmas, GROUP_COMMIT_ENABLED=group_commit
+            ):
+                try:
+                    report["modes"][name] = self.run_mode(options)
+                finally:
+                    stop_group_commit_writer()
+                    connections.close_all()
+
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run_mode(self, options):
+        user = benchmarks.create_bench_user()
+        account = Account.objects.create(
+            user=user, account_name="bench", amount=0
+        )
+        url = reverse("transaction-list", args=[account.id])
+        token = create_token(user_id=user.id)
+        data = {"amount": "1", "description": "bench", "type": "credit"}
+
+        def post(i):
+            # Test clients re-raise view exceptions from every thread, so
+            # count failures from status codes instead.
+            client = Client(raise_request_exception=False)
+            client.cookies["jwt"] = token
+            return client.post(url, data).status_code
+
+        try:
+            with benchmarks.in_process_http():
+                run = benchmarks.run_concurrently(
+                    post, options["transactions"], options["concurrency"]
+                )
+            created = run["results"].count(201)
+            account.refresh_from_db()
+            return {
+                "created": created,
+                "failed": options["transactions"] - created,
+                "consistent": account.amount == created,
+                "elapsed_s": round(run["elapsed"], 3),
+                "transactions_per_s": round(created / run["elapsed"], 1),
+                "latency": benchmarks.summarize_latencies(run["latencies"]),
+            }
+        finally:
+            user.delete()
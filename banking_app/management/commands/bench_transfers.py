@@ -0,0 +1,132 @@
+"""
+Contention benchmark for transfers between a few hot accounts.
+
+    python manage.py bench_transfers --transfers 2000 --accounts 4 --workers 16
+
+Every transfer picks a random ordered pair of the hot accounts, so
+opposite transfers between the same pair run concurrently; accounts are
+locked in id order, which is what keeps them from deadlocking. Reports
+throughput and checks that money was conserved and every journal entry
+balances.
+"""
+# system imports
+import json
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, transaction
+from django.db.models import Sum
+
+from banking_app import benchmarks
+from banking_app.models import Account, JournalEntry, Posting
+from banking_app.services import TransactionService
+
+
+class Command(BaseCommand):
+    help = "Fire concurrent transfers between hot accounts and report throughput and consistency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--transfers", type=int, default=2000)
+        parser.add_argument("--accounts", type=int, default=4)
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--amount", type=Decimal, default=Decimal("1.00"))
+        parser.add_argument(
+            "--retries",
+            type=int,
+            default=20,
+            help="Retries per transfer when the database reports a lock timeout.",
+        )
+
+    def handle(self, *args, **options):
+        transfers = options["transfers"]
+        amount = options["amount"]
+        retries = options["retries"]
+        # Enough for any account to pay for every transfer on its own.
+        opening_balance = amount * transfers
+
+        user = benchmarks.create_bench_user()
+        account_ids = [
+            Account.objects.create(
+                user=user, account_name=f"bench {i}", amount=opening_balance
+            ).id
+            for i in range(options["accounts"])
+        ]
+        service = TransactionService()
+
+        def transfer(i):
+            source_id, destination_id = random.Random(i).sample(account_ids, 2)
+            for _ in range(retries + 1):
+                try:
+                    with transaction.atomic():
+                        service.transfer(
+                            source_id,
+                            destination_id,
+                            amount,
+                            f"bench transfer {i}",
+                            ip_address="127.0.0.1",
+                            user=user,
+                        )
+                    return "ok"
+                except OperationalError as exc:
+                    last_error = exc
+            raise last_error
+
+        try:
+            run = benchmarks.run_concurrently(
+                transfer, transfers, options["workers"]
+            )
+            results = run["results"]
+            succeeded = results.count("ok")
+            errors = [r for r in results if isinstance(r, Exception)]
+
+            postings = Posting.objects.filter(account_id__in=account_ids)
+            total_balance = Account.objects.filter(id__in=account_ids).aggregate(
+                total=Sum("amount")
+            )["total"]
+            entries = JournalEntry.objects.filter(user=user)
+            unbalanced = (
+                entries.annotate(total=Sum("postings__amount"))
+                .exclude(total=0)
+                .count()
+            )
+            balances_match_postings = all(
+                account.amount
+                == opening_balance
+                + (
+                    postings.filter(account=account).aggregate(
+                        total=Sum("amount")
+                    )["total"]
+                    or 0
+                )
+                for account in Account.objects.filter(id__in=account_ids)
+            )
+            report = {
+                "transfers": transfers,
+                "accounts": options["accounts"],
+                "workers": options["workers"],
+                "succeeded": succeeded,
+                "errors": len(errors),
+                "journal_entries": entries.count(),
+                "unbalanced_entries": unbalanced,
+                "total_balance": str(total_balance),
+                "expected_total_balance": str(
+                    opening_balance * options["accounts"]
+                ),
+                "consistent": (
+                    total_balance == opening_balance * options["accounts"]
+                    and unbalanced == 0
+                    and entries.count() == succeeded
+                    and balances_match_postings
+                ),
+                "elapsed_s": round(run["elapsed"], 3),
+                "transfers_per_s": round(transfers / run["elapsed"], 1),
+                "latency": benchmarks.summarize_latencies(run["latencies"]),
+            }
+        finally:
+            # Ledger rows refuse delete() one by one; a bulk delete is the
+            # only way to drop the benchmark's entries.
+            JournalEntry.objects.filter(user=user).delete()
+            user.delete()
+
+        self.stdout.write(json.dumps(report, indent=2))
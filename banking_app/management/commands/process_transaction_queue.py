@@ -0,0 +1,84 @@
+"""
+Worker pool applying transactions accepted with 202.
+
+    python manage.py process_transaction_queue --workers 4 --batch-size 500
+    python manage.py process_transaction_queue --once
+
+Each worker thread repeatedly takes the oldest pending batch; with --once
+the workers exit as soon as the queue is empty.
+"""
+# system imports
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from banking_app import transaction_queue
+
+
+class Command(BaseCommand):
+    help = "Apply queued transactions in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds an idle worker waits before checking the queue again.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue and exit instead of waiting for more work.",
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        counts = []
+        counts_lock = threading.Lock()
+
+        def work():
+            processed = 0
+            try:
+                while not stop.is_set():
+                    try:
+                        done = transaction_queue.process_batch(
+                            options["batch_size"]
+                        )
+                    except OperationalError:
+                        # Lost a race for the database lock; try again.
+                        stop.wait(0.05)
+                        continue
+                    processed += done
+                    if not done:
+                        if options["once"]:
+                            return
+                        stop.wait(options["poll_interval"])
+            finally:
+                connection.close()
+                with counts_lock:
+                    counts.append(processed)
+
+        threads = [
+            threading.Thread(target=work, name=f"queue-worker-{i}")
+            for i in range(options["workers"])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Processed {sum(counts)} queued transactions in {elapsed:.2f}s."
+        )
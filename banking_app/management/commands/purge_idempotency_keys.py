@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from banking_app import idempotency
+
+
+class Command(BaseCommand):
+    help = "Delete idempotency keys older than settings.IDEMPOTENCY_KEY_TTL."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        purged = idempotency.purge_expired(batch_size=options["batch_size"])
+        self.stdout.write(f"Purged {purged} expired idempotency keys.")
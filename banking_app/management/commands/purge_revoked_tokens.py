@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from banking_app import tokens
+
+
+class Command(BaseCommand):
+    help = "Delete revocations of tokens that have expired anyway."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        purged = tokens.purge_expired(batch_size=options["batch_size"])
+        self.stdout.write(f"Purged {purged} expired token revocations.")
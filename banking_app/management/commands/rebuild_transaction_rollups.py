@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from banking_app.models import Account
+from banking_app.services import TransactionService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-day transaction rollups behind the aggregates "
+        "endpoint, a chunk of accounts at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--account",
+            type=int,
+            action="append",
+            dest="accounts",
+            help="Only rebuild this account (repeatable).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        accounts = Account.objects.order_by("id")
+        if options["accounts"]:
+            accounts = accounts.filter(id__in=options["accounts"])
+        account_ids = list(accounts.values_list("id", flat=True))
+
+        service = TransactionService()
+        chunk_size = max(1, options["chunk_size"])
+        written = 0
+        for i in range(0, len(account_ids), chunk_size):
+            chunk = account_ids[i : i + chunk_size]
+            written += service.rebuild_rollups(chunk)
+            self.stdout.write(
+                f"Rebuilt accounts {chunk[0]}-{chunk[-1]} "
+                f"({i + len(chunk)}/{len(account_ids)})"
+            )
+        self.stdout.write(
+            f"Wrote {written} rollups for {len(account_ids)} accounts."
+        )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from banking_app.exceptions import AccountNotFoundError
+from banking_app.services import TransactionService
+
+
+class Command(BaseCommand):
+    help = (
+        "Spread credits to a hot account over COUNT balance shards "
+        "(0 or 1 turns sharding off)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("account_id", type=int)
+        parser.add_argument("count", type=int)
+
+    def handle(self, *args, **options):
+        if not 0 <= options["count"] <= 1024:
+            raise CommandError("COUNT must be between 0 and 1024.")
+        try:
+            TransactionService().set_balance_shards(
+                options["account_id"], options["count"]
+            )
+        except AccountNotFoundError as e:
+            raise CommandError(e.message)
+        self.stdout.write(
+            f"Account {options['account_id']} now uses "
+            f"{options['count'] if options['count'] > 1 else 0} balance shards."
+        )
@@ -0,0 +1,324 @@
+"""
+Request-level performance metrics, exported in the Prometheus text format
+at `/metrics` and, per response, as a `Server-Timing` header.
+
+`metrics_middleware` records the latency, status and response size of
+every request, labelled with the view that served it. It also samples a
+`settings.METRICS_SAMPLE_RATE` fraction of requests for their query count,
+SQL time and serializer time. Queries are counted by an execute wrapper
+that every database connection gets when it opens. Serializer time is the
+time spent building DRF's `serializer.data`. Both measurements go to the
+sampled request through a context variable, so they also reach DB work
+that an async view does on a `sync_to_async` thread. Requests that are not
+sampled pay one context variable lookup per query.
+
+Metrics are kept per process. With several worker processes, each one
+reports only its own requests.
+"""
+# 3rd party imports
+from rest_framework import serializers
+
+# system imports
+import asyncio
+import bisect
+import contextvars
+import dataclasses
+import ipaddress
+import random
+import threading
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.decorators import sync_and_async_middleware
+
+from .caches import cache_stats
+from .services import get_client_ip
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Prometheus client defaults
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class Histogram:
+    """
+    Prometheus histogram with one series per label tuple.
+    """
+
+    def __init__(
+        self, name: str, help: str, labels: Sequence[str], buckets: Sequence
+    ):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts, then +Inf, then the sum.
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = {labels: list(s) for labels, s in self._series.items()}
+        for labels, counts in sorted(series.items()):
+            label_text = _labels(self.labels, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket"
+                    f"{_labels(self.labels, labels, le=bound)} {cumulative}"
+                )
+            cumulative += counts[len(self.buckets)]
+            yield (
+                f"{self.name}_bucket"
+                f'{_labels(self.labels, labels, le="+Inf")} {cumulative}'
+            )
+            yield f"{self.name}_sum{label_text} {counts[-1]}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+def _escape(value) -> str:
+    value = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, **extra) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling the request.",
+    ("view", "method", "status"),
+    DURATION_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of the response body; streamed responses are not counted.",
+    ("view",),
+    SIZE_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries run by a sampled request.",
+    ("view",),
+    QUERY_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Time a sampled request spent in database queries.",
+    ("view",),
+    DURATION_BUCKETS,
+)
+REQUEST_SERIALIZER_DURATION = Histogram(
+    "http_request_serializer_duration_seconds",
+    "Time a sampled request spent building serializer data.",
+    ("view",),
+    DURATION_BUCKETS,
+)
+HISTOGRAMS = (
+    REQUEST_DURATION,
+    RESPONSE_SIZE,
+    REQUEST_QUERIES,
+    REQUEST_DB_DURATION,
+    REQUEST_SERIALIZER_DURATION,
+)
+
+
+@dataclasses.dataclass
+class RequestMetrics:
+    queries: int = 0
+    db_time: float = 0.0
+    serializer_time: float = 0.0
+    # Set while timing a serializer, so nested ones are not counted twice.
+    serializing: bool = False
+
+
+_current: contextvars.ContextVar[Optional[RequestMetrics]] = (
+    contextvars.ContextVar("request_metrics", default=None)
+)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper adding each query to the sampled request, if any.
+    """
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.queries += 1
+        current.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    `connection_created` receiver adding `record_query` to the connection.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_serializers() -> None:
+    """
+    Time `BaseSerializer.data`, which every serializer and list serializer
+    goes through exactly once when a view renders it.
+    """
+    data = serializers.BaseSerializer.data
+    if getattr(data.fget, "instrumented", False):
+        return
+
+    def timed_data(self):
+        current = _current.get()
+        if current is None or current.serializing:
+            return data.fget(self)
+        current.serializing = True
+        started = time.perf_counter()
+        try:
+            return data.fget(self)
+        finally:
+            current.serializer_time += time.perf_counter() - started
+            current.serializing = False
+
+    timed_data.instrumented = True
+    serializers.BaseSerializer.data = property(timed_data)
+
+
+def _view_name(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else "<unresolved>"
+
+
+def _finish(request, response, elapsed: float, measured) -> None:
+    view = _view_name(request)
+    REQUEST_DURATION.observe(
+        (view, request.method, str(response.status_code)), elapsed
+    )
+    if not response.streaming:
+        RESPONSE_SIZE.observe((view,), len(response.content))
+    if measured is None:
+        return
+
+    REQUEST_QUERIES.observe((view,), measured.queries)
+    REQUEST_DB_DURATION.observe((view,), measured.db_time)
+    REQUEST_SERIALIZER_DURATION.observe((view,), measured.serializer_time)
+    if settings.METRICS_SERVER_TIMING:
+        queries = f'desc="{measured.queries} queries"'
+        response["Server-Timing"] = ", ".join(
+            [
+                f"app;dur={elapsed * 1000:.1f}",
+                f"db;dur={measured.db_time * 1000:.1f};{queries}",
+                f"serializer;dur={measured.serializer_time * 1000:.1f}",
+            ]
+        )
+
+
+def _sampled() -> bool:
+    rate = settings.METRICS_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """
+    Record request metrics, see the module docstring. Goes first in
+    `settings.MIDDLEWARE` so the timing covers every other layer.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            measured = RequestMetrics() if _sampled() else None
+            token = _current.set(measured)
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            _finish(request, response, time.perf_counter() - started, measured)
+            return response
+
+    else:
+
+        def middleware(request):
+            measured = RequestMetrics() if _sampled() else None
+            token = _current.set(measured)
+            started = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _current.reset(token)
+            _finish(request, response, time.perf_counter() - started, measured)
+            return response
+
+    return middleware
+
+
+def render() -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+
+    stats = cache_stats()
+    for metric, key, kind, help in (
+        ("app_cache_hits_total", "hits", "counter", "Cache hits."),
+        ("app_cache_misses_total", "misses", "counter", "Cache misses."),
+        ("app_cache_entries", "size", "gauge", "Entries held in memory."),
+    ):
+        lines.append(f"# HELP {metric} {help}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, values in sorted(stats.items()):
+            if key in values:
+                lines.append(
+                    f"{metric}{_labels(('cache',), (name,))} {values[key]}"
+                )
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    for histogram in HISTOGRAMS:
+        histogram.clear()
+
+
+def _allowed(request) -> bool:
+    try:
+        ip = ipaddress.ip_address(get_client_ip(request))
+    except ValueError:
+        return False
+    return any(
+        ip in ipaddress.ip_network(network, strict=False)
+        for network in settings.METRICS_ALLOWED_NETWORKS
+    )
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint, answering only `METRICS_ALLOWED_NETWORKS`.
+    """
+    if not _allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.9 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking_app', '0003_alter_account_amount'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'timestamp', 'id'], name='transaction_account_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 3.2.9 on 2026-10-18 17:46
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill_running_balances(apps, schema_editor):
+    """
+    Replay each account's history backwards from its current balance to fill
+    in running balances and daily closing snapshots.
+    """
+    Account = apps.get_model('banking_app', 'Account')
+    Transaction = apps.get_model('banking_app', 'Transaction')
+    AccountBalanceSnapshot = apps.get_model('banking_app', 'AccountBalanceSnapshot')
+
+    for account in Account.objects.iterator():
+        balance = account.amount or Decimal('0.00')
+        transactions, snapshots = [], {}
+        history = Transaction.objects.filter(account=account).order_by('-timestamp', '-id')
+        for txn in history.iterator():
+            txn.running_balance = balance
+            transactions.append(txn)
+            snapshots.setdefault(timezone.localdate(txn.timestamp), balance)
+            if txn.type == 'credit':
+                balance -= txn.amount
+            elif txn.type == 'debit':
+                balance += txn.amount
+        Transaction.objects.bulk_update(transactions, ['running_balance'], batch_size=1000)
+        AccountBalanceSnapshot.objects.bulk_create(
+            [
+                AccountBalanceSnapshot(account=account, date=date, balance=closing)
+                for date, closing in snapshots.items()
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking_app', '0004_transaction_account_ts_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='running_balance',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='AccountBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='banking_app.account')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='accountbalancesnapshot',
+            constraint=models.UniqueConstraint(fields=('account', 'date'), name='unique_account_snapshot_date'),
+        ),
+        migrations.RunPython(backfill_running_balances, migrations.RunPython.noop),
+    ]
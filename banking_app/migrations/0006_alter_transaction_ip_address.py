@@ -0,0 +1,18 @@
+# Generated by Django 3.2.9 on 2026-10-18 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking_app', '0005_running_balance_and_snapshots'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='ip_address',
+            field=models.CharField(max_length=45),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.9 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking_app', '0007_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'type', 'timestamp'], name='transaction_account_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'amount'], name='transaction_account_amt_idx'),
+        ),
+    ]
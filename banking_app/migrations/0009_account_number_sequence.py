@@ -0,0 +1,33 @@
+# Generated by Django 3.2.9 on 2026-10-18 17:52
+
+import banking_app.services
+from django.db import migrations, models
+
+
+def create_account_number_sequence(apps, schema_editor):
+    Sequence = apps.get_model('banking_app', 'Sequence')
+    Sequence.objects.get_or_create(name='account_number')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking_app', '0008_transaction_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(create_account_number_sequence, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='account',
+            name='account_number',
+            field=models.CharField(default=banking_app.services.allocate_account_number, max_length=10, unique=True),
+        ),
+    ]
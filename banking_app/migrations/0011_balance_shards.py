@@ -0,0 +1,33 @@
+# Generated by Django 3.2.9 on 2026-10-18 18:09
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking_app', '0010_journal_entries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='balance_shards',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='AccountBalanceShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_shard_set', to='banking_app.account')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='accountbalanceshard',
+            constraint=models.UniqueConstraint(fields=('account', 'shard'), name='unique_account_balance_shard'),
+        ),
+    ]
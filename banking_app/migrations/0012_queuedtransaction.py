@@ -0,0 +1,36 @@
+# Generated by Django 3.2.9 on 2026-10-18 18:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking_app', '0011_balance_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('description', models.CharField(max_length=100)),
+                ('type', models.CharField(max_length=20)),
+                ('ip_address', models.CharField(max_length=45)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='banking_app.account')),
+                ('transaction', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='banking_app.transaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='queuedtransaction',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='queued_transaction_pending_idx'),
+        ),
+    ]
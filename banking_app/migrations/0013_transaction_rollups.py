@@ -0,0 +1,53 @@
+# Generated by Django 3.2.9 on 2026-10-18 18:18
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Sum existing transactions per account, day and type.
+    """
+    Transaction = apps.get_model('banking_app', 'Transaction')
+    TransactionRollup = apps.get_model('banking_app', 'TransactionRollup')
+
+    rows = (
+        Transaction.objects.annotate(date=TruncDate('timestamp'))
+        .values('account_id', 'date', 'type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    TransactionRollup.objects.bulk_create(
+        (TransactionRollup(**row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking_app', '0012_queuedtransaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('type', models.CharField(max_length=20)),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='banking_app.account')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='transactionrollup',
+            constraint=models.UniqueConstraint(fields=('account', 'date', 'type', 'shard'), name='unique_transaction_rollup'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.9 on 2026-10-18 18:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking_app', '0014_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='posting',
+            name='account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='banking_app.account'),
+        ),
+        migrations.AlterField(
+            model_name='posting',
+            name='transaction',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='posting', to='banking_app.transaction'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 # system imports
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext as _
@@ -6,6 +8,8 @@ from django.utils.translation import gettext as _
 # services imports
 from banking_app.managers import UserManager
 from . import services
+from .constants import PENDING, QUEUE_STATUS
+from .exceptions import ImmutableLedgerEntryError
 
 
 class User(AbstractUser):
@@ -35,11 +39,49 @@ class Account(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     account_name = models.CharField(max_length=100)
     account_number = models.CharField(
-        max_length=10, unique=True, default=services.generate_account_number
+        max_length=10, unique=True, default=services.allocate_account_number
     )
     amount = models.DecimalField(
         max_digits=10, decimal_places=2, null=True, blank=True
     )
+    # Number of AccountBalanceShard rows credits are spread over; 0 keeps
+    # the whole balance in `amount`.
+    balance_shards = models.PositiveSmallIntegerField(default=0)
+
+
+class AccountBalanceShard(models.Model):
+    """
+    Part of a hot account's balance.
+
+    Credits add to a random shard instead of `Account.amount`, so concurrent
+    credits to one account stop queueing on a single row. The balance is
+    `Account.amount` plus every shard; debits move the shards back into
+    `Account.amount` when it alone cannot cover them.
+    """
+
+    account = models.ForeignKey(
+        Account, on_delete=models.CASCADE, related_name="balance_shard_set"
+    )
+    shard = models.PositiveSmallIntegerField()
+    amount = models.DecimalField(
+        max_digits=10, decimal_places=2, default=Decimal("0.00")
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "shard"], name="unique_account_balance_shard"
+            ),
+        ]
+
+
+class Sequence(models.Model):
+    """
+    Named counter from which processes reserve blocks of values.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    next_value = models.BigIntegerField(default=1)
 
 
 class Transaction(models.Model):
@@ -47,5 +89,191 @@ class Transaction(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.CharField(max_length=100)
     type = models.CharField(max_length=20)
-    ip_address = models.CharField(max_length=20)
+    ip_address = models.CharField(max_length=45)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Account balance right after this transaction was applied.
+    running_balance = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+
+    class Meta:
+        indexes = [
+            # Serves account history ordered by time and keyset pagination.
+            models.Index(
+                fields=["account", "timestamp", "id"],
+                name="transaction_account_ts_idx",
+            ),
+            # Serve the history filters by type and by amount range.
+            models.Index(
+                fields=["account", "type", "timestamp"],
+                name="transaction_account_type_idx",
+            ),
+            models.Index(
+                fields=["account", "amount"],
+                name="transaction_account_amt_idx",
+            ),
+        ]
+
+
+class AppendOnlyModel(models.Model):
+    """
+    Rows that are written once and never changed or deleted on their own.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ImmutableLedgerEntryError
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ImmutableLedgerEntryError
+
+
+class JournalEntry(AppendOnlyModel):
+    """
+    One movement of money between accounts. Its postings always sum to zero.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    description = models.CharField(max_length=100)
+    ip_address = models.CharField(max_length=45)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class Posting(AppendOnlyModel):
+    """
+    One side of a journal entry: a signed change to one account's balance,
+    positive for credits and negative for debits, with the `Transaction`
+    that shows it in the account's history.
+    """
+
+    entry = models.ForeignKey(
+        JournalEntry, on_delete=models.CASCADE, related_name="postings"
+    )
+    # Protected: deleting one side of an entry would unbalance it, so an
+    # account (or transaction) with postings cannot be deleted.
+    account = models.ForeignKey(Account, on_delete=models.PROTECT)
+    transaction = models.OneToOneField(
+        Transaction, on_delete=models.PROTECT, related_name="posting"
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+
+
+class AccountBalanceSnapshot(models.Model):
+    """
+    Closing balance of an account for a day with activity.
+
+    Updated whenever a transaction is recorded, so looking up the balance at
+    any point in time needs at most one snapshot and one day of transactions.
+    """
+
+    account = models.ForeignKey(Account, on_delete=models.CASCADE)
+    date = models.DateField()
+    balance = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "date"], name="unique_account_snapshot_date"
+            ),
+        ]
+
+
+class TransactionRollup(models.Model):
+    """
+    Running total and count of one account's transactions of one type on
+    one day.
+
+    Updated whenever a transaction is recorded, so per-day and per-month
+    summaries read one row per bucket instead of every transaction. Hot
+    accounts spread the rows of a day over their balance shards; readers
+    sum across `shard`.
+    """
+
+    account = models.ForeignKey(Account, on_delete=models.CASCADE)
+    date = models.DateField()
+    type = models.CharField(max_length=20)
+    shard = models.PositiveSmallIntegerField(default=0)
+    total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0.00")
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "date", "type", "shard"],
+                name="unique_transaction_rollup",
+            ),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    Outcome of a request sent with an `Idempotency-Key` header, replayed when
+    the client retries with the same key.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="unique_user_idempotency_key"
+            ),
+        ]
+
+
+class RevokedToken(models.Model):
+    """
+    A token retired before it expired (logout, refresh, account deletion).
+
+    Kept without a foreign key so revocations outlive a deleted user; rows
+    can be purged once the token would have expired anyway.
+    """
+
+    jti = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class QueuedTransaction(models.Model):
+    """
+    A transaction accepted by the API and waiting for the queue worker
+    (`manage.py process_transaction_queue`) to apply it.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    account = models.ForeignKey(Account, on_delete=models.CASCADE)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    description = models.CharField(max_length=100)
+    type = models.CharField(max_length=20)
+    ip_address = models.CharField(max_length=45)
+    status = models.CharField(
+        max_length=20, choices=QUEUE_STATUS, default=PENDING
+    )
+    transaction = models.OneToOneField(
+        Transaction, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Lets the worker find the pending head of the queue without
+            # scanning processed rows.
+            models.Index(
+                fields=["id"],
+                condition=models.Q(status=PENDING),
+                name="queued_transaction_pending_idx",
+            ),
+        ]
@@ -0,0 +1,252 @@
+"""
+Query budgets: a cap on the number of database queries a block of code, a
+view or a whole request may run, to catch N+1 regressions.
+
+    with query_budget(3):
+        client.get(url)
+
+    @query_budget(2)
+    def get(self, request): ...
+
+`query_budget_middleware` applies the budget in `BUDGETS` to every request
+whose URL name is listed there, counting every query the request runs,
+middleware and authentication included. The budgets are per request and
+must not depend on page sizes or row counts. An endpoint whose query
+count grows with its data will exceed its budget, and that is the
+regression the budget is there to catch.
+
+What happens on overrun depends on `settings.QUERY_BUDGET_MODE`:
+
+- "raise": raise `QueryBudgetExceeded`, listing the queries (tests)
+- "log": log a warning and carry on (staging)
+- "off": count nothing (production; the middleware is a pass-through)
+
+Queries are counted by an execute wrapper that every database connection
+gets when it opens. Counts go to the active budgets through a context
+variable, so they also include queries that an async view runs on a
+`sync_to_async` thread.
+"""
+# system imports
+import asyncio
+import contextvars
+import functools
+import logging
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from .exceptions import QueryBudgetExceeded
+
+logger = logging.getLogger(__name__)
+
+RAISE = "raise"
+LOG = "log"
+OFF = "off"
+
+# Queries kept per budget for the error message.
+MAX_RECORDED = 50
+
+SAVEPOINT_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO")
+
+# Per-request query budgets by URL name, for every method or per method.
+# They count the worst case seen: cache misses, the user lookup for legacy
+# tokens, a rehash at login. Writes to several accounts cost a few queries
+# per account, so the bulk budgets allow for two. A streamed export runs
+# its queries after the view returns, and only the queries run before that
+# count against the budget. Deletes cost a query or two per table that
+# hangs off the row, counted with every such table populated; Django
+# deletes in batches (999 rows on sqlite), so only accounts with more
+# transactions than that go over.
+BUDGETS = {
+    "create": 1,
+    "login": 2,
+    "logout": 3,
+    "refresh-token": 2,
+    "get_logged_user": 1,
+    "delete-current-user": 22,
+    "update-current-user": 4,
+    "users": 2,
+    "accounts-list": {"GET": 3, "POST": 5},
+    "accounts-detail": {"GET": 3, "PUT": 3, "PATCH": 3, "DELETE": 13},
+    "transaction-list": {"GET": 3, "POST": 12},
+    "transaction-detail": 2,
+    "account-transaction-bulk": 17,
+    "account-balance": 5,
+    "account-statement": 2,
+    "account-aggregates": 3,
+    "transaction-bulk": 17,
+    "queued-transaction": 2,
+    "transfers": 25,
+    "metrics": 0,
+    "async-login": 2,
+    "async-get-logged-user": 1,
+    "async-transaction-list": 2,
+    "async-account-balance": 5,
+}
+
+
+class QueryBudget:
+    """
+    Context manager and decorator counting the queries run inside it
+    against `limit`. Budgets nest; a query counts against every budget
+    that is open when it runs.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        name: Optional[str] = None,
+        mode: Optional[str] = None,
+    ):
+        self.limit = limit
+        self.name = name
+        self.mode = mode
+        self.queries = 0
+        self.statements: List[str] = []
+        self._token = None
+
+    def record(self, sql: str) -> None:
+        self.queries += 1
+        if len(self.statements) < MAX_RECORDED:
+            self.statements.append(sql)
+
+    @property
+    def exceeded(self) -> bool:
+        return self.queries > self.limit
+
+    def __enter__(self):
+        self.queries = 0
+        self.statements = []
+        self._token = _active.set((*_active.get(), self))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _active.reset(self._token)
+        # Do not mask the error that ended the block.
+        if exc_type is None and self.exceeded:
+            self.report()
+        return False
+
+    def report(self) -> None:
+        mode = self.mode or settings.QUERY_BUDGET_MODE
+        where = f" in {self.name}" if self.name else ""
+        message = f"{self.queries} queries{where}, budget is {self.limit}"
+        if mode == RAISE:
+            statements = "\n".join(
+                f"{i}. {sql}" for i, sql in enumerate(self.statements, 1)
+            )
+            raise QueryBudgetExceeded(f"{message}:\n{statements}")
+        if mode == LOG:
+            logger.warning("Query budget exceeded: %s", message)
+
+    def __call__(self, func):
+        # A fresh budget per call, so concurrent calls count separately.
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self._copy():
+                    return await func(*args, **kwargs)
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self._copy():
+                    return func(*args, **kwargs)
+
+        return wrapper
+
+    def _copy(self) -> "QueryBudget":
+        return QueryBudget(self.limit, self.name, self.mode)
+
+
+def query_budget(
+    limit: int, name: Optional[str] = None, mode: Optional[str] = None
+) -> QueryBudget:
+    """
+    A `QueryBudget` of `limit` queries. `mode` overrides
+    `settings.QUERY_BUDGET_MODE`, e.g. `mode="raise"` in a test.
+    """
+    return QueryBudget(limit, name, mode)
+
+
+_active: contextvars.ContextVar[Tuple[QueryBudget, ...]] = (
+    contextvars.ContextVar("query_budgets", default=())
+)
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    Execute wrapper counting each query against the open budgets.
+    Savepoint statements are not counted: a test case wraps everything in
+    a transaction, which turns every `atomic()` block into savepoints that
+    the same code does not run in production.
+    """
+    budgets = _active.get()
+    if budgets and not sql.startswith(SAVEPOINT_STATEMENTS):
+        for budget in budgets:
+            budget.record(sql)
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """
+    `connection_created` receiver adding `count_query` to the connection.
+    """
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+def _budget_for(request) -> Optional[QueryBudget]:
+    match = getattr(request, "resolver_match", None)
+    if match is None or match.view_name not in BUDGETS:
+        return None
+    limit = BUDGETS[match.view_name]
+    if isinstance(limit, dict):
+        if request.method not in limit:
+            return None
+        limit = limit[request.method]
+    return QueryBudget(limit, f"{request.method} {match.view_name}")
+
+
+@sync_and_async_middleware
+def query_budget_middleware(get_response):
+    """
+    Hold each request to its budget in `BUDGETS`, see the module docstring.
+    The URL is resolved inside the view layer, so the request's queries are
+    counted against an open-ended budget and checked once it is known.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            if settings.QUERY_BUDGET_MODE == OFF:
+                return await get_response(request)
+            with QueryBudget(float("inf")) as counted:
+                response = await get_response(request)
+            budget = _budget_for(request)
+            if budget is not None:
+                _check(budget, counted)
+            return response
+
+    else:
+
+        def middleware(request):
+            if settings.QUERY_BUDGET_MODE == OFF:
+                return get_response(request)
+            with QueryBudget(float("inf")) as counted:
+                response = get_response(request)
+            budget = _budget_for(request)
+            if budget is not None:
+                _check(budget, counted)
+            return response
+
+    return middleware
+
+
+def _check(budget: QueryBudget, counted: QueryBudget) -> None:
+    budget.queries = counted.queries
+    budget.statements = counted.statements
+    if budget.exceeded:
+        budget.report()
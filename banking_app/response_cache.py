@@ -0,0 +1,99 @@
+"""
+Per-user response cache with ETag revalidation for read-heavy endpoints.
+
+Every cached response belongs to a scope (a user or an account) whose
+version stamp is part of both the cache key and the ETag. Writes call
+`invalidate()`, which replaces the stamp, so nothing is ever deleted
+entry by entry: old entries just stop being addressed and age out. A
+client sending back the current ETag in `If-None-Match` gets a 304 without
+the view running at all.
+
+Entries and stamps live in the "responses" cache of `settings.APP_CACHES`.
+Stamps are per process unless that cache is backed by a shared Django
+cache (Redis, Memcached) in multi-process deployments.
+"""
+# system imports
+import hashlib
+import uuid
+
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .caches import get_cache
+
+RESPONSE_CACHE = "responses"
+USER = "user"
+ACCOUNT = "account"
+
+
+def _version_key(scope: str, scope_id) -> str:
+    return f"v:{scope}:{scope_id}"
+
+
+def get_version(scope: str, scope_id) -> str:
+    cache = get_cache(RESPONSE_CACHE)
+    version = cache.get(_version_key(scope, scope_id))
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(_version_key(scope, scope_id), version)
+    return version
+
+
+def _bump(scope: str, scope_id) -> None:
+    get_cache(RESPONSE_CACHE).set(
+        _version_key(scope, scope_id), uuid.uuid4().hex
+    )
+
+
+def invalidate(scope: str, scope_id) -> None:
+    """
+    Retire every cached response of a scope. Stamps are replaced now, so
+    this process stops serving them at once, and again on commit, so a
+    response cached from a read that ran before the commit is retired too.
+    """
+    _bump(scope, scope_id)
+    transaction.on_commit(lambda: _bump(scope, scope_id))
+
+
+def _etag(request, scope: str, scope_id, version: str) -> str:
+    variant = "|".join(
+        [
+            str(request.user.pk),
+            request.get_full_path(),
+            request.META.get("HTTP_ACCEPT", ""),
+        ]
+    )
+    digest = hashlib.sha256(variant.encode()).hexdigest()[:16]
+    return f'"{scope}-{scope_id}-{version}-{digest}"'
+
+
+def _matches(request, etag: str) -> bool:
+    header = request.META.get("HTTP_IF_NONE_MATCH", "")
+    candidates = [tag.strip() for tag in header.split(",")]
+    # No "*": it would answer 304 for a scope the view never checked the
+    # user can read. A specific ETag already carries the user's id.
+    return etag in candidates
+
+
+def cached_response(request, scope: str, scope_id, build) -> Response:
+    """
+    Answer a GET from the cache, or with 304 when the client already holds
+    the current representation; otherwise call `build()` and cache a 200.
+    """
+    etag = _etag(request, scope, scope_id, get_version(scope, scope_id))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cache = get_cache(RESPONSE_CACHE)
+    data = cache.get(etag)
+    if data is not None:
+        return Response(data, headers=headers)
+
+    response = build()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(etag, response.data)
+        for header, value in headers.items():
+            response[header] = value
+    return response
@@ -0,0 +1,57 @@
+"""
+Primary/replica database routing.
+
+All writes and ordinary reads go to the primary. Code that can tolerate
+replication lag opts in with `replica_reads()`, and the reads made inside
+it are spread across the configured replicas.
+"""
+# system imports
+import contextlib
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_replica_reads = contextvars.ContextVar("replica_reads", default=False)
+
+
+@contextlib.contextmanager
+def replica_reads():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def iterate_on_replica(iterable):
+    """
+    Consume `iterable` with replica reads enabled, for streaming responses
+    whose queries run after the view has returned.
+    """
+    with replica_reads():
+        yield from iterable
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get():
+            replicas = replica_aliases()
+            if replicas:
+                return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
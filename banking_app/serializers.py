@@ -1,10 +1,21 @@
-from rest_framework import serializers
-from .models import User, Account, Transaction
-from banking_app import services
+from decimal import Decimal
 
+from rest_framework import serializers
+from .models import (
+    User,
+    Account,
+    JournalEntry,
+    Posting,
+    QueuedTransaction,
+    Transaction,
+)
+from banking_app import exports, response_cache, services
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.urls import reverse
 
-from banking_app.constants import TYPE
+from banking_app.constants import MONTH, ROLLUP_PERIODS, TYPE
 
 User = get_user_model()
 
@@ -52,6 +63,7 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         if password:
             instance.set_password(password)
         instance.save()
+        response_cache.invalidate(response_cache.USER, instance.id)
         return instance
 
 
@@ -64,7 +76,23 @@ class AccountSerializer(serializers.ModelSerializer):
     class Meta:
         model = Account
         fields = "__all__"
-        read_only_fields = ["id", "account_number"]
+        read_only_fields = ["id", "user", "account_number", "balance_shards"]
+
+    def to_representation(self, account):
+        data = super().to_representation(account)
+        # A sharded account's `amount` leaves out what its shards hold; show
+        # the whole balance when the queryset annotated it.
+        balance = getattr(account, "balance", None)
+        if account.balance_shards > 1 and balance is not None:
+            data["amount"] = self.fields["amount"].to_representation(balance)
+        return data
+
+
+class AccountSummarySerializer(serializers.Serializer):
+    # Sums of any number of amounts: no digit limit to overflow.
+    total_credits = serializers.DecimalField(max_digits=None, decimal_places=2)
+    total_debits = serializers.DecimalField(max_digits=None, decimal_places=2)
+    transaction_count = serializers.IntegerField()
 
 
 class TransactionSerializer(serializers.ModelSerializer):
@@ -73,4 +101,137 @@ class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
         fields = "__all__"
-        read_only_fields = ["id", "timestamp", "ip_address", "account"]
+        read_only_fields = [
+            "id",
+            "timestamp",
+            "ip_address",
+            "account",
+            "running_balance",
+        ]
+
+
+class BulkTransactionItemSerializer(serializers.Serializer):
+    """
+    A single line of a bulk transaction upload.
+    """
+
+    account = serializers.IntegerField(required=False)
+    amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal("0.01")
+    )
+    description = serializers.CharField(max_length=100)
+    type = serializers.ChoiceField(choices=TYPE)
+
+
+class BulkTransactionSerializer(serializers.Serializer):
+    ATOMIC = "atomic"
+    PARTIAL = "partial"
+
+    mode = serializers.ChoiceField(
+        choices=[ATOMIC, PARTIAL], default=ATOMIC
+    )
+    transactions = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.BULK_TRANSACTIONS_MAX_ITEMS,
+    )
+
+
+class QueuedTransactionSerializer(serializers.ModelSerializer):
+    transaction = TransactionSerializer(read_only=True)
+    status_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = QueuedTransaction
+        fields = [
+            "id",
+            "account",
+            "amount",
+            "description",
+            "type",
+            "status",
+            "error",
+            "transaction",
+            "created_at",
+            "processed_at",
+            "status_url",
+        ]
+        read_only_fields = fields
+
+    def get_status_url(self, queued):
+        url = reverse("queued-transaction", args=[queued.id])
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
+
+class TransferSerializer(serializers.Serializer):
+    source_account = serializers.IntegerField()
+    destination_account_number = serializers.CharField()
+    amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal("0.01")
+    )
+    description = serializers.CharField(max_length=100)
+
+
+class PostingSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Posting
+        fields = ["account", "transaction", "amount"]
+
+
+class JournalEntrySerializer(serializers.ModelSerializer):
+    postings = PostingSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = JournalEntry
+        fields = ["id", "description", "ip_address", "created_at", "postings"]
+
+
+class StatementQuerySerializer(serializers.Serializer):
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    export = serializers.ChoiceField(
+        choices=list(exports.CONTENT_TYPES), default=exports.CSV
+    )
+
+
+class AggregatesQuerySerializer(serializers.Serializer):
+    group_by = serializers.ChoiceField(choices=ROLLUP_PERIODS, default=MONTH)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, data):
+        start, end = data.get("start"), data.get("end")
+        if start and end and start > end:
+            raise serializers.ValidationError("'start' must not be after 'end'.")
+        return data
+
+
+class AccountDashboardSerializer(AccountSerializer):
+    """
+    Account with optional embedded data, selected by the `include` context
+    entry: "recent_transactions" (expects a `recent_transactions` attribute
+    prefetched on each account) and "summary" (expects `total_credits`,
+    `total_debits` and `transaction_count` annotations).
+    """
+
+    OPTIONAL_FIELDS = ("recent_transactions", "summary")
+
+    recent_transactions = TransactionSerializer(many=True, read_only=True)
+    summary = serializers.SerializerMethodField()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        include = self.context.get("include", ())
+        for name in self.OPTIONAL_FIELDS:
+            if name not in include:
+                self.fields.pop(name)
+
+    def get_summary(self, account):
+        return AccountSummarySerializer(
+            {
+                "total_credits": account.total_credits or 0,
+                "total_debits": account.total_debits or 0,
+                "transaction_count": account.transaction_count,
+            }
+        ).data
@@ -1,26 +1,58 @@
 # 3rd party imports
 import jwt
-import requests
 
 from rest_framework import status
 from rest_framework.response import Response
 
 # system imports
+import os
 import time
 import random
+import threading
 import dataclasses
 import datetime
+import functools
+import ipaddress
 from django.conf import settings
-from typing import Optional, TYPE_CHECKING
-from decimal import Decimal
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    IntegrityError,
+    connection,
+    connections,
+    transaction,
+)
+from django.utils import timezone
+from django.db.models import (
+    Count,
+    DecimalField,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    Window,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import (
+    Coalesce,
+    RowNumber,
+    TruncDate,
+    TruncMonth,
+)
+from typing import Dict, Iterable, List, Optional, TYPE_CHECKING, Union
+from decimal import Decimal, InvalidOperation
 
 
-from banking_app import models
+from banking_app import models, response_cache
+from .caches import get_cache
 from .constants import *
 from .exceptions import *
 
 if TYPE_CHECKING:
-    from .models import User, Account, Transaction
+    from .models import User, Account, JournalEntry, Transaction
+
+BALANCE_SHARD_CACHE = "balance_shards"
 
 
 @dataclasses.dataclass
@@ -61,6 +93,8 @@ def find_user_by_email(email: str) -> Optional["User"]:
 
 
 def create_token(user_id: int) -> str:
+    # Legacy id-only token, superseded by tokens.issue_tokens at login. Still
+    # accepted (resolved through the user cache) and used by the benchmarks.
     payload = {
         "id": user_id,
         "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=24),
@@ -85,7 +119,178 @@ def delete_user(user_email):
     return "User deleted successfully"
 
 
+def account_number_check_digit(body: str) -> str:
+    """
+    Luhn check digit for a string of digits.
+    """
+    total = 0
+    for position, digit in enumerate(reversed(body)):
+        value = int(digit)
+        if position % 2 == 0:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return str((10 - total % 10) % 10)
+
+
+def is_valid_account_number(account_number: str) -> bool:
+    return (
+        len(account_number) == ACCOUNT_NUMBER_LENGTH
+        and account_number.isdigit()
+        and account_number_check_digit(account_number[:-1])
+        == account_number[-1]
+    )
+
+
+class AccountNumberAllocator:
+    """
+    Hands out unique, fixed-width account numbers.
+
+    Each process reserves a block of sequence values from the database with
+    one atomic UPDATE and then allocates from it in memory, so opening an
+    account normally costs no database round trip and numbers never collide
+    between processes. A block is dropped after a fork so parent and child
+    never share one.
+
+    A reservation made inside the caller's transaction would be undone if
+    that transaction rolled back, so inside an atomic block it is committed
+    on a private connection instead. SQLite serializes writers on the whole
+    file, so there the reservation has to join the caller's transaction.
+    Such a block stays pending: only that transaction allocates from it,
+    and only as long as the `on_commit` hook it registered is still queued,
+    which a rollback (of a savepoint, too) discards. Once the transaction
+    commits, what is left of the block becomes the process's block.
+    """
+
+    SEQUENCE_NAME = "account_number"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next = self._end = 0
+        self._pid = None
+        self._connection = None
+        self._pending = None
+
+    def allocate(self) -> str:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._next = self._end = 0
+                self._connection = None
+                self._pending = None
+                self._pid = os.getpid()
+            if self._next < self._end:
+                value = self._next
+                self._next += 1
+            elif connection.in_atomic_block and connection.vendor == "sqlite":
+                value = self._allocate_pending()
+            else:
+                self._reserve_block()
+                value = self._next
+                self._next += 1
+        body = str(value).zfill(ACCOUNT_NUMBER_LENGTH - 1)
+        return body + account_number_check_digit(body)
+
+    def _reserve_block(self):
+        size = settings.ACCOUNT_NUMBER_BLOCK_SIZE
+        end = self._reserve(size)
+        self._next, self._end = end - size, end
+
+    def _allocate_pending(self) -> int:
+        pending = self._pending
+        if (
+            pending is None
+            or pending["connection"] is not connection
+            or pending["next"] >= pending["end"]
+            or not any(
+                func is pending["commit"]
+                for _, func in connection.run_on_commit
+            )
+        ):
+            size = settings.ACCOUNT_NUMBER_BLOCK_SIZE
+            end = self._reserve(size)
+            pending = {
+                "connection": connection,
+                "next": end - size,
+                "end": end,
+            }
+
+            def commit():
+                with self._lock:
+                    if self._pending is pending:
+                        self._pending = None
+                    if self._next >= self._end:
+                        self._next, self._end = pending["next"], pending["end"]
+
+            pending["commit"] = commit
+            transaction.on_commit(commit)
+            self._pending = pending
+        value = pending["next"]
+        pending["next"] += 1
+        return value
+
+    def _reserve(self, size: int) -> int:
+        """
+        Reserve `size` sequence values and return the end of the range.
+        """
+        if connection.in_atomic_block and connection.vendor != "sqlite":
+            end = self._reserve_on_private_connection(size)
+        else:
+            sequence = models.Sequence.objects.filter(name=self.SEQUENCE_NAME)
+            with transaction.atomic():
+                sequence.update(next_value=F("next_value") + size)
+                end = sequence.values_list("next_value", flat=True).first()
+        if end is None:
+            raise RuntimeError(
+                f"Sequence {self.SEQUENCE_NAME!r} is missing; run migrations"
+            )
+        if end - 1 >= 10 ** (ACCOUNT_NUMBER_LENGTH - 1):
+            raise RuntimeError("Account number space is exhausted")
+        return end
+
+    def _reserve_on_private_connection(self, size: int) -> Optional[int]:
+        if self._connection is None:
+            self._connection = connections.create_connection(
+                DEFAULT_DB_ALIAS
+            )
+            # Only ever used under self._lock, from whichever thread holds it.
+            self._connection.inc_thread_sharing()
+        private = self._connection
+        table = private.ops.quote_name(models.Sequence._meta.db_table)
+
+        private.ensure_connection()
+        private.set_autocommit(False)
+        try:
+            with private.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {table} SET next_value = next_value + %s "
+                    f"WHERE name = %s",
+                    [size, self.SEQUENCE_NAME],
+                )
+                cursor.execute(
+                    f"SELECT next_value FROM {table} WHERE name = %s",
+                    [self.SEQUENCE_NAME],
+                )
+                row = cursor.fetchone()
+            private.commit()
+        except Exception:
+            private.rollback()
+            raise
+        finally:
+            private.set_autocommit(True)
+        return row[0] if row else None
+
+
+_account_number_allocator = AccountNumberAllocator()
+
+
+def allocate_account_number():
+    return _account_number_allocator.allocate()
+
+
 def generate_account_number():
+    # Superseded by allocate_account_number; kept because migration 0002
+    # references it as the field default.
     # Get current timestamp
     timestamp = int(time.time())
     # Generate random string of length 6
@@ -97,13 +302,317 @@ def generate_account_number():
     return account_number
 
 
+def _balance_or_zero():
+    return Coalesce(
+        F("amount"), Value(Decimal("0.00"), output_field=DecimalField())
+    )
+
+
+def _shard_total():
+    """
+    Sum of the balance shards of the account in the outer query.
+    """
+    shards = (
+        models.AccountBalanceShard.objects.filter(account=OuterRef("pk"))
+        .values("account")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    return Coalesce(
+        Subquery(shards[:1], output_field=DecimalField()),
+        Value(Decimal("0.00"), output_field=DecimalField()),
+    )
+
+
+def with_balance(queryset):
+    """
+    Annotate accounts with `balance`: `amount` plus their balance shards.
+    """
+    return queryset.annotate(balance=_balance_or_zero() + _shard_total())
+
+
+def to_transaction_amount(amount) -> Decimal:
+    """
+    Coerce a request amount into a positive two-place Decimal.
+    """
+    try:
+        amount = Decimal(str(amount))
+    except (InvalidOperation, TypeError, ValueError):
+        raise InvalidTransactionAmountError
+    if not amount.is_finite() or amount <= 0:
+        raise InvalidTransactionAmountError
+    return amount.quantize(Decimal("0.01"))
+
+
+@functools.lru_cache(maxsize=8)
+def _trusted_networks(proxies: tuple) -> tuple:
+    return tuple(ipaddress.ip_network(proxy, strict=False) for proxy in proxies)
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        ip in network
+        for network in _trusted_networks(tuple(settings.TRUSTED_PROXIES))
+    )
+
+
+def get_client_ip(request) -> str:
+    """
+    Resolve the address of the client behind any trusted proxies.
+
+    X-Forwarded-For is only honoured when the direct peer is listed in
+    `settings.TRUSTED_PROXIES`; hops are then walked from the right, skipping
+    trusted proxies, and the first untrusted hop is the client. The result is
+    stored on the request so repeated calls do no parsing.
+    """
+    http_request = getattr(request, "_request", request)
+    ip = getattr(http_request, "_client_ip", None)
+    if ip is not None:
+        return ip
+
+    ip = http_request.META.get("REMOTE_ADDR", "")
+    if _is_trusted_proxy(ip):
+        forwarded = http_request.META.get("HTTP_X_FORWARDED_FOR", "")
+        for hop in reversed([h.strip() for h in forwarded.split(",")]):
+            try:
+                ipaddress.ip_address(hop)
+            except ValueError:
+                break
+            ip = hop
+            if not _is_trusted_proxy(hop):
+                break
+
+    http_request._client_ip = ip
+    return ip
+
+
+def recent_transactions(limit: int, **filters):
+    """
+    Queryset of the `limit` most recent transactions of every account
+    matching `filters` (lookups on Transaction).
+
+    Ranks rows per account with a window function in a subquery, so it can
+    back a bounded `Prefetch` that loads a few rows per account in one
+    query.
+    """
+    ranked = (
+        models.Transaction.objects.filter(**filters)
+        .annotate(
+            row_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F("account_id")],
+                order_by=[F("timestamp").desc(), F("id").desc()],
+            )
+        )
+        .values("id", "row_rank")
+    )
+    sql, params = ranked.query.sql_with_params()
+    return models.Transaction.objects.filter(
+        id__in=RawSQL(
+            f"SELECT id FROM ({sql}) ranked WHERE row_rank <= %s",
+            (*params, limit),
+        )
+    ).order_by("-timestamp", "-id")
+
+
+STATEMENT_COLUMNS = (
+    "id",
+    "timestamp",
+    "type",
+    "description",
+    "amount",
+    "balance",
+)
+
+
 class TransactionService:
-    def get_account_by_id(self, account_id: int) -> "Account":
+    def get_account_by_id(
+        self, account_id: int, for_update: bool = False
+    ) -> "Account":
+        queryset = models.Account.objects.all()
+        if for_update:
+            queryset = queryset.select_for_update(no_key=True)
         try:
-            return models.Account.objects.get(id=account_id)
+            return queryset.get(id=account_id)
         except models.Account.DoesNotExist:
             raise AccountNotFoundError
 
+    def get_balance_shards(self, account_id: int) -> int:
+        """
+        Shard count of an account, cached per process. A stale count only
+        sends a credit to `Account.amount` or to a shard that no longer
+        exists (which then falls back to `Account.amount`), never loses it.
+        """
+        cache = get_cache(BALANCE_SHARD_CACHE)
+        shards = cache.get(account_id)
+        if shards is None:
+            shards = (
+                models.Account.objects.filter(id=account_id)
+                .values_list("balance_shards", flat=True)
+                .first()
+            ) or 0
+            cache.set(account_id, shards)
+        return shards
+
+    def credit_account(
+        self, account_id: int, amount: Decimal
+    ) -> Optional[Decimal]:
+        """
+        Atomically add `amount` to the account balance and return the new
+        balance, or None for a sharded account, whose exact balance after
+        this write cannot be known without locking every shard.
+        """
+        # Only a cached shard count is used. Looking it up here would make a
+        # read the first statement of the caller's transaction, and sqlite
+        # cannot upgrade that to a write while other writers are active.
+        # Without a cached count the credit goes to `Account.amount`, which
+        # is always correct, and the write below caches the count.
+        shards = get_cache(BALANCE_SHARD_CACHE).get(account_id) or 0
+        if shards > 1 and models.AccountBalanceShard.objects.filter(
+            account_id=account_id, shard=random.randrange(shards)
+        ).update(amount=F("amount") + amount):
+            return None
+
+        updated = models.Account.objects.filter(id=account_id).update(
+            amount=_balance_or_zero() + amount
+        )
+        if not updated:
+            raise AccountNotFoundError
+        return self._balance_after_write(account_id)
+
+    def debit_account(
+        self, account_id: int, amount: Decimal
+    ) -> Optional[Decimal]:
+        """
+        Atomically subtract `amount` from the account balance and return the
+        new balance (None for a sharded account, see `credit_account`).
+
+        The overdraft check is part of the UPDATE's WHERE clause, so the check
+        and the write happen in a single statement and concurrent debits can
+        never drive the balance below zero. When `Account.amount` alone is
+        short, the balance shards are consolidated into it and the debit is
+        retried once.
+        """
+        debit = models.Account.objects.filter(id=account_id, amount__gte=amount)
+        updated = debit.update(amount=F("amount") - amount)
+        if not updated and self.consolidate_balance_shards(account_id):
+            updated = debit.update(amount=F("amount") - amount)
+        if not updated:
+            if not models.Account.objects.filter(id=account_id).exists():
+                raise AccountNotFoundError
+            raise InsufficientFundsError
+        return self._balance_after_write(account_id)
+
+    def _balance_after_write(self, account_id: int) -> Optional[Decimal]:
+        # Once the UPDATE has run, this transaction holds the row lock, so
+        # the value read back is exactly the balance our write produced --
+        # unless credits can still land on the account's shards.
+        row = (
+            models.Account.objects.filter(id=account_id)
+            .values_list("amount", "balance_shards")
+            .first()
+        )
+        if row is None:
+            return Decimal("0.00")
+        amount, shards = row
+        get_cache(BALANCE_SHARD_CACHE).set(account_id, shards)
+        if shards > 1:
+            return None
+        return amount if amount is not None else Decimal("0.00")
+
+    def get_balance(self, account_id: int) -> Decimal:
+        balance = (
+            with_balance(models.Account.objects.filter(id=account_id))
+            .values_list("balance", flat=True)
+            .first()
+        )
+        if balance is None:
+            return Decimal("0.00")
+        # sqlite hands back the sum without its decimal places.
+        return Decimal(balance).quantize(Decimal("0.01"))
+
+    def consolidate_balance_shards(self, account_id: int) -> Decimal:
+        """
+        Move everything held in the account's balance shards into
+        `Account.amount` and return the amount moved.
+
+        Locks the account row before its shards, the same order as
+        `set_balance_shards`. Must be called inside a database transaction.
+        """
+        shards = models.AccountBalanceShard.objects.filter(
+            account_id=account_id
+        )
+        if not shards.exists():
+            return Decimal("0.00")
+        # NO KEY: a plain FOR UPDATE would also block the key-share lock that
+        # inserting a transaction takes on its account (PostgreSQL), so a
+        # credit holding a shard lock and this would wait on each other.
+        # Nothing here changes the account's key; the same goes for every
+        # account lock in this module.
+        list(
+            models.Account.objects.select_for_update(no_key=True)
+            .filter(id=account_id)
+            .values_list("id")
+        )
+        held = sum(
+            shards.select_for_update()
+            .order_by("shard")
+            .values_list("amount", flat=True),
+            Decimal("0.00"),
+        )
+        if held:
+            shards.update(amount=Decimal("0.00"))
+            models.Account.objects.filter(id=account_id).update(
+                amount=_balance_or_zero() + held
+            )
+        return held
+
+    def set_balance_shards(self, account_id: int, count: int) -> None:
+        """
+        Spread future credits to the account over `count` balance shards;
+        0 or 1 turns sharding off. The balance itself does not change.
+        """
+        count = count if count > 1 else 0
+        with transaction.atomic():
+            locked = (
+                models.Account.objects.select_for_update(no_key=True)
+                .filter(id=account_id)
+                .values_list("id", flat=True)
+            )
+            if not locked:
+                raise AccountNotFoundError
+            self.consolidate_balance_shards(account_id)
+            models.AccountBalanceShard.objects.filter(
+                account_id=account_id
+            ).delete()
+            models.AccountBalanceShard.objects.bulk_create(
+                models.AccountBalanceShard(account_id=account_id, shard=shard)
+                for shard in range(count)
+            )
+            models.Account.objects.filter(id=account_id).update(
+                balance_shards=count
+            )
+            response_cache.invalidate(response_cache.ACCOUNT, account_id)
+
+            # Credits read the count from this cache only (see
+            # credit_account); a stale count is harmless either way.
+            cache = get_cache(BALANCE_SHARD_CACHE)
+            cache.set(account_id, count)
+            transaction.on_commit(lambda: cache.set(account_id, count))
+
+    def apply_balance_change(
+        self, account_id: int, amount: Decimal, transaction_type: str
+    ) -> Optional[Decimal]:
+        if transaction_type == CREDIT:
+            return self.credit_account(account_id, amount)
+        if transaction_type == DEBIT:
+            return self.debit_account(account_id, amount)
+        raise InvalidTransactionTypeError
+
     def create_transaction(
         self,
         account: "Account",
@@ -112,31 +621,512 @@ class TransactionService:
         transaction_type: str,
         ip_address: str,
     ) -> "Transaction":
-        if transaction_type == CREDIT:
-            account.amount += amount
-        elif transaction_type == DEBIT:
-            if account.amount < amount:
-                raise InsufficientFundsError
-            account.amount -= amount
-        else:
+        """
+        Apply a credit or debit to `account` and record it.
+
+        Must be called inside a database transaction so the balance update
+        and the transaction row commit together.
+        """
+        if transaction_type not in (CREDIT, DEBIT):
             raise InvalidTransactionTypeError
+        amount = to_transaction_amount(amount)
 
-        account.save()
+        balance = self.apply_balance_change(
+            account.id, amount, transaction_type
+        )
 
-        return models.Transaction.objects.create(
+        created = models.Transaction.objects.create(
             account=account,
             amount=amount,
             description=description,
             type=transaction_type,
             ip_address=ip_address,
+            running_balance=balance,
         )
+        # Sharded accounts have no exact balance to record; their history
+        # is replayed from the current balance instead.
+        date = timezone.localdate(created.timestamp)
+        if balance is not None:
+            account.amount = balance
+            self.record_balance_snapshot(account.id, date, balance)
+        self.record_rollup(account.id, date, transaction_type, amount)
+        response_cache.invalidate(response_cache.ACCOUNT, account.id)
+        return created
 
-    def get_client_ip(self, request):
-        x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(",")[0]
+    def record_balance_snapshot(
+        self, account_id: int, date: datetime.date, balance: Decimal
+    ) -> None:
+        """
+        Store `balance` as the closing balance of `account_id` for `date`.
+
+        Callers hold the account's row lock, so snapshot writes for one
+        account never race each other.
+        """
+        snapshots = models.AccountBalanceSnapshot.objects.filter(
+            account_id=account_id, date=date
+        )
+        if snapshots.update(balance=balance):
+            return
+        try:
+            with transaction.atomic():
+                models.AccountBalanceSnapshot.objects.create(
+                    account_id=account_id, date=date, balance=balance
+                )
+        except IntegrityError:
+            snapshots.update(balance=balance)
+
+    def record_rollup(
+        self,
+        account_id: int,
+        date: datetime.date,
+        transaction_type: str,
+        total: Decimal,
+        count: int = 1,
+    ) -> None:
+        """
+        Add `count` transactions summing to `total` to the day's rollup.
+
+        Sharded accounts add to a random shard's row, so their credits do
+        not queue on one rollup row either.
+        """
+        # Called after the balance write, which cached the shard count, so
+        # this is no read ahead of the transaction's first write.
+        shards = self.get_balance_shards(account_id)
+        shard = random.randrange(shards) if shards > 1 else 0
+        rollups = models.TransactionRollup.objects.filter(
+            account_id=account_id, date=date, type=transaction_type, shard=shard
+        )
+        changes = {"total": F("total") + total, "count": F("count") + count}
+        if rollups.update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                models.TransactionRollup.objects.create(
+                    account_id=account_id,
+                    date=date,
+                    type=transaction_type,
+                    shard=shard,
+                    total=total,
+                    count=count,
+                )
+        except IntegrityError:
+            rollups.update(**changes)
+
+    def get_aggregates(
+        self,
+        account_id: int,
+        group_by: str = MONTH,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> Dict:
+        """
+        Credit and debit totals and counts of an account between the dates
+        `start` and `end` (inclusive), overall and per day or month.
+
+        Reads the rollup rows only, so the cost grows with the number of
+        buckets, not with the number of transactions.
+        """
+        rollups = models.TransactionRollup.objects.filter(account_id=account_id)
+        if start is not None:
+            rollups = rollups.filter(date__gte=start)
+        if end is not None:
+            rollups = rollups.filter(date__lte=end)
+        period = TruncMonth("date") if group_by == MONTH else F("date")
+        rows = (
+            rollups.annotate(period=period)
+            .values("period", "type")
+            .annotate(sum_total=Sum("total"), sum_count=Sum("count"))
+            .order_by("period")
+        )
+
+        def bucket(**extra):
+            return {
+                **extra,
+                "total_credits": Decimal("0.00"),
+                "total_debits": Decimal("0.00"),
+                "credit_count": 0,
+                "debit_count": 0,
+            }
+
+        buckets = {}
+        totals = bucket()
+        for row in rows:
+            if row["type"] == CREDIT:
+                total_key, count_key = "total_credits", "credit_count"
+            elif row["type"] == DEBIT:
+                total_key, count_key = "total_debits", "debit_count"
+            else:
+                continue
+            # sqlite hands back sums without their decimal places.
+            total = Decimal(row["sum_total"]).quantize(Decimal("0.01"))
+            current = buckets.setdefault(
+                row["period"], bucket(period=row["period"])
+            )
+            for summary in (current, totals):
+                summary[total_key] += total
+                summary[count_key] += row["sum_count"]
+
+        for summary in (*buckets.values(), totals):
+            summary["net"] = summary["total_credits"] - summary["total_debits"]
+            summary["transaction_count"] = (
+                summary["credit_count"] + summary["debit_count"]
+            )
+        return {"totals": totals, "buckets": list(buckets.values())}
+
+    def rebuild_rollups(self, account_ids: Iterable[int]) -> int:
+        """
+        Recompute the rollups of `account_ids` from their transactions and
+        return how many rollup rows were written.
+
+        The accounts and their balance shards are locked first, so
+        transactions recorded meanwhile wait instead of being lost.
+        """
+        account_ids = sorted(account_ids)
+        with transaction.atomic():
+            list(
+                models.Account.objects.select_for_update(no_key=True)
+                .filter(id__in=account_ids)
+                .order_by("id")
+                .values_list("id")
+            )
+            list(
+                models.AccountBalanceShard.objects.select_for_update()
+                .filter(account_id__in=account_ids)
+                .order_by("account_id", "shard")
+                .values_list("id")
+            )
+            models.TransactionRollup.objects.filter(
+                account_id__in=account_ids
+            ).delete()
+            rows = (
+                models.Transaction.objects.filter(account_id__in=account_ids)
+                .annotate(date=TruncDate("timestamp"))
+                .values("account_id", "date", "type")
+                .annotate(total=Sum("amount"), count=Count("id"))
+                .order_by()
+            )
+            rollups = models.TransactionRollup.objects.bulk_create(
+                (models.TransactionRollup(**row) for row in rows),
+                batch_size=1000,
+            )
+        for account_id in account_ids:
+            response_cache.invalidate(response_cache.ACCOUNT, account_id)
+        return len(rollups)
+
+    def get_balance_at(
+        self, account: "Account", at: datetime.datetime
+    ) -> Decimal:
+        """
+        Balance of `account` right after everything recorded up to `at`.
+
+        Reads the last transaction of that day if there is one, otherwise the
+        closing snapshot of the most recent earlier day.
+        """
+        date = timezone.localdate(at)
+        day_start = timezone.make_aware(
+            datetime.datetime.combine(date, datetime.time.min)
+        )
+        transactions = models.Transaction.objects.filter(account=account)
+
+        last = (
+            transactions.filter(timestamp__gte=day_start, timestamp__lte=at)
+            .order_by("-timestamp", "-id")
+            .values_list("running_balance", flat=True)[:1]
+        )
+        if last:
+            if last[0] is None:
+                return self._replay_balance(account, after=at)
+            return last[0]
+
+        snapshot = (
+            models.AccountBalanceSnapshot.objects.filter(
+                account=account, date__lt=date
+            )
+            .order_by("-date")
+            .values_list("balance", flat=True)
+            .first()
+        )
+        if snapshot is not None:
+            return snapshot
+
+        # Nothing recorded before `at`.
+        return self.get_opening_balance(account)
+
+    def get_opening_balance(self, account: "Account") -> Decimal:
+        """
+        Balance of `account` before its first transaction.
+        """
+        first = (
+            models.Transaction.objects.filter(account=account)
+            .order_by("timestamp", "id")
+            .values_list("running_balance", "amount", "type")
+            .first()
+        )
+        if first is None:
+            return account.amount or Decimal("0.00")
+        running_balance, amount, transaction_type = first
+        if running_balance is None:
+            return self._replay_balance(account)
+        if transaction_type == CREDIT:
+            return running_balance - amount
+        return running_balance + amount
+
+    def _replay_balance(
+        self, account: "Account", after: Optional[datetime.datetime] = None
+    ) -> Decimal:
+        """
+        Balance of `account` before its transactions later than `after` (all
+        of them by default), worked back from the current balance. Used where
+        transactions carry no running balance, i.e. on sharded accounts.
+        """
+        transactions = models.Transaction.objects.filter(account=account)
+        if after is not None:
+            transactions = transactions.filter(timestamp__gt=after)
+        totals = transactions.aggregate(
+            credits=Sum("amount", filter=Q(type=CREDIT)),
+            debits=Sum("amount", filter=Q(type=DEBIT)),
+        )
+        return (
+            self.get_balance(account.id)
+            - (totals["credits"] or 0)
+            + (totals["debits"] or 0)
+        )
+
+    def iter_statement(
+        self,
+        account: "Account",
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+    ):
+        """
+        Yield `STATEMENT_COLUMNS` rows for the transactions of `account`
+        between `start` and `end`, oldest first.
+
+        Rows are read as plain tuples in chunks (a server-side cursor where
+        the backend supports one) and the balance is carried forward from
+        the opening balance, so no model instances are built.
+        """
+        transactions = models.Transaction.objects.filter(account=account)
+        if start is not None:
+            opening = self.get_balance_at(
+                account, start - datetime.timedelta(microseconds=1)
+            )
+            transactions = transactions.filter(timestamp__gte=start)
         else:
-            ip = request.META.get("REMOTE_ADDR")
-        if ip == "127.0.0.1" and settings.DEBUG:
-            ip = requests.get("https://api.ipify.org").text
-        return ip
+            opening = self.get_opening_balance(account)
+        if end is not None:
+            transactions = transactions.filter(timestamp__lte=end)
+
+        rows = (
+            transactions.order_by("timestamp", "id")
+            .values_list("id", "timestamp", "type", "description", "amount")
+            .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        )
+        balance = opening
+        for pk, timestamp, transaction_type, description, amount in rows:
+            if transaction_type == CREDIT:
+                balance += amount
+            elif transaction_type == DEBIT:
+                balance -= amount
+            yield (
+                pk,
+                timestamp.isoformat(),
+                transaction_type,
+                description,
+                amount,
+                balance,
+            )
+
+    def create_transactions_bulk(
+        self, items: List[Dict], ip_address: str, atomic: bool = True
+    ) -> List[Union["Transaction", Exception]]:
+        """
+        Apply a batch of already validated transactions.
+
+        Each item is a dict with `account_id`, `amount`, `description`,
+        `type` and optionally its own `ip_address`. Items are applied in
+        order against the locked balance of their account, so a debit only
+        fails if the balance left by the preceding items of the same batch
+        cannot cover it. Every touched account gets a
+        single balance UPDATE and all rows are written with one bulk_create.
+
+        Returns one entry per item: the `Transaction` or the exception that
+        rejected it. With `atomic=True` nothing is written unless every item
+        succeeds. Must be called inside a database transaction.
+        """
+        account_ids = sorted({item["account_id"] for item in items})
+        locked = (
+            models.Account.objects.select_for_update(no_key=True)
+            .filter(id__in=account_ids)
+            .order_by("id")
+        )
+        accounts = {account.id: account for account in locked}
+        sharded = set()
+        for account_id, account in accounts.items():
+            if account.balance_shards > 1:
+                sharded.add(account_id)
+                account.amount = (
+                    account.amount or Decimal("0.00")
+                ) + self.consolidate_balance_shards(account_id)
+        opening = {
+            account_id: account.amount or Decimal("0.00")
+            for account_id, account in accounts.items()
+        }
+        balances = dict(opening)
+
+        results: List[Union["Transaction", Exception]] = []
+        for item in items:
+            account_id = item["account_id"]
+            amount = item["amount"]
+            if account_id not in accounts:
+                results.append(AccountNotFoundError())
+                continue
+            if item["type"] == CREDIT:
+                balances[account_id] += amount
+            elif item["type"] == DEBIT:
+                if balances[account_id] < amount:
+                    results.append(InsufficientFundsError())
+                    continue
+                balances[account_id] -= amount
+            else:
+                results.append(InvalidTransactionTypeError())
+                continue
+            results.append(
+                models.Transaction(
+                    account=accounts[account_id],
+                    amount=amount,
+                    description=item["description"],
+                    type=item["type"],
+                    ip_address=item.get("ip_address", ip_address),
+                    running_balance=(
+                        None if account_id in sharded else balances[account_id]
+                    ),
+                )
+            )
+
+        failed = any(isinstance(result, Exception) for result in results)
+        if atomic and failed:
+            return results
+
+        for account_id, account in accounts.items():
+            delta = balances[account_id] - opening[account_id]
+            if not delta:
+                continue
+            queryset = models.Account.objects.filter(id=account_id)
+            if delta < 0:
+                queryset = queryset.filter(amount__gte=-delta)
+            if not queryset.update(amount=_balance_or_zero() + delta):
+                # Only reachable on backends without row locks, where a
+                # concurrent writer drained the balance after we read it.
+                if atomic:
+                    raise InsufficientFundsError
+                results = [
+                    InsufficientFundsError()
+                    if isinstance(result, models.Transaction)
+                    and result.account_id == account_id
+                    else result
+                    for result in results
+                ]
+                continue
+            account.amount = balances[account_id]
+            if account_id not in sharded:
+                self.record_balance_snapshot(
+                    account_id, timezone.localdate(), account.amount
+                )
+
+        created = [r for r in results if isinstance(r, models.Transaction)]
+        models.Transaction.objects.bulk_create(created, batch_size=1000)
+        rollups = {}
+        for created_transaction in created:
+            key = (
+                created_transaction.account_id,
+                timezone.localdate(created_transaction.timestamp),
+                created_transaction.type,
+            )
+            total, count = rollups.get(key, (Decimal("0.00"), 0))
+            rollups[key] = (total + created_transaction.amount, count + 1)
+        for (account_id, date, transaction_type), (total, count) in sorted(
+            rollups.items()
+        ):
+            self.record_rollup(account_id, date, transaction_type, total, count)
+        for account_id in {r.account_id for r in created}:
+            response_cache.invalidate(response_cache.ACCOUNT, account_id)
+        if created and created[0].id is None and connection.vendor == "sqlite":
+            # sqlite cannot return ids from a bulk insert, but it holds the
+            # database-wide write lock until we commit, so the newest rows
+            # are exactly ours, in insertion order.
+            ids = models.Transaction.objects.order_by("-id").values_list(
+                "id", flat=True
+            )[: len(created)]
+            for created_transaction, pk in zip(created, reversed(ids)):
+                created_transaction.id = pk
+        return results
+
+    def transfer(
+        self,
+        source_id: int,
+        destination_id: int,
+        amount: Decimal,
+        description: str,
+        ip_address: str,
+        user=None,
+    ) -> "JournalEntry":
+        """
+        Move `amount` from one account to another as one journal entry.
+
+        Both accounts are locked in id order before either balance changes, so
+        opposite transfers between the same pair cannot deadlock. Each side
+        is recorded as a `Transaction` in its account's history and as a
+        posting of the entry. Must be called inside a database transaction.
+        """
+        if source_id == destination_id:
+            raise InvalidTransferError
+        amount = to_transaction_amount(amount)
+
+        # sqlite locks the whole database on the first write, so there is
+        # no row order to impose there; the balance UPDATEs below still
+        # report a missing account.
+        if connection.features.has_select_for_update:
+            locked = (
+                models.Account.objects.select_for_update(no_key=True)
+                .filter(id__in=[source_id, destination_id])
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+            if len(locked) != 2:
+                raise AccountNotFoundError
+
+        debit = self.create_transaction(
+            models.Account(id=source_id), amount, description, DEBIT, ip_address
+        )
+        credit = self.create_transaction(
+            models.Account(id=destination_id),
+            amount,
+            description,
+            CREDIT,
+            ip_address,
+        )
+
+        entry = models.JournalEntry.objects.create(
+            user=user, description=description, ip_address=ip_address
+        )
+        models.Posting.objects.bulk_create(
+            [
+                models.Posting(
+                    entry=entry,
+                    account_id=source_id,
+                    transaction=debit,
+                    amount=-amount,
+                ),
+                models.Posting(
+                    entry=entry,
+                    account_id=destination_id,
+                    transaction=credit,
+                    amount=amount,
+                ),
+            ]
+        )
+        return entry
+
+    def get_client_ip(self, request):
+        return get_client_ip(request)
@@ -0,0 +1,156 @@
+"""
+Tuning for single-node sqlite deployments.
+
+sqlite allows one writer at a time and, in its default rollback-journal
+mode, every commit fsyncs twice and blocks readers. `configure_connection`
+applies `settings.SQLITE_PRAGMAS` (WAL, synchronous=NORMAL, ...) to every
+new connection. `GroupCommitWriter` goes further and funnels concurrent
+transaction writes through one thread that commits them in batches, so N
+requests share one commit instead of queueing for N.
+"""
+# system imports
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+
+def configure_connection(sender, connection, **kwargs):
+    """
+    `connection_created` receiver applying `settings.SQLITE_PRAGMAS`.
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+class GroupCommitWriter:
+    """
+    Apply `TransactionService.create_transaction` calls from many threads
+    on one writer thread, committing up to `max_batch` of them at a time.
+
+    The writer waits at most `max_delay` seconds after the first queued
+    write for others to join the batch. Each write runs in its own
+    savepoint, so a rejected write (e.g. insufficient funds) does not undo
+    the rest of its batch.
+    """
+
+    _STOP = object()
+
+    def __init__(self, max_batch: int = 100, max_delay: float = 0.002):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, **fields):
+        """
+        Queue a `create_transaction(**fields)` call and wait for its batch
+        to commit. Returns the created transaction or raises what the call
+        raised.
+        """
+        self._ensure_running()
+        future = Future()
+        self._queue.put((fields, future))
+        return future.result()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                self._queue.put(self._STOP)
+                self._thread.join()
+            self._thread = None
+
+    def _ensure_running(self) -> None:
+        with self._lock:
+            # A forked worker inherits the object but not the thread.
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name="group-commit-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is self._STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(
+                    timeout=max(0.0, deadline - time.monotonic())
+                )
+            except queue.Empty:
+                break
+            if item is self._STOP:
+                self._queue.put(item)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                close_old_connections()
+                self._commit(batch)
+        finally:
+            connection.close()
+
+    def _commit(self, batch) -> None:
+        from .services import TransactionService
+
+        service = TransactionService()
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for fields, future in batch:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append(
+                                (future, service.create_transaction(**fields))
+                            )
+                    except Exception as exc:
+                        outcomes.append((future, exc))
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+
+        for future, outcome in outcomes:
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+
+_group_commit_writer = GroupCommitWriter()
+
+
+def get_group_commit_writer() -> Optional[GroupCommitWriter]:
+    """
+    The shared writer when `settings.GROUP_COMMIT_ENABLED`, else None.
+    """
+    if not settings.GROUP_COMMIT_ENABLED:
+        return None
+    _group_commit_writer.max_batch = settings.GROUP_COMMIT_MAX_BATCH
+    _group_commit_writer.max_delay = settings.GROUP_COMMIT_MAX_DELAY
+    return _group_commit_writer
+
+
+def stop_group_commit_writer() -> None:
+    _group_commit_writer.stop()
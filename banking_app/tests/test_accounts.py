@@ -1,12 +1,27 @@
+import jwt
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 
-from banking_app.models import Account
+from decimal import Decimal
+
+from banking_app.caches import get_cache
+from banking_app.models import Account, AccountBalanceShard, Transaction
 from banking_app.serializers import AccountSerializer
 from banking_app.tests.test_setup import SetUp
 from banking_app.models import User
-from banking_app.services import generate_account_number
+from banking_app.services import (
+    BALANCE_SHARD_CACHE,
+    AccountNumberAllocator,
+    TransactionService,
+    allocate_account_number,
+    is_valid_account_number,
+)
 
 
 class AccountTests(SetUp):
@@ -59,3 +74,349 @@ class AccountTests(SetUp):
         url = reverse("accounts-detail", args=[account.id])
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_account_belongs_to_the_caller(self):
+        other = User.objects.create_user(
+            first_name="Other",
+            last_name="User",
+            phone_number="0000000000",
+            email="other@example.com",
+            password="testpass123",
+        )
+        response = self.client.post(
+            self.accounts_url, {"account_name": "Mine", "user": other.id}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        account = Account.objects.get(id=response.data["id"])
+        self.assertEqual(account.user, self.user)
+
+        url = reverse("accounts-detail", args=[account.id])
+        self.client.patch(url, {"user": other.id})
+        account.refresh_from_db()
+        self.assertEqual(account.user, self.user)
+
+
+class AccountNumberTests(SetUp):
+    def test_account_numbers_are_unique_and_check_digited(self):
+        allocator = AccountNumberAllocator()
+        numbers = [allocator.allocate() for _ in range(2500)]
+        self.assertEqual(len(set(numbers)), len(numbers))
+        for number in numbers:
+            self.assertEqual(len(number), 10)
+            self.assertTrue(is_valid_account_number(number))
+
+    def test_numbers_come_from_reserved_blocks(self):
+        allocator = AccountNumberAllocator()
+        with self.settings(ACCOUNT_NUMBER_BLOCK_SIZE=100):
+            with self.assertNumQueries(4):
+                # One reservation (savepoint, UPDATE, SELECT, release)
+                numbers = [allocator.allocate() for _ in range(100)]
+            with self.assertNumQueries(4):
+                numbers.append(allocator.allocate())
+        self.assertEqual(len(set(numbers)), 101)
+
+    def test_rolled_back_reservation_is_not_reused(self):
+        first, second = AccountNumberAllocator(), AccountNumberAllocator()
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                first.allocate()
+                raise ValueError
+        # `second` stands in for another process reserving next.
+        mine = {first.allocate() for _ in range(5)}
+        theirs = {second.allocate() for _ in range(5)}
+        self.assertFalse(mine & theirs)
+
+    def test_check_digit_catches_typos(self):
+        number = allocate_account_number()
+        typo = number[:3] + str((int(number[3]) + 1) % 10) + number[4:]
+        self.assertFalse(is_valid_account_number(typo))
+
+
+class AccountDashboardTests(SetUp):
+    accounts_url = reverse("accounts-list")
+
+    def setUp(self):
+        super().setUp()
+        other = User.objects.create_user(
+            first_name="Other",
+            last_name="User",
+            phone_number="123",
+            email="other@example.com",
+            password="pass12345",
+        )
+        Account.objects.create(account_name="Not mine", user=other)
+
+    def add_accounts(self, count):
+        for i in range(count):
+            account = Account.objects.create(
+                account_name=f"Account {i}", user=self.user, amount=0
+            )
+            Transaction.objects.bulk_create(
+                Transaction(
+                    account=account,
+                    amount=10,
+                    description=f"Deposit {n}",
+                    type="credit" if n % 2 else "debit",
+                    ip_address="127.0.0.1",
+                )
+                for n in range(8)
+            )
+
+    def test_list_is_scoped_to_user(self):
+        self.add_accounts(2)
+        response = self.client.get(self.accounts_url)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(
+            {account["user"] for account in response.data}, {self.user.id}
+        )
+
+    def test_dashboard_query_count_is_fixed(self):
+        params = {"include": "recent_transactions,summary", "recent_limit": 3}
+        self.client.get(self.accounts_url)
+        for count in (2, 5):
+            self.add_accounts(count - Account.objects.filter(user=self.user).count())
+            with self.assertNumQueries(2):
+                response = self.client.get(self.accounts_url, params)
+            self.assertEqual(len(response.data), count)
+
+        account = response.data[0]
+        self.assertEqual(len(account["recent_transactions"]), 3)
+        self.assertEqual(
+            [t["description"] for t in account["recent_transactions"]],
+            ["Deposit 7", "Deposit 6", "Deposit 5"],
+        )
+        self.assertEqual(account["summary"]["transaction_count"], 8)
+        self.assertEqual(account["summary"]["total_credits"], "40.00")
+
+    def test_summary_of_a_busy_account(self):
+        account = Account.objects.create(
+            account_name="Busy", user=self.user, amount=0
+        )
+        Transaction.objects.bulk_create(
+            Transaction(
+                account=account,
+                amount=Decimal("99999999.99"),
+                description=f"Deposit {n}",
+                type="credit",
+                ip_address="127.0.0.1",
+            )
+            for n in range(101)
+        )
+        response = self.client.get(self.accounts_url, {"include": "summary"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data[0]["summary"]["total_credits"], "10099999998.99"
+        )
+
+    def test_plain_list_has_no_embedded_data(self):
+        self.add_accounts(1)
+        response = self.client.get(self.accounts_url)
+        self.assertNotIn("recent_transactions", response.data[0])
+        self.assertNotIn("summary", response.data[0])
+
+
+class AccountBalanceShardTests(SetUp):
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(
+            account_name="Merchant", user=self.user, amount=10
+        )
+        self.service = TransactionService()
+        self.service.set_balance_shards(self.account.id, 4)
+        self.url = reverse("transaction-list", args=[self.account.id])
+
+    def post(self, amount, transaction_type):
+        return self.client.post(
+            self.url,
+            {"amount": amount, "description": "Sale", "type": transaction_type},
+        )
+
+    def shard_total(self):
+        return sum(
+            AccountBalanceShard.objects.filter(
+                account=self.account
+            ).values_list("amount", flat=True)
+        )
+
+    def test_credits_land_on_shards(self):
+        for _ in range(5):
+            self.assertEqual(self.post("20", "credit").status_code, 201)
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("10.00"))
+        self.assertEqual(self.shard_total(), Decimal("100.00"))
+        self.assertEqual(
+            self.service.get_balance(self.account.id), Decimal("110.00")
+        )
+        self.assertIsNone(Transaction.objects.first().running_balance)
+
+    def test_account_locks_leave_its_key_shareable(self):
+        self.post("20", "credit")
+        locks = []
+
+        def run_without_lock(execute, sql, params, many, context):
+            # sqlite has no row locks: record the clause, then drop it.
+            if " FOR " in sql:
+                locks.append(sql)
+                sql = sql.replace(" FOR NO KEY UPDATE", "")
+                sql = sql.replace(" FOR UPDATE", "")
+            return execute(sql, params, many, context)
+
+        with mock.patch.multiple(
+            connection.features,
+            has_select_for_update=True,
+            has_select_for_no_key_update=True,
+        ), connection.execute_wrapper(run_without_lock):
+            with transaction.atomic():
+                self.service.consolidate_balance_shards(self.account.id)
+            self.service.set_balance_shards(self.account.id, 2)
+            self.service.rebuild_rollups([self.account.id])
+
+        account_locks = [
+            sql for sql in locks if 'FROM "banking_app_account"' in sql
+        ]
+        self.assertGreaterEqual(len(account_locks), 3)
+        for sql in account_locks:
+            self.assertTrue(sql.endswith("FOR NO KEY UPDATE"), sql)
+
+    def test_cold_shard_count_credit_writes_first(self):
+        get_cache(BALANCE_SHARD_CACHE).clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.post("20", "credit").status_code, 201)
+        sql = [q["sql"] for q in queries.captured_queries]
+        # Inside the transaction (a savepoint here), the balance write comes
+        # before any read.
+        start = next(i for i, s in enumerate(sql) if s.startswith("SAVEPOINT"))
+        statements = [
+            s
+            for s in sql[start:]
+            if not s.startswith(("SAVEPOINT", "RELEASE"))
+        ]
+        self.assertTrue(statements[0].startswith("UPDATE"), statements[0])
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("30.00"))
+
+        self.post("20", "credit")
+        self.assertEqual(self.shard_total(), Decimal("20.00"))
+
+    def test_debit_consolidates_shards_when_needed(self):
+        self.post("50", "credit")
+        response = self.post("55", "debit")
+        self.assertEqual(response.status_code, 201)
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("5.00"))
+        self.assertEqual(self.shard_total(), Decimal("0.00"))
+
+    def test_debit_beyond_whole_balance_fails(self):
+        self.post("50", "credit")
+        response = self.post("60.01", "debit")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.service.get_balance(self.account.id), Decimal("60.00")
+        )
+
+    def test_reads_report_the_whole_balance(self):
+        self.post("50", "credit")
+        balance = self.client.get(
+            reverse("account-balance", args=[self.account.id])
+        )
+        self.assertEqual(balance.data["balance"], Decimal("60.00"))
+        accounts = self.client.get(reverse("accounts-list"))
+        self.assertEqual(accounts.data[0]["amount"], "60.00")
+
+    def test_statement_replays_balances(self):
+        self.post("50", "credit")
+        self.post("15", "debit")
+        statement = self.client.get(
+            reverse("account-statement", args=[self.account.id]),
+            {"export": "ndjson"},
+        )
+        balances = [
+            line.split(b'"balance": ')[1]
+            for line in b"".join(statement.streaming_content).splitlines()
+        ]
+        self.assertEqual(len(balances), 2)
+        self.assertIn(b"60.00", balances[0])
+        self.assertIn(b"45.00", balances[1])
+
+    def test_turning_sharding_off_keeps_the_balance(self):
+        self.post("50", "credit")
+        self.service.set_balance_shards(self.account.id, 0)
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance_shards, 0)
+        self.assertEqual(self.account.amount, Decimal("60.00"))
+        self.assertFalse(
+            AccountBalanceShard.objects.filter(account=self.account).exists()
+        )
+
+
+class AccountResponseCacheTests(SetUp):
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(
+            account_name="Test Account", user=self.user, amount=100
+        )
+        self.url = reverse("accounts-detail", args=[self.account.id])
+
+    def test_retrieve_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.data, first.data)
+        with self.assertNumQueries(0):
+            revalidated = self.client.get(
+                self.url, HTTP_IF_NONE_MATCH=first["ETag"]
+            )
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_transaction_invalidates_account(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("transaction-list", args=[self.account.id]),
+                {"amount": "25", "description": "Deposit", "type": "credit"},
+            )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["amount"], "125.00")
+
+    def test_update_invalidates_account(self):
+        self.client.get(self.url)
+        self.client.patch(self.url, {"account_name": "Renamed"})
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["account_name"], "Renamed")
+
+    def test_other_users_do_not_share_entries(self):
+        self.client.get(self.url)
+        other = User.objects.create_user(
+            first_name="Other",
+            last_name="User",
+            phone_number="0000000000",
+            email="other@example.com",
+            password="testpass123",
+        )
+        self.client.cookies["jwt"] = jwt.encode(
+            {"id": other.id}, settings.JWT_SECRET, algorithm="HS256"
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_wildcard_if_none_match_is_not_answered(self):
+        other = User.objects.create_user(
+            first_name="Other",
+            last_name="User",
+            phone_number="0000000000",
+            email="other@example.com",
+            password="testpass123",
+        )
+        others = Account.objects.create(
+            account_name="Other Account", user=other, amount=100
+        )
+        for account_id in (others.id, 0):
+            response = self.client.get(
+                reverse("accounts-detail", args=[account_id]),
+                HTTP_IF_NONE_MATCH="*",
+            )
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
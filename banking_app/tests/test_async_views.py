@@ -0,0 +1,102 @@
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework import status
+
+from banking_app.models import Account, Transaction, User
+from banking_app.tests.test_setup import SetUp
+
+
+class AsyncViewTests(SetUp):
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(
+            account_name="Async", user=self.user, amount=75
+        )
+        Transaction.objects.bulk_create(
+            Transaction(
+                account=self.account,
+                amount=1,
+                description=f"Deposit {i}",
+                type="credit",
+                ip_address="127.0.0.1",
+            )
+            for i in range(3)
+        )
+        self.async_client = AsyncClient()
+        self.async_client.cookies["jwt"] = self.client.cookies["jwt"].value
+
+    async def test_get_current_user(self):
+        response = await self.async_client.get(
+            reverse("async-get-logged-user")
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["email"], self.user.email)
+
+    async def test_requires_authentication(self):
+        response = await AsyncClient().get(reverse("async-get-logged-user"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_list_transactions(self):
+        url = reverse("async-transaction-list", args=[self.account.id])
+        response = await self.async_client.get(f"{url}?page_size=2")
+        body = response.json()
+        self.assertEqual(len(body["results"]), 2)
+        response = await self.async_client.get(body["next"])
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    async def test_account_balance(self):
+        url = reverse("async-account-balance", args=[self.account.id])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.json()["balance"], "75.00")
+        response = await self.async_client.get(
+            reverse("async-account-balance", args=[0])
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_other_users_account(self):
+        theirs = await sync_to_async(self.create_other_account)()
+        response = await self.async_client.get(
+            reverse("async-account-balance", args=[theirs.id])
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = await self.async_client.get(
+            reverse("async-transaction-list", args=[theirs.id])
+        )
+        self.assertEqual(response.json()["results"], [])
+
+    def create_other_account(self):
+        stranger = User.objects.create_user(
+            first_name="Other",
+            last_name="User",
+            phone_number="0000000000",
+            email="other@example.com",
+            password="otherpass123",
+        )
+        theirs = Account.objects.create(
+            account_name="Theirs", user=stranger, amount=500
+        )
+        Transaction.objects.create(
+            account=theirs,
+            amount=500,
+            description="Deposit",
+            type="credit",
+            ip_address="127.0.0.1",
+        )
+        return theirs
+
+    async def test_login(self):
+        url = reverse("async-login")
+        response = await AsyncClient().post(
+            url,
+            {"email": self.user.email, "password": "testpass123"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("jwt", response.cookies)
+        response = await AsyncClient().post(
+            url,
+            {"email": self.user.email, "password": "wrong"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
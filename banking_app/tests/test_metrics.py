@@ -0,0 +1,64 @@
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from banking_app import metrics
+from banking_app.tests.test_setup import SetUp
+
+
+@override_settings(METRICS_SAMPLE_RATE=1, METRICS_SERVER_TIMING=True)
+class MetricsTestCase(SetUp):
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("get_logged_user"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = response["Server-Timing"]
+        self.assertIn("app;dur=", timing)
+        self.assertIn("serializer;dur=", timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_still_counted(self):
+        response = self.client.get(reverse("get_logged_user"))
+        self.assertNotIn("Server-Timing", response)
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{view="get_logged_user",'
+            'method="GET",status="200"} 1',
+            body,
+        )
+        self.assertNotIn("http_request_db_queries_count{", body)
+
+    def test_export(self):
+        self.client.get(reverse("get_logged_user"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_bucket{view="get_logged_user",'
+            'method="GET",status="200",le="+Inf"} 1',
+            body,
+        )
+        self.assertIn(
+            'http_request_db_queries_count{view="get_logged_user"}', body
+        )
+        self.assertIn("# TYPE app_cache_hits_total counter", body)
+
+    async def test_async_view(self):
+        client = AsyncClient()
+        client.cookies["jwt"] = self.client.cookies["jwt"].value
+        response = await client.get(reverse("async-get-logged-user"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(
+            response["Server-Timing"], r'desc="[1-9]\d* queries"'
+        )
+
+    def test_export_restricted_to_allowed_networks(self):
+        response = self.client.get(
+            reverse("metrics"), REMOTE_ADDR="203.0.113.7"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
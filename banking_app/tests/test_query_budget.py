@@ -0,0 +1,141 @@
+from unittest import mock
+
+from django.db import transaction
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+from rest_framework import status
+
+from banking_app import query_budget, transaction_queue, urls
+from banking_app.authentications import clear_caches
+from banking_app.caches import get_cache
+from banking_app.exceptions import QueryBudgetExceeded
+from banking_app.models import Account, Transaction, User
+from banking_app.query_budget import BUDGETS
+from banking_app.services import BALANCE_SHARD_CACHE, TransactionService
+from banking_app.tests.test_setup import SetUp
+
+
+class QueryBudgetTestCase(SetUp):
+    def test_over_budget_raises_with_queries(self):
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with query_budget.query_budget(1, "two lookups"):
+                User.objects.filter(id=self.user.id).exists()
+                Account.objects.filter(user=self.user).exists()
+        message = str(raised.exception)
+        self.assertIn("2 queries in two lookups, budget is 1", message)
+        self.assertIn("banking_app_account", message)
+
+    def test_log_mode_warns(self):
+        with self.assertLogs("banking_app.query_budget", "WARNING"):
+            with query_budget.query_budget(0, mode=query_budget.LOG):
+                User.objects.count()
+
+    def test_budgets_nest_and_skip_savepoints(self):
+        with query_budget.query_budget(2) as outer:
+            User.objects.count()
+            with query_budget.query_budget(1) as inner:
+                with transaction.atomic():
+                    User.objects.count()
+        self.assertEqual((outer.queries, inner.queries), (2, 1))
+
+    def test_decorator(self):
+        @query_budget.query_budget(0)
+        def lookup():
+            return User.objects.count()
+
+        with self.assertRaises(QueryBudgetExceeded):
+            lookup()
+
+    def test_every_endpoint_has_a_budget(self):
+        names = {
+            pattern.name
+            for pattern in [*urls.urlpatterns, *urls.router.urls]
+            if isinstance(pattern, URLPattern)
+        }
+        self.assertEqual(names - set(BUDGETS), set())
+
+    def test_middleware_applies_url_budget(self):
+        url = reverse("get_logged_user")
+        with mock.patch.dict(BUDGETS, {"get_logged_user": 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(url)
+
+    def test_list_endpoints_do_not_grow_with_rows(self):
+        for i in range(20):
+            account = Account.objects.create(
+                account_name=f"Budget {i}", user=self.user, amount=10
+            )
+            Transaction.objects.bulk_create(
+                Transaction(
+                    account=account,
+                    amount=1,
+                    description=f"Deposit {j}",
+                    type="credit",
+                    ip_address="127.0.0.1",
+                )
+                for j in range(5)
+            )
+        # Over budget would raise; see SetUp.
+        for url in (
+            reverse("accounts-list"),
+            reverse("accounts-list") + "?include=recent_transactions,summary",
+            reverse("transaction-list", args=[account.id]),
+            reverse("users"),
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def clear_caches(self):
+        clear_caches()
+        get_cache(BALANCE_SHARD_CACHE).clear()
+
+    def populate(self, account):
+        """
+        Give `account` a row of every kind that hangs off an account:
+        transactions, balance shards, snapshots and rollups, an idempotency
+        key, and processed and pending queue entries.
+        """
+        url = reverse("transaction-list", args=[account.id])
+        data = {"amount": "10", "description": "Deposit", "type": "credit"}
+        self.client.post(url, data)
+        TransactionService().set_balance_shards(account.id, 2)
+        self.client.post(url, data, HTTP_IDEMPOTENCY_KEY=f"key-{account.id}")
+        self.client.post(url, data, HTTP_PREFER="respond-async")
+        transaction_queue.drain()
+        self.client.post(url, data, HTTP_PREFER="respond-async")
+
+    def test_populated_endpoints_stay_within_budget(self):
+        accounts = [
+            Account.objects.create(
+                account_name=f"Populated {i}", user=self.user, amount=100
+            )
+            for i in range(2)
+        ]
+        for account in accounts:
+            self.populate(account)
+        account = accounts[0]
+        # Before any transaction, and today, which has to be replayed as
+        # sharded transactions carry no running balance.
+        points = [
+            "?at=2000-01-01T00:00:00",
+            "?" + urlencode({"at": timezone.now().isoformat()}),
+        ]
+        # Over budget would raise; see SetUp. Cold caches are the worst case.
+        for url in [reverse("account-balance", args=[account.id])] + [
+            reverse(name, args=[account.id]) + point
+            for name in ("account-balance", "async-account-balance")
+            for point in points
+        ]:
+            self.clear_caches()
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.clear_caches()
+        response = self.client.delete(
+            reverse("accounts-detail", args=[account.id])
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.clear_caches()
+        response = self.client.delete(reverse("delete-current-user"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -1,5 +1,7 @@
 from django.urls import reverse
 from django.conf import settings
+from django.core.cache import cache
+from django.test import override_settings
 
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
@@ -7,9 +9,14 @@ from rest_framework.authtoken.models import Token
 from faker import Faker
 import jwt
 
+from banking_app.authentications import clear_caches
+from banking_app.caches import get_cache
 from banking_app.models import User
+from banking_app.services import BALANCE_SHARD_CACHE
 
 
+# Every request made by a test is held to its query budget.
+@override_settings(QUERY_BUDGET_MODE="raise")
 class SetUp(APITestCase):
     fake = Faker()
     client = APIClient()
@@ -25,6 +32,9 @@ class SetUp(APITestCase):
     }
 
     def setUp(self):
+        clear_caches()
+        get_cache(BALANCE_SHARD_CACHE).clear()
+        cache.clear()
         self.user = User.objects.create_user(
             first_name=self.fake.unique.first_name(),
             last_name=self.fake.unique.last_name(),
@@ -0,0 +1,932 @@
+import io
+import json
+import random
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import SkipTest
+
+import jwt
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from banking_app import benchmarks, idempotency, transaction_queue
+from banking_app.models import (
+    Account,
+    AccountBalanceSnapshot,
+    IdempotencyKey,
+    QueuedTransaction,
+    Transaction,
+    User,
+)
+from banking_app.services import TransactionService, get_client_ip
+from banking_app.sqlite import GroupCommitWriter, stop_group_commit_writer
+from banking_app.tests.test_setup import SetUp
+
+
+class TransactionTests(SetUp):
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(
+            account_name="Test Account", user=self.user, amount=100
+        )
+        self.url = reverse("transaction-list", args=[self.account.id])
+
+    def test_credit_increases_balance(self):
+        data = {"amount": "25.50", "description": "Deposit", "type": "credit"}
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("125.50"))
+
+    def test_credit_account_without_balance(self):
+        account = Account.objects.create(
+            account_name="Empty Account", user=self.user
+        )
+        url = reverse("transaction-list", args=[account.id])
+        data = {"amount": "10", "description": "Deposit", "type": "credit"}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        account.refresh_from_db()
+        self.assertEqual(account.amount, Decimal("10.00"))
+
+    def test_debit_decreases_balance(self):
+        data = {"amount": "40", "description": "Withdrawal", "type": "debit"}
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("60.00"))
+
+    def test_unknown_account(self):
+        url = reverse("transaction-list", args=[self.account.id + 1000])
+        data = {"amount": "10", "description": "Deposit", "type": "credit"}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_debit_insufficient_funds(self):
+        data = {"amount": "100.01", "description": "Withdrawal", "type": "debit"}
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("100.00"))
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_invalid_amount(self):
+        for amount in ("-5", "0", "abc"):
+            data = {"amount": amount, "description": "Bad", "type": "debit"}
+            response = self.client.post(self.url, data)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("100.00"))
+
+    def test_other_users_account_is_not_found(self):
+        stranger = User.objects.create_user(
+            first_name="Other",
+            last_name="User",
+            phone_number="0000000000",
+            email="other@example.com",
+            password="otherpass123",
+        )
+        theirs = Account.objects.create(
+            account_name="Theirs", user=stranger, amount=500
+        )
+        Transaction.objects.create(
+            account=theirs, amount=500, description="Salary", type="credit"
+        )
+        url = reverse("transaction-list", args=[theirs.id])
+        data = {"amount": "500", "description": "Drain", "type": "debit"}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        theirs.refresh_from_db()
+        self.assertEqual(theirs.amount, Decimal("500.00"))
+
+        response = self.client.get(url)
+        self.assertEqual(response.data["results"], [])
+
+
+class BulkTransactionTests(SetUp):
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(
+            account_name="Payroll", user=self.user, amount=100
+        )
+        self.other = Account.objects.create(
+            account_name="Savings", user=self.user, amount=0
+        )
+        self.url = reverse(
+            "account-transaction-bulk", args=[self.account.id]
+        )
+
+    def test_bulk_create_for_account(self):
+        data = {
+            "transactions": [
+                {"amount": "50", "description": "Salary", "type": "credit"},
+                {"amount": "150", "description": "Rent", "type": "debit"},
+            ]
+        }
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 2)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("0.00"))
+        self.assertEqual(self.account.transaction_set.count(), 2)
+
+    def test_atomic_mode_rejects_whole_batch(self):
+        data = {
+            "transactions": [
+                {"amount": "50", "description": "Rent", "type": "debit"},
+                {"amount": "60", "description": "Food", "type": "debit"},
+            ]
+        }
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [r["status"] for r in response.data["results"]],
+            ["not_applied", "failed"],
+        )
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("100.00"))
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_partial_mode_across_accounts(self):
+        data = {
+            "mode": "partial",
+            "transactions": [
+                {
+                    "account": self.account.id,
+                    "amount": "80",
+                    "description": "Transfer out",
+                    "type": "debit",
+                },
+                {
+                    "account": self.other.id,
+                    "amount": "80",
+                    "description": "Transfer in",
+                    "type": "credit",
+                },
+                {
+                    "account": self.other.id,
+                    "amount": "100",
+                    "description": "Overdraw",
+                    "type": "debit",
+                },
+                {"account": self.other.id, "amount": "-1", "type": "credit"},
+            ],
+        }
+        response = self.client.post(
+            reverse("transaction-bulk"), data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [r["status"] for r in response.data["results"]],
+            ["created", "created", "failed", "failed"],
+        )
+        self.account.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("20.00"))
+        self.assertEqual(self.other.amount, Decimal("80.00"))
+
+
+    def test_other_users_account_is_not_found(self):
+        stranger = User.objects.create_user(
+            first_name="Other",
+            last_name="User",
+            phone_number="0000000000",
+            email="other@example.com",
+            password="otherpass123",
+        )
+        theirs = Account.objects.create(
+            account_name="Theirs", user=stranger, amount=500
+        )
+        data = {
+            "transactions": [
+                {
+                    "account": theirs.id,
+                    "amount": "500",
+                    "description": "Drain",
+                    "type": "debit",
+                },
+            ]
+        }
+        response = self.client.post(
+            reverse("transaction-bulk"), data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["results"][0]["errors"],
+            {"non_field_errors": ["Account not found"]},
+        )
+        theirs.refresh_from_db()
+        self.assertEqual(theirs.amount, Decimal("500.00"))
+
+
+class TransactionCursorPaginationTests(SetUp):
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(
+            account_name="History", user=self.user, amount=0
+        )
+        Transaction.objects.bulk_create(
+            Transaction(
+                account=self.account,
+                amount=1,
+                description=f"Deposit {i}",
+                type="credit",
+                ip_address="127.0.0.1",
+            )
+            for i in range(25)
+        )
+        self.url = reverse("transaction-list", args=[self.account.id])
+
+    def test_walks_all_pages_without_count(self):
+        seen = []
+        url = f"{self.url}?pagination=cursor&page_size=10"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            seen.extend(row["id"] for row in response.data["results"])
+            url = response.data["next"]
+        expected = list(
+            Transaction.objects.order_by("-timestamp", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f"{self.url}?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_mode_is_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["count"], 25)
+        self.assertEqual(len(response.data["results"]), 10)
+
+
+class AccountBalanceHistoryTests(SetUp):
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(
+            account_name="History", user=self.user, amount=100
+        )
+        url = reverse("transaction-list", args=[self.account.id])
+        self.credit = self.client.post(
+            url, {"amount": "50", "description": "In", "type": "credit"}
+        ).data
+        self.debit = self.client.post(
+            url, {"amount": "20", "description": "Out", "type": "debit"}
+        ).data
+        self.balance_url = reverse("account-balance", args=[self.account.id])
+
+    def balance_at(self, at):
+        response = self.client.get(self.balance_url, {"at": at.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return Decimal(response.data["balance"])
+
+    def test_running_balance_recorded(self):
+        self.assertEqual(Decimal(self.credit["running_balance"]), 150)
+        self.assertEqual(Decimal(self.debit["running_balance"]), 130)
+        snapshot = AccountBalanceSnapshot.objects.get(account=self.account)
+        self.assertEqual(snapshot.balance, Decimal("130.00"))
+
+    def test_balance_at_point_in_time(self):
+        two_days_ago = timezone.now() - timedelta(days=2)
+        Transaction.objects.filter(id=self.credit["id"]).update(
+            timestamp=two_days_ago
+        )
+        AccountBalanceSnapshot.objects.create(
+            account=self.account,
+            date=timezone.localdate(two_days_ago),
+            balance=150,
+        )
+
+        self.assertEqual(self.balance_at(timezone.now()), 130)
+        self.assertEqual(
+            self.balance_at(timezone.now() - timedelta(days=1)), 150
+        )
+        self.assertEqual(
+            self.balance_at(two_days_ago - timedelta(days=1)), 100
+        )
+
+    def statement(self, **params):
+        url = reverse("account-statement", args=[self.account.id])
+        response = self.client.get(url, {"export": "ndjson", **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+
+    def test_statement_carries_running_balance(self):
+        rows = self.statement()
+        self.assertEqual(
+            [(row["id"], Decimal(row["balance"])) for row in rows],
+            [(self.credit["id"], 150), (self.debit["id"], 130)],
+        )
+
+    def test_statement_for_date_range(self):
+        two_days_ago = timezone.now() - timedelta(days=2)
+        Transaction.objects.filter(id=self.credit["id"]).update(
+            timestamp=two_days_ago
+        )
+        AccountBalanceSnapshot.objects.create(
+            account=self.account,
+            date=timezone.localdate(two_days_ago),
+            balance=150,
+        )
+        since = timezone.now() - timedelta(days=1)
+        rows = self.statement(start=since.isoformat())
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(Decimal(rows[0]["balance"]), 130)
+
+    def test_invalid_at(self):
+        response = self.client.get(self.balance_url, {"at": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_balance_is_not_found(self):
+        stranger = User.objects.create_user(
+            first_name="Other",
+            last_name="User",
+            phone_number="0000000000",
+            email="other@example.com",
+            password="otherpass123",
+        )
+        theirs = Account.objects.create(
+            account_name="Theirs", user=stranger, amount=500
+        )
+        url = reverse("account-balance", args=[theirs.id])
+        for params in ({}, {"at": timezone.now().isoformat()}):
+            response = self.client.get(url, params)
+            self.assertEqual(
+                response.status_code, status.HTTP_404_NOT_FOUND
+            )
+
+
+@override_settings(TRUSTED_PROXIES=["10.0.0.0/8"])
+class ClientIPTests(SimpleTestCase):
+    factory = RequestFactory()
+
+    def resolve(self, remote_addr, forwarded=None):
+        extra = {"REMOTE_ADDR": remote_addr}
+        if forwarded is not None:
+            extra["HTTP_X_FORWARDED_FOR"] = forwarded
+        return get_client_ip(self.factory.get("/", **extra))
+
+    def test_untrusted_peer_ignores_forwarded_header(self):
+        self.assertEqual(self.resolve("203.0.113.9", "1.2.3.4"), "203.0.113.9")
+
+    def test_trusted_proxies_are_skipped(self):
+        self.assertEqual(
+            self.resolve("10.0.0.1", "1.2.3.4, 198.51.100.7, 10.0.0.2"),
+            "198.51.100.7",
+        )
+
+    def test_malformed_hop_stops_the_walk(self):
+        self.assertEqual(self.resolve("10.0.0.1", "junk, 10.0.0.3"), "10.0.0.3")
+
+    def test_result_is_memoized(self):
+        request = self.factory.get("/", REMOTE_ADDR="2001:db8::1")
+        self.assertEqual(get_client_ip(request), "2001:db8::1")
+        request.META["REMOTE_ADDR"] = "203.0.113.9"
+        self.assertEqual(get_client_ip(request), "2001:db8::1")
+
+
+class IdempotencyKeyTests(SetUp):
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(
+            account_name="Retries", user=self.user, amount=100
+        )
+        self.url = reverse("transaction-list", args=[self.account.id])
+        self.data = {"amount": "30", "description": "Bill", "type": "debit"}
+
+    def test_retry_replays_stored_response(self):
+        first = self.client.post(
+            self.url, self.data, HTTP_IDEMPOTENCY_KEY="abc"
+        )
+        # The account lookup, the rejected claim and the stored response,
+        # with their savepoints.
+        with self.assertNumQueries(8):
+            retry = self.client.post(
+                self.url, self.data, HTTP_IDEMPOTENCY_KEY="abc"
+            )
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("70.00"))
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_claim_writes_first(self):
+        self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY="abc")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY="abc")
+        sql = [q["sql"] for q in queries.captured_queries]
+        # Inside the transaction (a savepoint here), the claim's INSERT
+        # comes before any read, so sqlite takes its write lock up front.
+        start = next(i for i, s in enumerate(sql) if s.startswith("SAVEPOINT"))
+        statements = [
+            s
+            for s in sql[start:]
+            if not s.startswith(("SAVEPOINT", "RELEASE", "ROLLBACK"))
+        ]
+        self.assertTrue(statements[0].startswith("INSERT"), statements[0])
+
+    def test_reused_key_with_different_body(self):
+        self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY="abc")
+        response = self.client.post(
+            self.url,
+            {**self.data, "amount": "31"},
+            HTTP_IDEMPOTENCY_KEY="abc",
+        )
+        self.assertEqual(
+            response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+    def test_expired_keys_are_purged(self):
+        self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY="abc")
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+        self.assertEqual(idempotency.purge_expired(), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class ConcurrentIdempotencyKeyTests(TransactionTestCase):
+    # Restore the migrated data (the account number sequence) that the
+    # flush after each test removes.
+    serialized_rollback = True
+
+    @classmethod
+    def setUpClass(cls):
+        # sqlite's in-memory test database locks whole tables and fails a
+        # conflicting statement at once instead of waiting for the lock.
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            raise SkipTest("concurrent writers need a database that waits")
+        super().setUpClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            first_name="Concurrent",
+            last_name="Retry",
+            phone_number="0000000000",
+            email="concurrent-retry@example.com",
+            password="testpass123",
+        )
+        self.account = Account.objects.create(
+            account_name="Test Account", user=self.user, amount=100
+        )
+
+    def test_concurrent_retries_run_once(self):
+        url = reverse("transaction-list", args=[self.account.id])
+        token = jwt.encode(
+            {"id": self.user.id}, settings.JWT_SECRET, algorithm="HS256"
+        )
+        data = {"amount": "30", "description": "Bill", "type": "debit"}
+        start = threading.Barrier(4)
+        responses = []
+
+        def post():
+            client = APIClient()
+            client.cookies["jwt"] = token
+            start.wait()
+            try:
+                response = client.post(url, data, HTTP_IDEMPOTENCY_KEY="abc")
+                responses.append(response.status_code)
+            except Exception as exc:
+                # The test client re-raises what a 500 would have hidden.
+                responses.append(repr(exc))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # One request runs; the others replay it, or are told it is still
+        # in flight. None fails with "database is locked".
+        self.assertEqual(set(responses) - {201, 409}, set(), responses)
+        self.assertIn(201, responses)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("70.00"))
+        self.assertEqual(Transaction.objects.count(), 1)
+
+
+class TransactionDetailAndFilterTests(SetUp):
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(
+            account_name="Main", user=self.user, amount=0
+        )
+        self.deposit = Transaction.objects.create(
+            account=self.account,
+            amount=500,
+            description="Salary",
+            type="credit",
+            ip_address="127.0.0.1",
+        )
+        self.purchase = Transaction.objects.create(
+            account=self.account,
+            amount=20,
+            description="Coffee",
+            type="debit",
+            ip_address="127.0.0.1",
+        )
+        self.list_url = reverse("transaction-list", args=[self.account.id])
+
+    def test_retrieve_single_transaction(self):
+        url = reverse(
+            "transaction-detail", args=[self.account.id, self.deposit.id]
+        )
+        self.client.get(url)
+        # With the user cached, the lookup is a single joined query.
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["id"], self.deposit.id)
+
+    def test_retrieve_is_scoped_to_owner(self):
+        stranger = User.objects.create_user(
+            first_name="Other",
+            last_name="User",
+            phone_number="123",
+            email="other@example.com",
+            password="pass12345",
+        )
+        account = Account.objects.create(
+            account_name="Theirs", user=stranger, amount=0
+        )
+        transaction = Transaction.objects.create(
+            account=account,
+            amount=1,
+            description="Private",
+            type="credit",
+            ip_address="127.0.0.1",
+        )
+        url = reverse("transaction-detail", args=[account.id, transaction.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_filter_by_type_and_amount(self):
+        response = self.client.get(self.list_url, {"type": "debit"})
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]],
+            [self.purchase.id],
+        )
+        response = self.client.get(
+            self.list_url, {"amount_min": "100", "amount_max": "1000"}
+        )
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]],
+            [self.deposit.id],
+        )
+
+    def test_filter_by_date_range(self):
+        Transaction.objects.filter(id=self.deposit.id).update(
+            timestamp=timezone.now() - timedelta(days=10)
+        )
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        response = self.client.get(self.list_url, {"timestamp_after": since})
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]],
+            [self.purchase.id],
+        )
+
+
+class GroupCommitWriterTests(TransactionTestCase):
+    serialized_rollback = True
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            first_name="Group",
+            last_name="Commit",
+            phone_number="0000000000",
+            email="group-commit@example.com",
+            password="testpass123",
+        )
+        self.account = Account.objects.create(
+            account_name="Test Account", user=self.user, amount=10
+        )
+
+    def submit_concurrently(self, writer, items):
+        results = [None] * len(items)
+
+        def submit(i):
+            try:
+                results[i] = writer.submit(
+                    account=Account(id=self.account.id),
+                    ip_address="127.0.0.1",
+                    **items[i],
+                )
+            except Exception as exc:
+                results[i] = exc
+
+        threads = [
+            threading.Thread(target=submit, args=(i,)) for i in range(len(items))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_writes_share_commits(self):
+        writer = GroupCommitWriter(max_batch=50, max_delay=0.05)
+        items = [
+            {"amount": "1", "description": "Deposit", "transaction_type": "credit"}
+        ] * 20
+        try:
+            results = self.submit_concurrently(writer, items)
+        finally:
+            writer.stop()
+
+        self.assertTrue(all(isinstance(r, Transaction) for r in results))
+        self.assertTrue(all(r.id for r in results))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("30.00"))
+        self.assertEqual(self.account.transaction_set.count(), 20)
+
+    def test_rejected_write_does_not_undo_its_batch(self):
+        writer = GroupCommitWriter(max_batch=50, max_delay=0.05)
+        items = [
+            {"amount": "6", "description": "Withdrawal", "transaction_type": "debit"}
+        ] * 2
+        try:
+            results = self.submit_concurrently(writer, items)
+        finally:
+            writer.stop()
+
+        self.assertEqual(
+            sorted(type(r).__name__ for r in results),
+            ["InsufficientFundsError", "Transaction"],
+        )
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("4.00"))
+        self.assertEqual(self.account.transaction_set.count(), 1)
+
+    @override_settings(GROUP_COMMIT_ENABLED=True)
+    def test_view_writes_through_group_commit(self):
+        self.client.cookies["jwt"] = jwt.encode(
+            {"id": self.user.id}, settings.JWT_SECRET, algorithm="HS256"
+        )
+        url = reverse("transaction-list", args=[self.account.id])
+        try:
+            created = self.client.post(
+                url, {"amount": "5", "description": "Deposit", "type": "credit"}
+            )
+            rejected = self.client.post(
+                url, {"amount": "50", "description": "Withdrawal", "type": "debit"}
+            )
+        finally:
+            stop_group_commit_writer()
+
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(created.data["running_balance"], "15.00")
+        self.assertEqual(rejected.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class QueuedTransactionTests(SetUp):
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(
+            account_name="Test Account", user=self.user, amount=100
+        )
+        self.url = reverse("transaction-list", args=[self.account.id])
+
+    def enqueue(self, amount, transaction_type, **extra):
+        data = {"amount": amount, "description": "Queued"}
+        return self.client.post(
+            self.url,
+            {**data, "type": transaction_type},
+            HTTP_PREFER="respond-async",
+            **extra,
+        )
+
+    def test_accepts_then_processes(self):
+        response = self.enqueue("25", "credit")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "pending")
+        self.assertEqual(response["Location"], response.data["status_url"])
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("100.00"))
+
+        self.assertEqual(transaction_queue.drain(), 1)
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("125.00"))
+        polled = self.client.get(response["Location"])
+        self.assertEqual(polled.data["status"], "completed")
+        self.assertEqual(
+            polled.data["transaction"]["running_balance"], "125.00"
+        )
+
+    def test_batch_applies_in_order_and_reports_failures(self):
+        first = self.enqueue("50", "credit")
+        second = self.enqueue("150", "debit")
+        third = self.enqueue("1", "debit")
+
+        transaction_queue.drain()
+
+        statuses = [
+            self.client.get(r["Location"]).data for r in (first, second, third)
+        ]
+        self.assertEqual(
+            [s["status"] for s in statuses],
+            ["completed", "completed", "failed"],
+        )
+        self.assertEqual(statuses[2]["error"], "Insufficient funds")
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.amount, Decimal("0.00"))
+
+    def test_invalid_transaction_is_not_queued(self):
+        response = self.enqueue("-5", "credit")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(QueuedTransaction.objects.exists())
+
+    def test_other_users_account_is_not_queued(self):
+        stranger = User.objects.create_user(
+            first_name="Other",
+            last_name="User",
+            phone_number="0000000000",
+            email="other@example.com",
+            password="otherpass123",
+        )
+        theirs = Account.objects.create(
+            account_name="Theirs", user=stranger, amount=500
+        )
+        self.url = reverse("transaction-list", args=[theirs.id])
+        response = self.enqueue("500", "debit")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(QueuedTransaction.objects.exists())
+
+    @override_settings(TRANSACTION_QUEUE_ENABLED=True)
+    def test_queue_mode_for_every_request(self):
+        response = self.client.post(
+            self.url, {"amount": "5", "description": "Deposit", "type": "credit"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+    def test_status_is_private_to_its_user(self):
+        response = self.enqueue("5", "credit")
+        other = User.objects.create_user(
+            first_name="Other",
+            last_name="User",
+            phone_number="0000000000",
+            email="other@example.com",
+            password="testpass123",
+        )
+        self.client.cookies["jwt"] = jwt.encode(
+            {"id": other.id}, settings.JWT_SECRET, algorithm="HS256"
+        )
+        polled = self.client.get(response["Location"])
+        self.assertEqual(polled.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TransactionAggregatesTests(SetUp):
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(
+            account_name="Aggregates", user=self.user, amount=100
+        )
+        self.url = reverse("account-aggregates", args=[self.account.id])
+        self.service = TransactionService()
+
+    def record(self, amount, transaction_type):
+        with transaction.atomic():
+            return self.service.create_transaction(
+                self.account, Decimal(amount), "Test", transaction_type, ""
+            )
+
+    def test_totals_follow_every_write_path(self):
+        self.record("50", "credit")
+        self.record("20", "debit")
+        with transaction.atomic():
+            self.service.create_transactions_bulk(
+                [
+                    {
+                        "account_id": self.account.id,
+                        "amount": Decimal("5"),
+                        "description": "Bulk",
+                        "type": "credit",
+                    }
+                ]
+                * 3,
+                ip_address="",
+            )
+        response = self.client.get(self.url, {"group_by": "day"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        totals = response.data["totals"]
+        self.assertEqual(totals["total_credits"], Decimal("65.00"))
+        self.assertEqual(totals["total_debits"], Decimal("20.00"))
+        self.assertEqual(totals["net"], Decimal("45.00"))
+        self.assertEqual(totals["credit_count"], 4)
+        self.assertEqual(totals["transaction_count"], 5)
+        self.assertEqual(len(response.data["buckets"]), 1)
+
+    def test_sharded_credits_are_summed(self):
+        self.service.set_balance_shards(self.account.id, 4)
+        for _ in range(8):
+            self.record("1", "credit")
+        totals = self.service.get_aggregates(self.account.id)["totals"]
+        self.assertEqual(totals["total_credits"], Decimal("8.00"))
+        self.assertEqual(totals["credit_count"], 8)
+
+    def test_rebuild_buckets_by_month(self):
+        for amount in ("10", "20", "30"):
+            self.record(amount, "credit")
+        transactions = list(self.account.transaction_set.order_by("id"))
+        days = ("2026-01-05", "2026-01-20", "2026-02-01")
+        for txn, day in zip(transactions, days):
+            Transaction.objects.filter(id=txn.id).update(
+                timestamp=timezone.make_aware(datetime.fromisoformat(day))
+            )
+        call_command("rebuild_transaction_rollups", stdout=io.StringIO())
+
+        # User, ownership check and one grouped read of the rollups.
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {"start": "2026-01-01"})
+        self.assertEqual(
+            [
+                (str(b["period"]), b["total_credits"], b["credit_count"])
+                for b in response.data["buckets"]
+            ],
+            [
+                ("2026-01-01", Decimal("30.00"), 2),
+                ("2026-02-01", Decimal("30.00"), 1),
+            ],
+        )
+        response = self.client.get(self.url, {"end": "2026-01-31"})
+        self.assertEqual(
+            response.data["totals"]["total_credits"], Decimal("30.00")
+        )
+
+    def test_invalid_queries(self):
+        response = self.client.get(self.url, {"group_by": "week"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(
+            self.url, {"start": "2026-02-01", "end": "2026-01-01"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        other = User.objects.create_user(
+            first_name="Other",
+            last_name="User",
+            phone_number="0000000000",
+            email="other@example.com",
+            password="testpass123",
+        )
+        account = Account.objects.create(account_name="Other", user=other)
+        response = self.client.get(
+            reverse("account-aggregates", args=[account.id])
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BenchSeedTests(SetUp):
+    def test_seeded_accounts_are_consistent(self):
+        users = benchmarks.bulk_create_bench_users(2, "bench-password")
+        accounts = benchmarks.bulk_create_bench_accounts(users, 2)
+        created = benchmarks.bulk_create_bench_transactions(
+            accounts, 20, random.Random(0)
+        )
+        self.assertEqual(created, 80)
+        self.assertTrue(users[0].check_password("bench-password"))
+
+        service = TransactionService()
+        for account in accounts:
+            account.refresh_from_db()
+            last = Transaction.objects.filter(account=account).latest("id")
+            self.assertEqual(last.running_balance, account.amount)
+            self.assertEqual(
+                AccountBalanceSnapshot.objects.get(account=account).balance,
+                account.amount,
+            )
+            totals = service.get_aggregates(account.id)["totals"]
+            self.assertEqual(totals["net"], account.amount)
+            self.assertEqual(totals["transaction_count"], 20)
+
+        benchmarks.delete_bench_users(users)
+        self.assertFalse(Account.objects.filter(user__in=users).exists())
+
+    def test_bench_commands_reject_negative_retries(self):
+        for command in ("bench_debits", "bench_hot_credits"):
+            with self.assertRaisesMessage(CommandError, "must be 0 or more"):
+                call_command(command, "--retries", "-1")
+        self.assertFalse(Account.objects.exclude(user=self.user).exists())
@@ -0,0 +1,116 @@
+from decimal import Decimal
+
+from django.urls import reverse
+from rest_framework import status
+
+from banking_app.exceptions import ImmutableLedgerEntryError
+from banking_app.models import Account, JournalEntry, Posting, Transaction, User
+from banking_app.tests.test_setup import SetUp
+
+
+class TransferTests(SetUp):
+    url = reverse("transfers")
+
+    def setUp(self):
+        super().setUp()
+        self.source = Account.objects.create(
+            account_name="Source", user=self.user, amount=100
+        )
+        other = User.objects.create_user(
+            first_name="Other",
+            last_name="User",
+            phone_number="0000000000",
+            email="other@example.com",
+            password="testpass123",
+        )
+        self.destination = Account.objects.create(
+            account_name="Destination", user=other, amount=5
+        )
+
+    def transfer(self, amount, source=None, destination=None, **extra):
+        return self.client.post(
+            self.url,
+            {
+                "source_account": (source or self.source).id,
+                "destination_account_number": (
+                    destination or self.destination
+                ).account_number,
+                "amount": amount,
+                "description": "Rent",
+            },
+            format="json",
+            **extra,
+        )
+
+    def test_transfer_moves_money_in_one_entry(self):
+        response = self.transfer("40.00")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.source.refresh_from_db()
+        self.destination.refresh_from_db()
+        self.assertEqual(self.source.amount, Decimal("60.00"))
+        self.assertEqual(self.destination.amount, Decimal("45.00"))
+
+        entry = JournalEntry.objects.get(id=response.data["id"])
+        postings = {p.account_id: p for p in entry.postings.all()}
+        self.assertEqual(postings[self.source.id].amount, Decimal("-40.00"))
+        self.assertEqual(postings[self.destination.id].amount, Decimal("40.00"))
+        self.assertEqual(postings[self.source.id].transaction.type, "debit")
+        self.assertEqual(
+            postings[self.destination.id].transaction.running_balance,
+            Decimal("45.00"),
+        )
+
+    def test_insufficient_funds_changes_nothing(self):
+        response = self.transfer("100.01")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.amount, Decimal("100.00"))
+        self.assertFalse(JournalEntry.objects.exists())
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_cannot_transfer_from_someone_elses_account(self):
+        response = self.transfer(
+            "1", source=self.destination, destination=self.source
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cannot_transfer_to_same_account(self):
+        response = self.transfer("1", destination=self.source)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retry_with_idempotency_key_transfers_once(self):
+        first = self.transfer("10", HTTP_IDEMPOTENCY_KEY="rent-march")
+        second = self.transfer("10", HTTP_IDEMPOTENCY_KEY="rent-march")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(JournalEntry.objects.count(), 1)
+
+    def test_ledger_is_append_only(self):
+        self.transfer("10")
+        posting = Posting.objects.first()
+        posting.amount = Decimal("1000.00")
+        with self.assertRaises(ImmutableLedgerEntryError):
+            posting.save()
+        with self.assertRaises(ImmutableLedgerEntryError):
+            posting.entry.delete()
+
+    def test_account_with_postings_cannot_be_deleted(self):
+        self.transfer("10")
+        response = self.client.delete(
+            reverse("accounts-detail", args=[self.source.id])
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            response.data["message"],
+            "Accounts with transfers on record cannot be deleted",
+        )
+        self.assertTrue(Account.objects.filter(id=self.source.id).exists())
+        self.assertEqual(Posting.objects.count(), 2)
+
+    def test_user_with_postings_cannot_be_deleted(self):
+        self.transfer("10")
+        response = self.client.delete(reverse("delete-current-user"))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertTrue(User.objects.filter(id=self.user.id).exists())
+        self.assertEqual(Posting.objects.count(), 2)
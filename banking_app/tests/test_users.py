@@ -1,5 +1,19 @@
+import json
+from datetime import timedelta
+
+import jwt
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 
+from banking_app import tokens
+from banking_app.authentications import USER_CACHE
+from banking_app.caches import cache_stats, get_cache
+from banking_app.hashers import shutdown_hash_pool
+from banking_app.models import RevokedToken
 from banking_app.tests.test_setup import SetUp
 
 
@@ -23,3 +37,246 @@ class UserAPIViewTestCase(SetUp):
     def test_valid_logout(self):
         response = self.client.post(self.logout_user_url, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class PasswordHashingTestCase(SetUp):
+    credentials = {"email": "testuser@example.com", "password": "testpass123"}
+
+    def login(self, password="testpass123"):
+        data = {**self.credentials, "password": password}
+        return self.client.post(self.login_user_url, data, format="json")
+
+    def use_legacy_hash(self):
+        self.user.password = make_password(
+            "testpass123", hasher="pbkdf2_sha256"
+        )
+        self.user.save(update_fields=["password"])
+
+    def test_new_passwords_use_scrypt(self):
+        self.assertTrue(self.user.password.startswith("scrypt$16384$"))
+
+    def test_login_rehashes_legacy_hash(self):
+        self.use_legacy_hash()
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    def test_failed_login_keeps_hash(self):
+        self.use_legacy_hash()
+        self.assertNotEqual(self.login("wrong").status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+    def test_cost_change_rehashes(self):
+        cost = {
+            **settings.PASSWORD_HASH_COST,
+            "scrypt": {"WORK_FACTOR": 2 ** 12, "BLOCK_SIZE": 8, "PARALLELISM": 1},
+        }
+        with override_settings(PASSWORD_HASH_COST=cost):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$4096$"))
+
+    def test_login_in_worker_pool(self):
+        self.addCleanup(shutdown_hash_pool)
+        self.use_legacy_hash()
+        with override_settings(PASSWORD_HASH_WORKERS=1):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+            self.assertNotEqual(
+                self.login("wrong").status_code, status.HTTP_200_OK
+            )
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+
+
+class TokenTestCase(SetUp):
+    get_user_url = reverse("get_logged_user")
+    refresh_url = reverse("refresh-token")
+
+    def setUp(self):
+        super().setUp()
+        self.client.cookies.clear()
+        response = self.client.post(
+            self.login_user_url,
+            {"email": "testuser@example.com", "password": "testpass123"},
+            format="json",
+        )
+        self.access = response.cookies[tokens.ACCESS_COOKIE].value
+        self.refresh = response.cookies[tokens.REFRESH_COOKIE].value
+
+    def payload(self, token):
+        return jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
+
+    def test_login_issues_token_pair(self):
+        access = self.payload(self.access)
+        self.assertEqual(access["type"], tokens.ACCESS)
+        self.assertEqual(access["email"], self.user.email)
+        self.assertLessEqual(
+            access["exp"] - access["iat"], settings.ACCESS_TOKEN_TTL
+        )
+        self.assertEqual(self.payload(self.refresh)["type"], tokens.REFRESH)
+
+    def test_access_token_needs_no_user_lookup(self):
+        self.client.get(self.get_user_url)
+        get_cache(USER_CACHE).clear()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("async-get-logged-user"))
+        self.assertEqual(response.json()["email"], self.user.email)
+
+    def test_refresh_token_cannot_authenticate(self):
+        self.client.cookies[tokens.ACCESS_COOKIE] = self.refresh
+        response = self.client.get(self.get_user_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_refresh_rotates_and_is_single_use(self):
+        response = self.client.post(self.refresh_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(
+            response.cookies[tokens.REFRESH_COOKIE].value, self.refresh
+        )
+        self.client.cookies[tokens.REFRESH_COOKIE] = self.refresh
+        response = self.client.post(self.refresh_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_logout_revokes_both_tokens(self):
+        self.client.post(self.logout_user_url)
+        self.assertEqual(RevokedToken.objects.count(), 2)
+        self.client.cookies[tokens.ACCESS_COOKIE] = self.access
+        self.client.cookies[tokens.REFRESH_COOKIE] = self.refresh
+        response = self.client.get(self.get_user_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data["detail"], "Token has been revoked")
+        response = self.client.post(self.refresh_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_update_reissues_access_token(self):
+        response = self.client.patch(
+            reverse("update-current-user"),
+            {"first_name": "Renamed"},
+            format="json",
+        )
+        access = response.cookies[tokens.ACCESS_COOKIE].value
+        self.assertEqual(self.payload(access)["first_name"], "Renamed")
+        # Saving went through the full row, not the claims.
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("testpass123"))
+
+        self.client.cookies[tokens.ACCESS_COOKIE] = self.access
+        response = self.client.get(self.get_user_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_revocations_from_other_processes_are_synced(self):
+        jti = self.payload(self.access)["jti"]
+        revocations = tokens.RevocationList()
+        self.assertFalse(revocations.is_revoked(jti))
+        RevokedToken.objects.create(
+            jti=jti, expires_at=timezone.now() + timedelta(minutes=5)
+        )
+        with override_settings(TOKEN_REVOCATION_SYNC_INTERVAL=0):
+            self.assertTrue(revocations.is_revoked(jti))
+        with self.assertNumQueries(0):
+            self.assertFalse(revocations.is_revoked("not-revoked"))
+
+
+class BloomFilterTestCase(SimpleTestCase):
+    def test_no_false_negatives_and_few_false_positives(self):
+        bloom = tokens.BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"revoked-{i}")
+        self.assertTrue(all(f"revoked-{i}" in bloom for i in range(1000)))
+        false_positives = sum(f"valid-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class CachedAuthenticationTestCase(SetUp):
+    get_user_url = reverse("get_logged_user")
+
+    def test_repeat_requests_skip_user_lookup(self):
+        self.client.get(self.get_user_url)
+        before = cache_stats()
+        with self.assertNumQueries(0):
+            response = self.client.get(self.get_user_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        after = cache_stats()
+        for name in ("users", "tokens"):
+            self.assertEqual(after[name]["hits"], before[name]["hits"] + 1)
+            self.assertEqual(after[name]["misses"], before[name]["misses"])
+
+    def test_update_invalidates_cached_user(self):
+        self.client.get(self.get_user_url)
+        self.client.patch(
+            reverse("update-current-user"),
+            {"first_name": "Renamed"},
+            format="json",
+        )
+        response = self.client.get(self.get_user_url)
+        self.assertEqual(response.data["first_name"], "Renamed")
+
+    def test_delete_invalidates_cached_user(self):
+        self.client.get(self.get_user_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("delete-current-user"))
+        self.client.cookies["jwt"] = jwt.encode(
+            {"id": self.user.id}, settings.JWT_SECRET, algorithm="HS256"
+        )
+        response = self.client.get(self.get_user_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class UserResponseCacheTestCase(SetUp):
+    get_user_url = reverse("get_logged_user")
+
+    def test_unchanged_user_is_not_modified(self):
+        first = self.client.get(self.get_user_url)
+        etag = first["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.get_user_url, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertFalse(response.content)
+
+    def test_update_changes_etag(self):
+        etag = self.client.get(self.get_user_url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                reverse("update-current-user"),
+                {"first_name": "Renamed"},
+                format="json",
+            )
+        response = self.client.get(self.get_user_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["first_name"], "Renamed")
+
+
+class UserListTestCase(SetUp):
+    users_url = reverse("users")
+
+    def test_list_is_paginated(self):
+        response = self.client.get(self.users_url, {"page_size": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(
+            response.data["results"][0]["email"], self.user.email
+        )
+
+    def test_ndjson_export(self):
+        response = self.client.get(self.users_url, {"export": "ndjson"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(rows[0]["id"], self.user.id)
+        self.assertNotIn("password", rows[0])
+
+    def test_csv_export(self):
+        response = self.client.get(self.users_url, {"export": "csv"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            lines[0], "id,first_name,last_name,phone_number,email"
+        )
+        self.assertEqual(len(lines), 2)
@@ -0,0 +1,295 @@
+"""
+Access and refresh tokens, and the list of revoked ones.
+
+Login hands out two HS256 JWTs as cookies. The access token ("jwt") is
+short-lived and carries the user's profile as claims, so authenticating a
+request needs no user lookup. The refresh token ("refresh") lives longer,
+carries only the user id, and can be exchanged once for a new pair at
+`users/refresh-token`.
+
+Every token has a `jti`. Logout, refresh and account deletion record the
+jtis they retire as `RevokedToken` rows. Each process keeps those jtis in
+a Bloom filter that it syncs from the database every
+`settings.TOKEN_REVOCATION_SYNC_INTERVAL` seconds. A revocation check is
+therefore a few bit lookups, and only a filter hit is confirmed against
+the database. Another process can keep accepting a revoked access token
+for up to one sync interval.
+
+Tokens without a `type` claim, issued before this scheme, are still
+accepted. They cannot be revoked, and their user is looked up through
+the user cache.
+"""
+# 3rd party imports
+import jwt
+from asgiref.sync import sync_to_async
+
+# system imports
+import dataclasses
+import datetime
+import hashlib
+import math
+import threading
+import time
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.utils import timezone
+
+from .exceptions import TokenRevokedError
+from .models import RevokedToken, User
+
+ACCESS = "access"
+REFRESH = "refresh"
+ACCESS_COOKIE = "jwt"
+REFRESH_COOKIE = "refresh"
+
+# User fields carried by access tokens; everything views read from
+# `request.user` without a query.
+CLAIM_FIELDS = (
+    "email",
+    "first_name",
+    "last_name",
+    "phone_number",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+)
+
+# How far back each incremental sync looks again, for revocations whose
+# transaction committed after a later one was already seen.
+SYNC_OVERLAP = datetime.timedelta(seconds=60)
+
+
+@dataclasses.dataclass
+class TokenPair:
+    access: str
+    refresh: str
+
+
+def _encode(user_id: int, token_type: str, ttl: int, **claims) -> str:
+    now = datetime.datetime.utcnow()
+    payload = {
+        "id": user_id,
+        "type": token_type,
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + datetime.timedelta(seconds=ttl),
+        **claims,
+    }
+    return jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
+
+
+def issue_tokens(user: "User") -> TokenPair:
+    return TokenPair(
+        access=issue_access_token(user),
+        refresh=_encode(user.id, REFRESH, settings.REFRESH_TOKEN_TTL),
+    )
+
+
+def issue_access_token(user: "User") -> str:
+    return _encode(
+        user.id,
+        ACCESS,
+        settings.ACCESS_TOKEN_TTL,
+        **{field: getattr(user, field) for field in CLAIM_FIELDS},
+    )
+
+
+def set_token_cookies(response, access: str, refresh: Optional[str] = None):
+    response.set_cookie(
+        ACCESS_COOKIE,
+        access,
+        max_age=settings.ACCESS_TOKEN_TTL,
+        httponly=True,
+        secure=True,
+    )
+    if refresh is not None:
+        response.set_cookie(
+            REFRESH_COOKIE,
+            refresh,
+            max_age=settings.REFRESH_TOKEN_TTL,
+            httponly=True,
+            secure=True,
+        )
+
+
+def delete_token_cookies(response) -> None:
+    response.delete_cookie(ACCESS_COOKIE)
+    response.delete_cookie(REFRESH_COOKIE)
+
+
+def user_from_claims(payload: dict) -> "User":
+    """
+    The user an access token was issued to, built from its claims as if
+    loaded with `.only()`: any other field is fetched on first access.
+    """
+    claims = {"id": payload["id"], **{f: payload[f] for f in CLAIM_FIELDS}}
+    fields = [
+        f.attname for f in User._meta.concrete_fields if f.attname in claims
+    ]
+    return User.from_db(
+        DEFAULT_DB_ALIAS, fields, [claims[name] for name in fields]
+    )
+
+
+class BloomFilter:
+    """
+    Fixed-size set membership test with no false negatives and a false
+    positive rate of about `error_rate` while holding up to `capacity` keys.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class RevocationList:
+    """
+    Per-process view of the `RevokedToken` table, see the module docstring.
+    The filter is rebuilt from unexpired rows once it holds more keys than
+    it was sized for.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._synced_at = 0.0
+        self._seen_until = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._filter = None
+            self._seen_until = None
+
+    def sync_due(self) -> bool:
+        return (
+            self._filter is None
+            or time.monotonic() - self._synced_at
+            >= settings.TOKEN_REVOCATION_SYNC_INTERVAL
+        )
+
+    def might_contain(self, jti: str) -> bool:
+        """
+        Filter-only check; False means certainly not revoked as of the last
+        sync. Never touches the database.
+        """
+        current = self._filter
+        return current is None or jti in current
+
+    def is_revoked(self, jti: str) -> bool:
+        if self.sync_due():
+            self.sync()
+        if not self.might_contain(jti):
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def add(self, jti: str) -> None:
+        current = self._filter
+        if current is not None:
+            current.add(jti)
+
+    def sync(self) -> None:
+        with self._lock:
+            if not self.sync_due():
+                return
+            now = timezone.now()
+            rows = RevokedToken.objects.filter(expires_at__gt=now)
+            current = self._filter
+            if (
+                current is None
+                or self._seen_until is None
+                or current.count > settings.TOKEN_REVOCATION_CAPACITY
+            ):
+                current = BloomFilter(
+                    settings.TOKEN_REVOCATION_CAPACITY,
+                    settings.TOKEN_REVOCATION_ERROR_RATE,
+                )
+            else:
+                rows = rows.filter(revoked_at__gte=self._seen_until)
+            for jti in rows.values_list("jti", flat=True).iterator():
+                current.add(jti)
+            self._filter = current
+            self._seen_until = now - SYNC_OVERLAP
+            self._synced_at = time.monotonic()
+
+
+_revocations = RevocationList()
+
+
+def is_revoked(jti: str) -> bool:
+    return _revocations.is_revoked(jti)
+
+
+async def ais_revoked(jti: str) -> bool:
+    """
+    `is_revoked` for async code: answered on the event loop unless a sync
+    is due or the filter has a hit to confirm.
+    """
+    if not _revocations.sync_due() and not _revocations.might_contain(jti):
+        return False
+    return await sync_to_async(is_revoked)(jti)
+
+
+def reset_revocation_list() -> None:
+    _revocations.reset()
+
+
+def revoke(payload: dict) -> None:
+    """
+    Revoke the token with this payload. Raises `TokenRevokedError` when it
+    already was, which makes a refresh token single-use even under
+    concurrent refreshes.
+    """
+    jti = payload.get("jti")
+    if not jti:
+        return
+    expires_at = datetime.datetime.fromtimestamp(
+        payload["exp"], tz=datetime.timezone.utc
+    )
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+    except IntegrityError:
+        raise TokenRevokedError
+    _revocations.add(jti)
+
+
+def purge_expired(batch_size: int = 1000) -> int:
+    """
+    Delete revocations of tokens that have expired anyway, in batches, and
+    return how many were deleted.
+    """
+    cutoff = timezone.now()
+    purged = 0
+    while True:
+        ids = list(
+            RevokedToken.objects.filter(expires_at__lte=cutoff).values_list(
+                "id", flat=True
+            )[:batch_size]
+        )
+        if not ids:
+            return purged
+        purged += RevokedToken.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,102 @@
+"""
+Durable, database-backed queue for accept-then-process transactions.
+
+The API validates a transaction, stores it as a pending `QueuedTransaction`
+and answers 202 straight away. Workers (`manage.py
+process_transaction_queue`) take the oldest pending rows in batches and
+apply them with `TransactionService.create_transactions_bulk`, which gives
+every account in the batch a single balance UPDATE. Claiming and applying
+a batch happen in one database transaction, so a worker that dies leaves
+its batch pending for the next one. No broker is involved.
+"""
+# system imports
+from decimal import Decimal
+from typing import Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .constants import COMPLETED, FAILED, PENDING
+from .models import QueuedTransaction
+from .services import TransactionService
+
+
+def enqueue(
+    user,
+    account_id: int,
+    amount: Decimal,
+    description: str,
+    transaction_type: str,
+    ip_address: str,
+) -> QueuedTransaction:
+    return QueuedTransaction.objects.create(
+        user=user,
+        account_id=account_id,
+        amount=amount,
+        description=description,
+        type=transaction_type,
+        ip_address=ip_address,
+    )
+
+
+def process_batch(batch_size: int = 500) -> int:
+    """
+    Apply up to `batch_size` of the oldest pending transactions and return
+    how many were processed.
+    """
+    with transaction.atomic():
+        pending = QueuedTransaction.objects.filter(status=PENDING).order_by(
+            "id"
+        )
+        # Concurrent workers skip each other's batches. sqlite has no row
+        # locks; there the loser of a race fails to commit and retries.
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        jobs = list(pending[:batch_size])
+        if not jobs:
+            return 0
+
+        results = TransactionService().create_transactions_bulk(
+            [
+                {
+                    "account_id": job.account_id,
+                    "amount": job.amount,
+                    "description": job.description,
+                    "type": job.type,
+                    "ip_address": job.ip_address,
+                }
+                for job in jobs
+            ],
+            ip_address="",
+            atomic=False,
+        )
+
+        now = timezone.now()
+        for job, result in zip(jobs, results):
+            job.processed_at = now
+            if isinstance(result, Exception):
+                job.status = FAILED
+                job.error = getattr(result, "message", str(result))
+            else:
+                job.status = COMPLETED
+                job.transaction = result
+        QueuedTransaction.objects.bulk_update(
+            jobs, ["status", "error", "transaction", "processed_at"]
+        )
+    return len(jobs)
+
+
+def drain(batch_size: int = 500, limit: Optional[int] = None) -> int:
+    """
+    Process batches until the queue is empty (or `limit` transactions have
+    been processed) and return how many were processed.
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        if limit is not None:
+            batch_size = min(batch_size, limit - processed)
+        done = process_batch(batch_size)
+        if not done:
+            break
+        processed += done
+    return processed
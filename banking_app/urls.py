@@ -4,6 +4,7 @@ from rest_framework import routers
 # system imports
 from django.urls import path
 from .views import *
+from . import async_views, metrics
 
 
 router = routers.SimpleRouter()
@@ -14,6 +15,11 @@ urlpatterns = [
     path("users/create-user", CreateUserAPIView.as_view(), name="create"),
     path("users/login-user", LoginUserAPIView.as_view(), name="login"),
     path("users/logout-user", LogoutUserAPIView.as_view(), name="logout"),
+    path(
+        "users/refresh-token",
+        RefreshTokenAPIView.as_view(),
+        name="refresh-token",
+    ),
     path(
         "users/get-logged-in-user",
         GetUserAPIView.as_view(),
@@ -39,4 +45,67 @@ urlpatterns = [
         TransactionList.as_view(),
         name="transaction-list",
     ),
+    path(
+        "api/accounts/<int:id>/transactions/<int:pk>/",
+        TransactionDetail.as_view(),
+        name="transaction-detail",
+    ),
+    path(
+        "api/accounts/<int:id>/transactions/bulk/",
+        TransactionBulkCreate.as_view(),
+        name="account-transaction-bulk",
+    ),
+    path(
+        "api/accounts/<int:id>/balance/",
+        AccountBalanceAPIView.as_view(),
+        name="account-balance",
+    ),
+    path(
+        "api/accounts/<int:id>/statement/",
+        AccountStatementAPIView.as_view(),
+        name="account-statement",
+    ),
+    path(
+        "api/accounts/<int:id>/aggregates/",
+        AccountAggregatesAPIView.as_view(),
+        name="account-aggregates",
+    ),
+    path(
+        "api/transactions/bulk/",
+        TransactionBulkCreate.as_view(),
+        name="transaction-bulk",
+    ),
+    path(
+        "api/transactions/queued/<int:pk>/",
+        QueuedTransactionDetail.as_view(),
+        name="queued-transaction",
+    ),
+    path(
+        "api/transfers/",
+        TransferAPIView.as_view(),
+        name="transfers",
+    ),
+    path("metrics", metrics.metrics_view, name="metrics"),
+    # Async variants of login and the read endpoints above, for ASGI
+    # deployments
+    path(
+        "async/users/login-user",
+        async_views.login_user,
+        name="async-login",
+    ),
+    path(
+        "async/users/get-logged-in-user",
+        async_views.get_current_user,
+        name="async-get-logged-user",
+    ),
+    path(
+        "async/api/accounts/<int:id>/transactions/",
+        async_views.list_transactions,
+        name="async-transaction-list",
+    ),
+    path(
+        "async/api/accounts/<int:id>/balance/",
+        async_views.get_account_balance,
+        name="async-account-balance",
+    ),
 ]
@@ -4,24 +4,56 @@ from django_filters.rest_framework import DjangoFilterBackend
 
 from rest_framework import views, response, exceptions, generics, status
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.views import APIView
 from rest_framework.exceptions import APIException
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
 # system imports
+import base64
+import json
+from django.conf import settings
 from django.db import transaction
-
-from . import services
-from banking_app.authentications import CustomUserAuthentication
-from .models import User, Account, Transaction
+from django.db.models import Count, Prefetch, ProtectedError, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.exceptions import ValidationError
+
+from . import (
+    exports,
+    hashers,
+    idempotency,
+    response_cache,
+    services,
+    tokens,
+    transaction_queue,
+)
+from .routers import iterate_on_replica, replica_reads
+from .sqlite import get_group_commit_writer
+from banking_app.authentications import (
+    CustomUserAuthentication,
+    decode_token,
+    invalidate_user,
+)
+from .filters import TransactionFilter
+from .models import User, Account, QueuedTransaction, Transaction
 from .serializers import (
     UserSerializer,
     LoginSerializer,
     UserUpdateSerializer,
     AccountSerializer,
+    AccountDashboardSerializer,
     TransactionSerializer,
+    BulkTransactionSerializer,
+    BulkTransactionItemSerializer,
+    StatementQuerySerializer,
+    AggregatesQuerySerializer,
+    TransferSerializer,
+    JournalEntrySerializer,
+    QueuedTransactionSerializer,
 )
 
 # sefvices imports
@@ -29,20 +61,58 @@ from banking_app.constants import CREDIT, DEBIT
 from .services import TransactionService
 from banking_app.exceptions import (
     AccountNotFoundError,
+    IdempotencyKeyInUseError,
+    IdempotencyKeyMismatchError,
     InsufficientFundsError,
+    InvalidTransactionAmountError,
     InvalidTransactionTypeError,
+    InvalidTransferError,
+    LedgerAccountDeletionError,
+    TokenRevokedError,
 )
 
 
-class UserListAPIView(APIView):
+class UserPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class UserListAPIView(generics.ListAPIView):
     """
-    Endpoint for getting a list of all users.
+    Endpoint for getting a paginated list of all users.
+
+    `?export=csv` or `?export=ndjson` streams every user instead, reading
+    the table in chunks so memory use stays flat.
     """
 
-    def get(self, request):
-        users = User.objects.all()
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data)
+    serializer_class = UserSerializer
+    pagination_class = UserPagination
+    export_fields = ("id", "first_name", "last_name", "phone_number", "email")
+
+    def get_queryset(self):
+        return User.objects.only(*self.export_fields).order_by("id")
+
+    def list(self, request, *args, **kwargs):
+        export_format = request.query_params.get("export")
+        if export_format is None:
+            return super().list(request, *args, **kwargs)
+        if export_format not in exports.CONTENT_TYPES:
+            return Response(
+                {"message": "Unsupported export format"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        users = self.get_queryset().iterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE
+        )
+        rows = (
+            tuple(getattr(user, field) for field in self.export_fields)
+            for user in users
+        )
+        return exports.stream_rows(
+            rows, self.export_fields, export_format, "users"
+        )
 
 
 class CreateUserAPIView(APIView):
@@ -79,8 +149,9 @@ class LoginUserAPIView(views.APIView):
         operation_summary="Login a user",
         responses={200: "Created", 403: "Bad Request"},
     )
-    @transaction.atomic
     def post(self, request):
+        # No transaction here: checking the password is CPU work that
+        # should not hold a database connection in a transaction.
         serializer = LoginSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
@@ -92,18 +163,78 @@ class LoginUserAPIView(views.APIView):
         if user is None:
             raise exceptions.AuthenticationFailed("Invalid credentials")
 
-        if not user.check_password(password):
+        if not hashers.verify_password(user, password):
             raise exceptions.AuthenticationFailed("Invalid credentials")
 
-        token = services.create_token(user_id=user.id)
+        pair = tokens.issue_tokens(user)
 
         response_data = {"message": "Logged in successfully"}
         response = Response(response_data, status=status.HTTP_200_OK)
-        response.set_cookie("jwt", token, httponly=True, secure=True)
+        tokens.set_token_cookies(response, pair.access, pair.refresh)
 
         return response
 
 
+def revoke_request_tokens(request) -> None:
+    """
+    Revoke the access token the request was authenticated with and the
+    refresh token sent along with it, if any.
+    """
+    if request.auth:
+        try:
+            tokens.revoke(request.auth)
+        except TokenRevokedError:
+            pass
+    refresh = request.COOKIES.get(tokens.REFRESH_COOKIE)
+    if refresh:
+        try:
+            payload = decode_token(refresh)
+        except exceptions.AuthenticationFailed:
+            return
+        if payload.get("type") == tokens.REFRESH and (
+            payload.get("id") == request.user.id
+        ):
+            try:
+                tokens.revoke(payload)
+            except TokenRevokedError:
+                pass
+
+
+class RefreshTokenAPIView(APIView):
+    """
+    Endpoint for exchanging the refresh token cookie for a new access and
+    refresh token pair. Each refresh token can be used once.
+    """
+
+    authentication_classes = ()
+    permission_classes = ()
+
+    @swagger_auto_schema(
+        operation_summary="Refresh the login tokens",
+        responses={200: "OK", 401: "Unauthorized"},
+    )
+    def post(self, request):
+        token = request.COOKIES.get(tokens.REFRESH_COOKIE)
+        if not token:
+            raise exceptions.NotAuthenticated("Refresh token missing")
+        payload = decode_token(token)
+        if payload.get("type") != tokens.REFRESH:
+            raise exceptions.AuthenticationFailed("Token is invalid")
+
+        user = User.objects.filter(id=payload["id"], is_active=True).first()
+        if user is None:
+            raise exceptions.AuthenticationFailed("User not found")
+        try:
+            tokens.revoke(payload)
+        except TokenRevokedError as e:
+            raise exceptions.AuthenticationFailed(e.message)
+
+        pair = tokens.issue_tokens(user)
+        response = Response({"message": "Tokens refreshed"})
+        tokens.set_token_cookies(response, pair.access, pair.refresh)
+        return response
+
+
 class LogoutUserAPIView(APIView):
     """
     Endpoint for logging-out the current user's information.
@@ -113,10 +244,11 @@ class LogoutUserAPIView(APIView):
     authentication_classes = (CustomUserAuthentication,)
     permission_classes = (IsAuthenticated,)
 
-    @transaction.atomic
     def post(self, request):
+        revoke_request_tokens(request)
+
         response_obj = response.Response()
-        response_obj.delete_cookie("jwt")
+        tokens.delete_token_cookies(response_obj)
         response_obj.data = {"message": "Goodbye!"}
 
         return response_obj
@@ -134,9 +266,13 @@ class GetUserAPIView(APIView):
     def get(self, request):
         user = request.user
 
-        serializer = UserSerializer(user)
+        def build():
+            serializer = UserSerializer(user)
+            return response.Response(serializer.data)
 
-        return response.Response(serializer.data)
+        return response_cache.cached_response(
+            request, response_cache.USER, user.id, build
+        )
 
 
 class DeleteCurrentUserAPIView(views.APIView):
@@ -152,10 +288,18 @@ class DeleteCurrentUserAPIView(views.APIView):
     def delete(self, request):
         user_email = request.user.email
 
-        services.delete_user(user_email)
+        try:
+            services.delete_user(user_email)
+        except ProtectedError:
+            return Response(
+                {"message": LedgerAccountDeletionError().message},
+                status=status.HTTP_409_CONFLICT,
+            )
+        revoke_request_tokens(request)
+        transaction.on_commit(lambda: invalidate_user(request.user.id))
 
         resp = response.Response()
-        resp.delete_cookie("jwt")
+        tokens.delete_token_cookies(resp)
         resp.data = {"message": "Account deleted successfully"}
 
         return resp
@@ -176,16 +320,31 @@ class UpdateCurrentUserAPIView(APIView):
         responses={200: "OK", 400: "Bad Request", 403: "Forbidden"},
     )
     def patch(self, request):
-        user = request.user
+        # request.user may have been built from token claims; saving needs
+        # the full row.
+        user = User.objects.get(pk=request.user.pk)
         serializer = UserUpdateSerializer(
             user, data=request.data, partial=True
         )
 
-        if serializer.is_valid():
-            with transaction.atomic():
-                serializer.save()
-
-        return response.Response(serializer.data)
+        if not serializer.is_valid():
+            return response.Response(serializer.data)
+
+        reissue = request.auth and request.auth.get("type") == tokens.ACCESS
+        with transaction.atomic():
+            serializer.save()
+            # The claims in the current access token are stale now.
+            if reissue:
+                try:
+                    tokens.revoke(request.auth)
+                except TokenRevokedError:
+                    pass
+        invalidate_user(user.id)
+
+        resp = response.Response(serializer.data)
+        if reissue:
+            tokens.set_token_cookies(resp, tokens.issue_access_token(user))
+        return resp
 
 
 class AccountViewSet(ModelViewSet):
@@ -193,9 +352,124 @@ class AccountViewSet(ModelViewSet):
         CustomUserAuthentication,
     ]
     permission_classes = [IsAuthenticated]
-    queryset = Account.objects.all()
     serializer_class = AccountSerializer
 
+    recent_transactions_limit = 5
+    max_recent_transactions_limit = 50
+
+    def get_includes(self):
+        """
+        Optional data requested with `?include=recent_transactions,summary`
+        on list and retrieve calls.
+        """
+        if self.action not in ("list", "retrieve"):
+            return set()
+        include = self.request.query_params.get("include", "")
+        return set(include.split(",")) & set(
+            AccountDashboardSerializer.OPTIONAL_FIELDS
+        )
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return Account.objects.none()
+        queryset = services.with_balance(
+            Account.objects.filter(user=self.request.user).order_by("id")
+        )
+        includes = self.get_includes()
+        if "recent_transactions" in includes:
+            try:
+                limit = int(self.request.query_params["recent_limit"])
+            except (KeyError, ValueError):
+                limit = self.recent_transactions_limit
+            limit = max(1, min(limit, self.max_recent_transactions_limit))
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "transaction_set",
+                    queryset=services.recent_transactions(
+                        limit, account__user=self.request.user
+                    ),
+                    to_attr="recent_transactions",
+                )
+            )
+        if "summary" in includes:
+            queryset = queryset.annotate(
+                total_credits=Sum(
+                    "transaction__amount",
+                    filter=Q(transaction__type=CREDIT),
+                ),
+                total_debits=Sum(
+                    "transaction__amount",
+                    filter=Q(transaction__type=DEBIT),
+                ),
+                transaction_count=Count("transaction"),
+            )
+        return queryset
+
+    def get_serializer_class(self):
+        if self.get_includes():
+            return AccountDashboardSerializer
+        return AccountSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        return response_cache.cached_response(
+            request,
+            response_cache.ACCOUNT,
+            kwargs["pk"],
+            lambda: super(AccountViewSet, self).retrieve(
+                request, *args, **kwargs
+            ),
+        )
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        response_cache.invalidate(
+            response_cache.ACCOUNT, serializer.instance.id
+        )
+
+    def destroy(self, request, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().destroy(request, *args, **kwargs)
+        except ProtectedError:
+            return Response(
+                {"message": LedgerAccountDeletionError().message},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+    def perform_destroy(self, instance):
+        response_cache.invalidate(response_cache.ACCOUNT, instance.id)
+        super().perform_destroy(instance)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["include"] = self.get_includes()
+        return context
+
+
+def run_idempotently(request, key, perform):
+    """
+    Run `perform()` under an Idempotency-Key, or replay the response stored
+    for it. Must be called inside the transaction doing the work.
+    """
+    try:
+        record, replay = idempotency.claim(request, key)
+    except IdempotencyKeyInUseError as e:
+        return Response({"message": e.message}, status=status.HTTP_409_CONFLICT)
+    except IdempotencyKeyMismatchError as e:
+        return Response(
+            {"message": e.message},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if replay is not None:
+        return replay
+
+    response = perform()
+    idempotency.save_response(record, response)
+    return response
+
 
 class TransactionPagination(PageNumberPagination):
     page_size = 10
@@ -203,6 +477,78 @@ class TransactionPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class TransactionCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (timestamp, id), newest first.
+
+    Each page is a single index range scan on (account_id, timestamp, id)
+    that seeks past the last row of the previous page, so deep pages cost the
+    same as the first one and no COUNT query is issued. Cursors are opaque
+    and only move forward.
+    """
+
+    page_size = TransactionPagination.page_size
+    page_size_query_param = TransactionPagination.page_size_query_param
+    max_page_size = TransactionPagination.max_page_size
+    ordering = ("-timestamp", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.has_previous = False
+
+        position = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            timestamp, pk = position
+            queryset = queryset.filter(
+                Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk)
+            )
+
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        self.has_next = len(results) > self.page_size
+        self.next_position = (
+            (self.page[-1].timestamp, self.page[-1].id)
+            if self.has_next
+            else None
+        )
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_previous_link(self):
+        return None
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            timestamp, pk = json.loads(
+                base64.urlsafe_b64decode(encoded.encode("ascii"))
+            )
+            timestamp = parse_datetime(timestamp)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if timestamp is None:
+            raise NotFound(self.invalid_cursor_message)
+        return timestamp, pk
+
+    def encode_cursor(self, position):
+        timestamp, pk = position
+        encoded = base64.urlsafe_b64encode(
+            json.dumps([timestamp.isoformat(), pk]).encode("ascii")
+        ).decode("ascii")
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+
 class TransactionList(generics.ListCreateAPIView):
     """
     API endpoint for creating and listing transactions for a specific account.
@@ -215,16 +561,107 @@ class TransactionList(generics.ListCreateAPIView):
     serializer_class = TransactionSerializer
     pagination_class = TransactionPagination
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ["description"]
+    filterset_class = TransactionFilter
+
+    @property
+    def paginator(self):
+        """
+        Use keyset pagination when the client asks for it with
+        `?pagination=cursor` or is following a cursor link.
+        """
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            if (
+                params.get("pagination") == "cursor"
+                or TransactionCursorPagination.cursor_query_param in params
+            ):
+                self._paginator = TransactionCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def get_queryset(self):
         account_id = self.kwargs["id"]
-        return Transaction.objects.filter(account__id=account_id).order_by(
-            "-timestamp"
-        )
+        return Transaction.objects.filter(
+            account__id=account_id, account__user=self.request.user
+        ).order_by("-timestamp", "-id")
+
+    def list(self, request, *args, **kwargs):
+        # History tolerates replication lag, so keep it off the primary.
+        with replica_reads():
+            return super().list(request, *args, **kwargs)
 
-    @transaction.atomic
     def create(self, request, *args, **kwargs):
+        # Look the account up before the transaction: its first statement
+        # must be a write, or sqlite fails to upgrade the read lock under
+        # concurrency.
+        if not Account.objects.filter(
+            id=self.kwargs["id"], user=request.user
+        ).exists():
+            return Response(
+                {"message": "Account not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        if self.should_enqueue(request):
+            perform = self.enqueue_transaction
+        else:
+            perform = self.perform_transaction
+        key = idempotency.get_key(request)
+        if (
+            key is None
+            and perform == self.perform_transaction
+            and get_group_commit_writer() is not None
+        ):
+            # The writer thread commits for us; an open transaction here
+            # would hold sqlite's write lock and stall it.
+            return perform(request)
+
+        with transaction.atomic():
+            if key is None:
+                return perform(request)
+            return run_idempotently(request, key, lambda: perform(request))
+
+    def should_enqueue(self, request):
+        """
+        Accept-then-process mode: on for every request when
+        `settings.TRANSACTION_QUEUE_ENABLED`, or per request with a
+        `Prefer: respond-async` header.
+        """
+        return settings.TRANSACTION_QUEUE_ENABLED or (
+            "respond-async" in request.headers.get("Prefer", "")
+        )
+
+    def enqueue_transaction(self, request):
+        """
+        Validate the transaction and queue it for the worker; answer 202
+        with a URL to poll for the outcome.
+        """
+        serializer = BulkTransactionItemSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        data = serializer.validated_data
+
+        # create() has checked that the account is the caller's.
+        queued = transaction_queue.enqueue(
+            user=request.user,
+            account_id=self.kwargs["id"],
+            amount=data["amount"],
+            description=data["description"],
+            transaction_type=data["type"],
+            ip_address=services.get_client_ip(request),
+        )
+        serializer = QueuedTransactionSerializer(
+            queued, context={"request": request}
+        )
+        return Response(
+            serializer.data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": serializer.data["status_url"]},
+        )
+
+    def perform_transaction(self, request):
         account_id = self.kwargs["id"]
         amount = request.data.get("amount")
         description = request.data.get("description")
@@ -232,22 +669,27 @@ class TransactionList(generics.ListCreateAPIView):
 
         service = TransactionService()
 
+        # create() has checked that the account is the caller's; the
+        # balance UPDATE still reports one deleted since.
+        fields = dict(
+            account=Account(id=account_id),
+            amount=amount,
+            description=description,
+            transaction_type=transaction_type,
+            ip_address=service.get_client_ip(request),
+        )
+        writer = get_group_commit_writer()
+        in_transaction = transaction.get_connection().in_atomic_block
         try:
-            account = service.get_account_by_id(account_id)
+            if writer is not None and not in_transaction:
+                created = writer.submit(**fields)
+            else:
+                created = service.create_transaction(**fields)
         except AccountNotFoundError:
             return Response(
                 {"message": "Account not found"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-
-        try:
-            transaction = service.create_transaction(
-                account=account,
-                amount=amount,
-                description=description,
-                transaction_type=transaction_type,
-                ip_address=service.get_client_ip(request),
-            )
         except InsufficientFundsError:
             return Response(
                 {"message": "Insufficient funds"},
@@ -258,23 +700,419 @@ class TransactionList(generics.ListCreateAPIView):
                 {"message": "Invalid transaction type"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        except InvalidTransactionAmountError:
+            return Response(
+                {"message": "Invalid transaction amount"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        serializer = self.get_serializer(transaction)
+        serializer = self.get_serializer(created)
         headers = self.get_success_headers(serializer.data)
         return Response(
             serializer.data, status=status.HTTP_201_CREATED, headers=headers
         )
 
 
-class TransactionDetail(generics.RetrieveAPIView):
+class TransactionBulkCreate(APIView):
+    """
+    API endpoint for posting a batch of transactions in one request.
+
+    Routed both per account (items may omit `account`) and across accounts
+    (every item names its `account`). In `atomic` mode nothing is written
+    unless every line succeeds; in `partial` mode valid lines are applied and
+    the rest are reported back.
+    """
+
+    authentication_classes = [
+        CustomUserAuthentication,
+    ]
     permission_classes = (IsAuthenticated,)
 
-    serializer_class = TransactionSerializer
+    ERROR_MESSAGES = {
+        AccountNotFoundError: "Account not found",
+        InsufficientFundsError: "Insufficient funds",
+        InvalidTransactionTypeError: "Invalid transaction type",
+    }
+
+    @swagger_auto_schema(
+        request_body=BulkTransactionSerializer,
+        operation_summary="Create transactions in bulk",
+        responses={201: "Created", 207: "Multi-Status", 400: "Bad Request"},
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = BulkTransactionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        atomic = (
+            serializer.validated_data["mode"] == BulkTransactionSerializer.ATOMIC
+        )
+
+        items, results = [], {}
+        for index, line in enumerate(
+            serializer.validated_data["transactions"]
+        ):
+            item_serializer = BulkTransactionItemSerializer(data=line)
+            try:
+                item = item_serializer.run_validation(line)
+            except ValidationError as e:
+                results[index] = {"errors": e.detail}
+                continue
+            account_id = self.kwargs.get("id", item.get("account"))
+            if account_id is None or account_id != item.get(
+                "account", account_id
+            ):
+                results[index] = {
+                    "errors": {"account": ["Missing or mismatched account"]}
+                }
+                continue
+            item["account_id"] = account_id
+            item["index"] = index
+            items.append(item)
+
+        # Lines naming someone else's account fail as if it did not exist.
+        # Resolved before the transaction so its first statement is a write.
+        owned = set(
+            Account.objects.filter(
+                id__in={item["account_id"] for item in items},
+                user=request.user,
+            ).values_list("id", flat=True)
+        )
+        for item in items:
+            if item["account_id"] not in owned:
+                results[item["index"]] = {
+                    "errors": {
+                        "non_field_errors": [
+                            self.ERROR_MESSAGES[AccountNotFoundError]
+                        ]
+                    }
+                }
+        items = [item for item in items if item["account_id"] in owned]
+
+        if results and atomic:
+            return self._respond(
+                results, len(serializer.validated_data["transactions"]), atomic
+            )
+
+        service = TransactionService()
+        try:
+            with transaction.atomic():
+                applied = service.create_transactions_bulk(
+                    items,
+                    ip_address=service.get_client_ip(request),
+                    atomic=atomic,
+                )
+        except InsufficientFundsError:
+            applied = [InsufficientFundsError() for _ in items]
+
+        for item, result in zip(items, applied):
+            if isinstance(result, Exception):
+                results[item["index"]] = {
+                    "errors": {
+                        "non_field_errors": [
+                            self.ERROR_MESSAGES[type(result)]
+                        ]
+                    }
+                }
+            else:
+                results[item["index"]] = {"transaction": result}
+
+        return self._respond(
+            results, len(serializer.validated_data["transactions"]), atomic
+        )
+
+    def _respond(self, results, total, atomic):
+        failed = sum("errors" in result for result in results.values())
+        applied = not (atomic and failed)
+        body = []
+        for index in range(total):
+            result = results.get(index)
+            if result is None:
+                body.append({"index": index, "status": "not_applied"})
+            elif "errors" in result:
+                body.append(
+                    {"index": index, "status": "failed", **result}
+                )
+            elif applied:
+                body.append(
+                    {
+                        "index": index,
+                        "status": "created",
+                        "transaction": TransactionSerializer(
+                            result["transaction"]
+                        ).data,
+                    }
+                )
+            else:
+                body.append({"index": index, "status": "not_applied"})
+
+        created = sum(item["status"] == "created" for item in body)
+        if not failed:
+            response_status = status.HTTP_201_CREATED
+        elif atomic or not created:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+        return Response(
+            {
+                "mode": "atomic" if atomic else "partial",
+                "created": created,
+                "failed": failed,
+                "results": body,
+            },
+            status=response_status,
+        )
+
+
+class TransferAPIView(APIView):
+    """
+    API endpoint for moving money from one of the user's accounts to any
+    other account in a single journal entry. Supports `Idempotency-Key`.
+    """
+
+    authentication_classes = [
+        CustomUserAuthentication,
+    ]
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(
+        request_body=TransferSerializer,
+        operation_summary="Transfer between accounts",
+        responses={
+            201: JournalEntrySerializer,
+            400: "Bad Request",
+            404: "Not Found",
+        },
+    )
+    def post(self, request):
+        serializer = TransferSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        # Resolve both sides before the transaction starts so its first
+        # statement is a write (see TransactionList.perform_transaction).
+        source_id = (
+            Account.objects.filter(
+                id=data["source_account"], user=request.user
+            )
+            .values_list("id", flat=True)
+            .first()
+        )
+        destination_id = (
+            Account.objects.filter(
+                account_number=data["destination_account_number"]
+            )
+            .values_list("id", flat=True)
+            .first()
+        )
+        if source_id is None or destination_id is None:
+            return Response(
+                {"message": "Account not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        def perform():
+            try:
+                # Savepoint: a failed credit must undo the debit before it.
+                with transaction.atomic():
+                    entry = TransactionService().transfer(
+                        source_id,
+                        destination_id,
+                        data["amount"],
+                        data["description"],
+                        ip_address=services.get_client_ip(request),
+                        user=request.user,
+                    )
+            except (InsufficientFundsError, InvalidTransferError) as e:
+                return Response(
+                    {"message": e.message}, status=status.HTTP_400_BAD_REQUEST
+                )
+            except AccountNotFoundError as e:
+                return Response(
+                    {"message": e.message}, status=status.HTTP_404_NOT_FOUND
+                )
+            return Response(
+                JournalEntrySerializer(entry).data,
+                status=status.HTTP_201_CREATED,
+            )
+
+        key = idempotency.get_key(request)
+        with transaction.atomic():
+            if key is None:
+                return perform()
+            return run_idempotently(request, key, perform)
+
+
+class AccountBalanceAPIView(APIView):
+    """
+    Endpoint for an account's balance, optionally at a point in time given
+    as an ISO 8601 `at` query parameter.
+    """
+
+    authentication_classes = [
+        CustomUserAuthentication,
+    ]
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, id):
+        service = TransactionService()
+        account = Account.objects.filter(id=id, user=request.user).first()
+        if account is None:
+            return Response(
+                {"message": "Account not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        at = request.query_params.get("at")
+        if at is None:
+            return Response(
+                {
+                    "account": account.id,
+                    "at": timezone.now(),
+                    "balance": service.get_balance(account.id),
+                }
+            )
+
+        try:
+            at = parse_datetime(at)
+        except ValueError:
+            at = None
+        if at is None:
+            return Response(
+                {"message": "Invalid datetime for 'at'"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+
+        return Response(
+            {
+                "account": account.id,
+                "at": at,
+                "balance": service.get_balance_at(account, at),
+            }
+        )
+
+
+class AccountStatementAPIView(APIView):
+    """
+    Endpoint for streaming an account statement as CSV or NDJSON.
+
+    Takes optional ISO 8601 `start` and `end` bounds and an `export` format
+    (csv by default). Each row carries the balance after that transaction.
+    """
+
+    authentication_classes = [
+        CustomUserAuthentication,
+    ]
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, id):
+        serializer = StatementQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        account = Account.objects.filter(id=id, user=request.user).first()
+        if account is None:
+            return Response(
+                {"message": "Account not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        # The rows are read while the response streams, after this view has
+        # returned, so the replica routing has to travel with the iterator.
+        rows = iterate_on_replica(
+            TransactionService().iter_statement(
+                account, start=params.get("start"), end=params.get("end")
+            )
+        )
+        return exports.stream_rows(
+            rows,
+            services.STATEMENT_COLUMNS,
+            params["export"],
+            f"statement-{account.account_number}",
+        )
+
+
+class AccountAggregatesAPIView(APIView):
+    """
+    Endpoint for an account's credit and debit totals and counts, overall
+    and bucketed by `group_by` (day or month, the default), between
+    optional `start` and `end` dates. Served from the rollup table.
+    """
+
+    authentication_classes = [
+        CustomUserAuthentication,
+    ]
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, id):
+        serializer = AggregatesQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        # Built from the primary: a lagging replica's answer would stay
+        # cached under the account's new version stamp.
+        def build():
+            if not Account.objects.filter(id=id, user=request.user).exists():
+                return Response(
+                    {"message": "Account not found"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            aggregates = TransactionService().get_aggregates(
+                id,
+                group_by=params["group_by"],
+                start=params.get("start"),
+                end=params.get("end"),
+            )
+            return Response(
+                {
+                    "account": id,
+                    "group_by": params["group_by"],
+                    "start": params.get("start"),
+                    "end": params.get("end"),
+                    **aggregates,
+                }
+            )
+
+        return response_cache.cached_response(
+            request, response_cache.ACCOUNT, id, build
+        )
+
+
+class QueuedTransactionDetail(generics.RetrieveAPIView):
+    """
+    API endpoint for polling a transaction accepted with 202: its status
+    and, once processed, the resulting transaction or the error.
+    """
+
+    authentication_classes = [
+        CustomUserAuthentication,
+    ]
+    permission_classes = (IsAuthenticated,)
+    serializer_class = QueuedTransactionSerializer
 
     def get_queryset(self):
-        return Transaction.objects.all()
+        if getattr(self, "swagger_fake_view", False):
+            return QueuedTransaction.objects.none()
+        return QueuedTransaction.objects.select_related("transaction").filter(
+            user=self.request.user
+        )
+
+
+class TransactionDetail(generics.RetrieveAPIView):
+    """
+    API endpoint for retrieving one transaction of an account owned by the
+    current user.
+    """
 
-    def get(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+    authentication_classes = [
+        CustomUserAuthentication,
+    ]
+    permission_classes = (IsAuthenticated,)
+    serializer_class = TransactionSerializer
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return Transaction.objects.none()
+        return Transaction.objects.select_related("account").filter(
+            account_id=self.kwargs["id"], account__user=self.request.user
+        )
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from banking_project.databases import databases_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "banking_app.metrics.metrics_middleware",
+    "banking_app.query_budget.query_budget_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -78,12 +83,13 @@ WSGI_APPLICATION = "banking_project.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
-}
+# Configured from DATABASE_URL, DATABASE_REPLICA_URLS and friends; see
+# banking_project/databases.py. Falls back to the local sqlite file.
+DATABASES = databases_from_env(os.environ, f"sqlite:///{BASE_DIR / 'db.sqlite3'}")
+
+# Writes go to "default"; reads inside `banking_app.routers.replica_reads()`
+# are spread across the "replica_<n>" aliases when any are configured.
+DATABASE_ROUTERS = ["banking_app.routers.PrimaryReplicaRouter"]
 
 
 # Password validation
@@ -105,6 +111,31 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashers. New passwords and re-hashes use the first; the others
+# only verify existing hashes, which are re-hashed with the first on the
+# next successful login. The Argon2 hasher needs `pip install argon2-cffi`.
+PASSWORD_HASHERS = [
+    "banking_app.hashers.ScryptPasswordHasher",
+    "banking_app.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+
+# Costs of the hashers in banking_app/hashers.py. Changing them re-hashes
+# each password on its next successful login. scrypt needs about
+# 128 * WORK_FACTOR * BLOCK_SIZE bytes per hash (16 MiB as set); Argon2's
+# MEMORY_COST is in KiB.
+PASSWORD_HASH_COST = {
+    "scrypt": {"WORK_FACTOR": 2 ** 14, "BLOCK_SIZE": 8, "PARALLELISM": 1},
+    "argon2": {"TIME_COST": 2, "MEMORY_COST": 102400, "PARALLELISM": 8},
+}
+
+# Worker processes that check passwords at login, so hashing neither holds
+# a request worker's GIL nor blocks an ASGI event loop. 0 hashes inline.
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "0"))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
@@ -146,3 +177,93 @@ LOGOUT_URL = "rest_framework:logout"
 AUTH_USER_MODEL = "banking_app.User"
 
 JWT_SECRET = "doNotUseInProduction"
+
+# Upper bound on the number of lines accepted by the bulk transaction endpoints
+BULK_TRANSACTIONS_MAX_ITEMS = 50000
+
+# Process-local by default. Point "default" at a shared backend (Redis,
+# Memcached) when running several processes so the "responses" cache below
+# invalidates across all of them.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "banking-api",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+
+# Caches used by the app. BACKEND is "lru" for a per-process cache bounded by
+# MAX_SIZE entries, or "django" to share entries through the Django cache
+# named by ALIAS. TTL is in seconds.
+APP_CACHES = {
+    # Authenticated users, keyed by user id
+    "users": {"BACKEND": "lru", "MAX_SIZE": 10000, "TTL": 60},
+    # Verified JWT payloads, keyed by token digest
+    "tokens": {"BACKEND": "lru", "MAX_SIZE": 10000, "TTL": 300},
+    # Balance shard counts, keyed by account id
+    "balance_shards": {"BACKEND": "lru", "MAX_SIZE": 10000, "TTL": 60},
+    # Rendered user and account responses with their version stamps
+    "responses": {"BACKEND": "django", "ALIAS": "default", "TTL": 300},
+}
+
+# Lifetimes, in seconds, of the access and refresh tokens issued at login
+ACCESS_TOKEN_TTL = 15 * 60
+REFRESH_TOKEN_TTL = 7 * 24 * 60 * 60
+
+# Revoked token jtis are checked against a per-process Bloom filter synced
+# from the database every SYNC_INTERVAL seconds, sized for CAPACITY
+# unexpired revocations at the given false positive rate (hits are
+# confirmed against the database).
+TOKEN_REVOCATION_SYNC_INTERVAL = 5
+TOKEN_REVOCATION_CAPACITY = 100000
+TOKEN_REVOCATION_ERROR_RATE = 0.001
+
+# Reverse proxies (addresses or CIDR ranges) whose X-Forwarded-For header is
+# trusted when resolving the client IP of a request
+TRUSTED_PROXIES = ["127.0.0.1/32", "::1/128"]
+
+# How long, in seconds, a stored Idempotency-Key response can be replayed
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Rows fetched per round trip by the streaming export endpoints
+EXPORT_CHUNK_SIZE = 2000
+
+# Account numbers each process reserves from the database at a time
+ACCOUNT_NUMBER_BLOCK_SIZE = 1000
+
+# PRAGMAs applied to every new sqlite connection. WAL lets readers run
+# alongside the writer and, with synchronous=NORMAL, a commit no longer
+# fsyncs twice. busy_timeout is in milliseconds, mmap_size in bytes. Set to
+# {} to keep sqlite's defaults.
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+    "mmap_size": 128 * 1024 * 1024,
+}
+
+# Coalesce concurrent transaction POSTs into shared commits on a background
+# writer thread (see banking_app/sqlite.py). Meant for single-node sqlite
+# deployments; MAX_DELAY is how long, in seconds, a batch waits to fill up.
+GROUP_COMMIT_ENABLED = os.environ.get("GROUP_COMMIT_ENABLED") == "1"
+GROUP_COMMIT_MAX_BATCH = 100
+GROUP_COMMIT_MAX_DELAY = 0.002
+
+# Accept transaction POSTs with 202 and apply them from a database-backed
+# queue (`manage.py process_transaction_queue`). Clients can also opt in
+# per request with a `Prefer: respond-async` header.
+TRANSACTION_QUEUE_ENABLED = os.environ.get("TRANSACTION_QUEUE_ENABLED") == "1"
+
+# Request metrics (banking_app/metrics.py), scraped from /metrics by clients
+# in ALLOWED_NETWORKS. Latency, status and response size are recorded for
+# every request; query count, SQL time and serializer time for a
+# SAMPLE_RATE fraction (0 to 1) of them, which also get a Server-Timing
+# header when SERVER_TIMING is on.
+METRICS_SAMPLE_RATE = float(os.environ.get("METRICS_SAMPLE_RATE", "0.1"))
+METRICS_SERVER_TIMING = os.environ.get("METRICS_SERVER_TIMING", "1") == "1"
+METRICS_ALLOWED_NETWORKS = ["127.0.0.1/32", "::1/128"]
+
+# What to do when a request runs more queries than its URL's budget in
+# banking_app/query_budget.py: "raise" (the test suite), "log" (staging)
+# or "off".
+QUERY_BUDGET_MODE = os.environ.get("QUERY_BUDGET_MODE", "off")